@@ -1,28 +1,182 @@
 """
-In-memory image cache with TTL
+In-memory image cache with TTL and LRU size bounds
 Stores recent camera frames to reduce NVR load
 """
 
+import hashlib
+import mmap
 import time
-from typing import Optional, Dict, Any
-from threading import Lock
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List, Tuple, Union, Deque
+from threading import Event, Lock, Thread
+
+
+class _ByteArena:
+    """
+    Fixed-size anonymous mmap carved into power-of-two slots
+
+    Freed slots go back on a per-size free list, so steady-state caching
+    reuses the same memory instead of allocating a new bytes object per
+    frame. Readers get memoryviews into the arena and must copy anything
+    they hand off to outlive the call; reuse_delay only keeps a freed slot
+    off the free list long enough for in-progress synchronous reads
+    (hashing, base64) to finish.
+    """
+
+    MIN_SLOT = 64 * 1024
+
+    def __init__(self, capacity: int, reuse_delay: float):
+        self._mmap = mmap.mmap(-1, capacity)
+        self._view = memoryview(self._mmap)
+        self._capacity = capacity
+        self._reuse_delay = reuse_delay
+        self._next = 0  # Bump pointer for never-used space
+        self._free: Dict[int, List[int]] = {}  # Slot size -> free offsets
+        self._pending: Deque[Tuple[float, int, int]] = deque()  # (reusable_at, size, offset)
+        self._lock = Lock()
+
+    def _slot_size(self, length: int) -> int:
+        size = self.MIN_SLOT
+        while size < length:
+            size <<= 1
+        return size
+
+    def store(self, data: bytes) -> Optional[Tuple[int, int, memoryview]]:
+        """
+        Copy data into a free slot
+
+        Returns:
+            (offset, slot size, view of the stored bytes) or None if full
+        """
+        size = self._slot_size(len(data))
+        now = time.monotonic()
+
+        with self._lock:
+            while self._pending and self._pending[0][0] <= now:
+                _, pending_size, offset = self._pending.popleft()
+                self._free.setdefault(pending_size, []).append(offset)
+
+            free = self._free.get(size)
+            if free:
+                offset = free.pop()
+            elif self._next + size <= self._capacity:
+                offset = self._next
+                self._next += size
+            else:
+                return None
+
+        # The slot is ours alone now, copy outside the lock
+        end = offset + len(data)
+        self._view[offset:end] = data
+        return offset, size, self._view[offset:end]
+
+    def release(self, offset: int, size: int) -> None:
+        """Return a slot to its free list once reuse_delay has passed"""
+        with self._lock:
+            self._pending.append((time.monotonic() + self._reuse_delay, size, offset))
+
+
+class _Entry:
+    """Cached image, its expiry (time.monotonic() seconds), ETag and base64 form"""
+
+    __slots__ = ('data', 'expires_at', 'slot', 'etag', 'b64')
+
+    def __init__(self, data: Union[bytes, memoryview], expires_at: float, etag: str,
+                 slot: Optional[Tuple[int, int]] = None):
+        self.data = data
+        self.expires_at = expires_at
+        self.etag = etag
+        self.slot = slot  # (offset, size) when data lives in the arena
+        self.b64: Optional[str] = None  # Filled in on first base64 request
 
 
 class ImageCache:
     """Thread-safe in-memory cache for camera images"""
 
-    def __init__(self, default_ttl: int = 30):
+    def __init__(
+        self,
+        default_ttl: int = 30,
+        shards: int = 16,
+        enable_reaper: bool = False,
+        arena_bytes: int = 0,
+        max_entries: int = 0,
+        max_bytes: int = 0
+    ):
         """
         Initialize cache
 
         Args:
             default_ttl: Time-to-live in seconds (default 30)
+            shards: Number of independently locked stripes, so requests
+                for different cameras don't contend on one lock
+            enable_reaper: Sweep expired entries from a background thread,
+                so keys that are never read again don't pile up
+            arena_bytes: Size of a preallocated mmap arena for image data
+                (0 stores plain bytes objects). Images that don't fit
+                while the arena is full fall back to plain bytes.
+            max_entries: Cap on cached images (0 for no limit)
+            max_bytes: Cap on total image bytes (0 for no limit)
+
+        Each shard keeps its entries in LRU order and evicts the least
+        recently used ones once it holds more than its share of the entry
+        or byte cap, so memory stays bounded however many cameras there are.
         """
         self.default_ttl = default_ttl
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._lock = Lock()
+        self._shards: List['OrderedDict[str, _Entry]'] = [OrderedDict() for _ in range(shards)]
+        self._locks: List[Lock] = [Lock() for _ in range(shards)]
+        self._bytes: List[int] = [0] * shards  # Image bytes held per shard
+        self._max_entries = -(-max_entries // shards) if max_entries else 0
+        self._max_bytes = max_bytes // shards if max_bytes else 0
+        self._stop = Event()
+        self._arena = _ByteArena(arena_bytes, reuse_delay=default_ttl) if arena_bytes else None
+
+        if enable_reaper:
+            Thread(target=self._reaper, name="image-cache-reaper", daemon=True).start()
+
+    def _reaper(self) -> None:
+        while not self._stop.wait(max(self.default_ttl / 2, 1)):
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """
+        Remove every expired entry
+
+        Returns:
+            Number of entries removed
+        """
+        now = time.monotonic()
+        removed = 0
+
+        for index, (shard, lock) in enumerate(zip(self._shards, self._locks)):
+            with lock:
+                expired = [key for key, entry in shard.items() if now > entry.expires_at]
+                for key in expired:
+                    self._remove(index, key)
+                removed += len(expired)
 
-    def get(self, key: str) -> Optional[bytes]:
+        return removed
+
+    def _release(self, entry: _Entry) -> None:
+        if entry.slot is not None:
+            self._arena.release(*entry.slot)
+
+    def _remove(self, index: int, key: str) -> Optional[_Entry]:
+        # Caller holds the shard lock
+        entry = self._shards[index].pop(key, None)
+        if entry is not None:
+            self._bytes[index] -= len(entry.data)
+            self._release(entry)
+        return entry
+
+    def close(self) -> None:
+        """Stop the background reaper (if running)"""
+        self._stop.set()
+
+    def _shard(self, key: str) -> Tuple[int, 'OrderedDict[str, _Entry]', Lock]:
+        index = hash(key) % len(self._shards)
+        return index, self._shards[index], self._locks[index]
+
+    def get(self, key: str) -> Optional[Union[bytes, memoryview]]:
         """
         Get cached image if not expired
 
@@ -30,22 +184,96 @@ class ImageCache:
             key: Cache key (e.g., "lodge/bagel")
 
         Returns:
-            Image bytes if found and not expired, None otherwise
+            Image bytes (a memoryview when arena-backed) if found and not
+            expired, None otherwise
         """
-        with self._lock:
-            if key not in self._cache:
-                return None
+        now = time.monotonic()
+        index, shard, lock = self._shard(key)
 
-            entry = self._cache[key]
+        with lock:
+            entry = shard.get(key)
+            if entry is None:
+                return None
 
             # Check if expired
-            if time.time() > entry['expires_at']:
-                del self._cache[key]
+            if now > entry.expires_at:
+                self._remove(index, key)
                 return None
 
-            return entry['data']
+            shard.move_to_end(key)
+            return entry.data
 
-    def set(self, key: str, data: bytes, ttl: Optional[int] = None) -> None:
+    def get_with_etag(self, key: str) -> Optional[Tuple[Union[bytes, memoryview], str]]:
+        """
+        Get cached image and its ETag if not expired
+
+        Args:
+            key: Cache key (e.g., "lodge/bagel")
+
+        Returns:
+            (image, quoted ETag) if found and not expired, None otherwise
+        """
+        now = time.monotonic()
+        index, shard, lock = self._shard(key)
+
+        with lock:
+            entry = shard.get(key)
+            if entry is None:
+                return None
+
+            if now > entry.expires_at:
+                self._remove(index, key)
+                return None
+
+            shard.move_to_end(key)
+            return entry.data, entry.etag
+
+    def _matches(self, entry: Optional[_Entry], data: Union[bytes, memoryview]) -> bool:
+        # Identity for frames read back via get, contents for ones passed to set
+        return entry is not None and (entry.data is data or entry.data == data)
+
+    def get_b64(self, key: str, data: Union[bytes, memoryview]) -> Optional[str]:
+        """
+        Get the stored base64 encoding of a cached image
+
+        Args:
+            key: Cache key (e.g., "lodge/bagel")
+            data: Image the encoding is wanted for
+
+        Returns:
+            Base64 string if data is the cached, unexpired image and was
+            encoded before, None otherwise
+        """
+        now = time.monotonic()
+        _, shard, lock = self._shard(key)
+
+        with lock:
+            entry = shard.get(key)
+            if not self._matches(entry, data) or now > entry.expires_at:
+                return None
+            return entry.b64
+
+    def set_b64(self, key: str, data: Union[bytes, memoryview], encoded: str) -> None:
+        """
+        Attach a base64 encoding to a cached image
+
+        The encoding is only kept if data is still the cached image, so a
+        frame replaced in the meantime never gets a stale encoding. It is
+        dropped along with the image on expiry, set or invalidate.
+
+        Args:
+            key: Cache key (e.g., "lodge/bagel")
+            data: Image that was encoded
+            encoded: Base64 string of data
+        """
+        _, shard, lock = self._shard(key)
+
+        with lock:
+            entry = shard.get(key)
+            if self._matches(entry, data):
+                entry.b64 = encoded
+
+    def set(self, key: str, data: bytes, ttl: Optional[int] = None) -> str:
         """
         Store image in cache
 
@@ -53,16 +281,39 @@ class ImageCache:
             key: Cache key (e.g., "lodge/bagel")
             data: Image bytes
             ttl: Time-to-live in seconds (uses default if not specified)
+
+        Returns:
+            Quoted ETag for the image, derived from its contents so it is
+            stable across processes and restarts
         """
         if ttl is None:
             ttl = self.default_ttl
 
-        with self._lock:
-            self._cache[key] = {
-                'data': data,
-                'cached_at': time.time(),
-                'expires_at': time.time() + ttl
-            }
+        expires_at = time.monotonic() + ttl
+        etag = f'"{hashlib.blake2b(data, digest_size=8).hexdigest()}"'
+        stored = self._arena.store(data) if self._arena is not None else None
+
+        if stored is not None:
+            offset, size, view = stored
+            entry = _Entry(view, expires_at, etag, (offset, size))
+        else:
+            entry = _Entry(data, expires_at, etag)
+
+        index, shard, lock = self._shard(key)
+
+        with lock:
+            self._remove(index, key)
+            shard[key] = entry
+            self._bytes[index] += len(data)
+
+            # Evict least recently used entries, never the one just stored
+            while len(shard) > 1 and (
+                (self._max_entries and len(shard) > self._max_entries) or
+                (self._max_bytes and self._bytes[index] > self._max_bytes)
+            ):
+                self._remove(index, next(iter(shard)))
+
+        return etag
 
     def invalidate(self, key: str) -> bool:
         """
@@ -74,16 +325,20 @@ class ImageCache:
         Returns:
             True if entry was removed, False if not found
         """
-        with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                return True
-            return False
+        index, _, lock = self._shard(key)
+
+        with lock:
+            return self._remove(index, key) is not None
 
     def clear(self) -> None:
         """Clear all cached entries"""
-        with self._lock:
-            self._cache.clear()
+        for index, (shard, lock) in enumerate(zip(self._shards, self._locks)):
+            with lock:
+                entries = list(shard.values())
+                shard.clear()
+                self._bytes[index] = 0
+            for entry in entries:
+                self._release(entry)
 
     def stats(self) -> Dict[str, Any]:
         """
@@ -92,18 +347,23 @@ class ImageCache:
         Returns:
             Dictionary with cache stats
         """
-        with self._lock:
-            total = len(self._cache)
-            expired = 0
-            now = time.time()
-
-            for entry in self._cache.values():
-                if now > entry['expires_at']:
-                    expired += 1
-
-            return {
-                'total_entries': total,
-                'valid_entries': total - expired,
-                'expired_entries': expired,
-                'ttl_seconds': self.default_ttl
-            }
+        now = time.monotonic()
+        total = 0
+        expired = 0
+        total_bytes = 0
+
+        for index, (shard, lock) in enumerate(zip(self._shards, self._locks)):
+            with lock:
+                total += len(shard)
+                total_bytes += self._bytes[index]
+                for entry in shard.values():
+                    if now > entry.expires_at:
+                        expired += 1
+
+        return {
+            'total_entries': total,
+            'valid_entries': total - expired,
+            'expired_entries': expired,
+            'total_bytes': total_bytes,
+            'ttl_seconds': self.default_ttl
+        }
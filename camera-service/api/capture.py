@@ -3,27 +3,451 @@ Camera capture logic
 Handles NVR connections and frame capture using OpenCV
 """
 
+import asyncio
 import cv2
-import json
 import logging
+import os
+import socket
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from threading import Condition, Event, Lock, Thread, local
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+
+from config_store import ConfigStore
+
+try:
+    import av  # PyAV, optional: keyframe-only decode for one-shot captures
+except ImportError:
+    av = None
+
+try:
+    # libjpeg-turbo SIMD encoder, loaded once at import
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420, TJSAMP_422, TJSAMP_444
+    _turbojpeg = TurboJPEG()
+    _TJ_SUBSAMPLE = {'420': TJSAMP_420, '422': TJSAMP_422, '444': TJSAMP_444}
+    _TJ_INPLACE = hasattr(_turbojpeg, 'buffer_size')  # encode(dst=...) needs PyTurboJPEG >= 1.7
+except (ImportError, OSError):
+    _turbojpeg = None
+    _TJ_INPLACE = False
 
 logger = logging.getLogger(__name__)
 
+# Surveillance stills at q=85 with 4:2:0 chroma are visually the same as
+# q=95 but much smaller and cheaper to encode. Override per channel with
+# jpegQuality / jpegSubsample in config.json.
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_JPEG_SUBSAMPLE = '420'
+
+_CV2_SUBSAMPLE = {
+    '420': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+    '422': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    '444': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+}
+_PIL_SUBSAMPLE = {'444': 0, '422': 1, '420': 2}
+
+_tls = local()  # Per-thread JPEG output buffer, reused across captures
+
+
+def _jpeg_buffer(size: int) -> bytearray:
+    """
+    Get this thread's reusable JPEG output buffer, growing it if needed
+
+    Args:
+        size: Minimum buffer size in bytes
+
+    Returns:
+        bytearray of at least size bytes
+    """
+    buf = getattr(_tls, 'jpeg_buf', None)
+    if buf is None or len(buf) < size:
+        buf = bytearray(max(size, 2 * 1024 * 1024))
+        _tls.jpeg_buf = buf
+    return buf
+
+
+def _scaled_size(src_width: int, src_height: int, width: Optional[int]) -> Optional[Tuple[int, int]]:
+    """
+    Output size for a downscale to the requested width, keeping aspect ratio
+
+    Args:
+        src_width: Frame width
+        src_height: Frame height
+        width: Requested width, or None for full resolution
+
+    Returns:
+        (width, height), or None if the frame is already that narrow or narrower
+    """
+    if not width or width >= src_width:
+        return None
+    return width, max(1, round(src_height * width / src_width))
+
+
+def _downscale(frame, width: Optional[int]):
+    """
+    Shrink a BGR frame to the requested width (area interpolation)
+
+    Args:
+        frame: BGR frame
+        width: Requested width, or None for full resolution
+
+    Returns:
+        The resized frame, or the original if no downscale is needed
+    """
+    size = _scaled_size(frame.shape[1], frame.shape[0], width)
+    if size is None:
+        return frame
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+# Hardware H.264 decoders in order of preference, with the elements needed
+# to get from each decoder's output to plain BGR system memory
+_GST_DECODERS = [
+    ('nvv4l2decoder', 'nvv4l2decoder ! nvvidconv ! video/x-raw,format=BGRx ! videoconvert'),  # Jetson
+    ('v4l2h264dec', 'v4l2h264dec ! videoconvert'),  # Raspberry Pi
+    ('vaapih264dec', 'vaapih264dec ! videoconvert'),  # Intel iGPU
+]
+_GST_SOFTWARE_DECODER = 'avdec_h264 ! videoconvert'
+
+
+def _gstreamer_available() -> bool:
+    """Check whether this OpenCV build was compiled with GStreamer"""
+    for line in cv2.getBuildInformation().splitlines():
+        if line.strip().startswith('GStreamer:'):
+            return 'YES' in line
+    return False
+
+
+@lru_cache(maxsize=1)
+def _gstreamer_decoder() -> Optional[str]:
+    """
+    Pick the GStreamer decode chain for RTSP streams
+
+    Set CAMERA_RTSP_BACKEND=ffmpeg to skip GStreamer entirely.
+
+    Returns:
+        Pipeline fragment from depayloaded H.264 to BGR, or None to use FFmpeg
+    """
+    if os.environ.get('CAMERA_RTSP_BACKEND', '').lower() == 'ffmpeg':
+        return None
+
+    if not _gstreamer_available():
+        return None
+
+    try:
+        import gi
+        gi.require_version('Gst', '1.0')
+        from gi.repository import Gst
+        Gst.init(None)
+    except (ImportError, ValueError):
+        # Can't inspect the registry, software decode always exists
+        return _GST_SOFTWARE_DECODER
+
+    for element, chain in _GST_DECODERS:
+        if Gst.ElementFactory.find(element) is not None:
+            logger.info(f"Using GStreamer hardware decoder: {element}")
+            return chain
+
+    return _GST_SOFTWARE_DECODER
+
+
+def open_rtsp_stream(rtsp_url: str, timeout: Optional[float] = None) -> cv2.VideoCapture:
+    """
+    Open an RTSP stream with the lowest-latency backend available
+
+    Prefers a GStreamer pipeline whose appsink keeps only the newest frame,
+    falling back to FFmpeg when GStreamer is missing or the pipeline fails
+    (e.g. H.265 channels).
+
+    Args:
+        rtsp_url: RTSP URL
+        timeout: Optional open/read timeout in seconds, applied to either backend
+
+    Returns:
+        VideoCapture (check isOpened())
+    """
+    decoder = _gstreamer_decoder()
+
+    if decoder is not None:
+        # rtspsrc timeouts are in microseconds; bound the probe like FFmpeg's
+        src_timeout = ""
+        if timeout is not None:
+            timeout_us = int(timeout * 1_000_000)
+            src_timeout = f" timeout={timeout_us} tcp-timeout={timeout_us}"
+        pipeline = (
+            f'rtspsrc location="{rtsp_url}" latency=0{src_timeout} ! rtph264depay ! h264parse ! '
+            f'{decoder} ! video/x-raw,format=BGR ! '
+            f'appsink max-buffers=1 drop=true sync=false'
+        )
+        cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+        if cap.isOpened():
+            return cap
+        cap.release()
+        logger.debug(f"GStreamer pipeline failed, falling back to FFmpeg: {rtsp_url}")
+
+    if timeout is not None:
+        timeout_ms = int(timeout * 1000)
+        cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms,
+        ])
+    else:
+        cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class StreamWorker(Thread):
+    """Background reader that keeps an RTSP stream drained to the newest frame"""
+
+    def __init__(self, rtsp_url: str, cap: cv2.VideoCapture):
+        """
+        Initialize stream worker
+
+        Args:
+            rtsp_url: RTSP URL
+            cap: Opened VideoCapture, owned by this worker from now on
+        """
+        super().__init__(name="rtsp-worker", daemon=True)
+        self.rtsp_url = rtsp_url
+        self.last_used = time.monotonic()
+        self._cap = cap
+        self._cond = Condition()
+        self._latest = None
+        self._frame_seq = 0
+        self._waiters = 0
+        self._running = True
+
+    @property
+    def alive(self) -> bool:
+        return self._running and self.is_alive()
+
+    def run(self) -> None:
+        try:
+            while self._running:
+                # grab() keeps FFmpeg's queue empty without the BGR conversion
+                if not self._cap.grab():
+                    logger.error(f"Lost RTSP stream: {self.rtsp_url}")
+                    break
+
+                with self._cond:
+                    wanted = self._waiters > 0
+
+                if not wanted:
+                    continue
+
+                # Only convert frames somebody is waiting for
+                ret, frame = self._cap.retrieve()
+                with self._cond:
+                    self._latest = frame if ret else None
+                    self._frame_seq += 1
+                    self._cond.notify_all()
+        finally:
+            self._running = False
+            self._cap.release()
+            with self._cond:
+                self._cond.notify_all()
+
+    def get_latest(self, timeout: float = 5.0):
+        """
+        Wait for the next frame off the stream
+
+        Concurrent callers share a single retrieve.
+
+        Args:
+            timeout: Seconds to wait for a frame
+
+        Returns:
+            BGR frame or None on failure/timeout
+        """
+        self.last_used = time.monotonic()
+
+        with self._cond:
+            seq = self._frame_seq
+            self._waiters += 1
+            try:
+                self._cond.wait_for(
+                    lambda: self._frame_seq > seq or not self._running,
+                    timeout
+                )
+            finally:
+                self._waiters -= 1
+
+            if self._frame_seq == seq:
+                return None
+            return self._latest
+
+    def stop(self) -> None:
+        """Ask the worker to exit; it releases the capture on its way out"""
+        self._running = False
+
+
+class RTSPConnectionPool:
+    """Keeps RTSP streams open between captures to skip the RTSP handshake"""
+
+    def __init__(self, idle_timeout: float = 60.0):
+        """
+        Initialize connection pool
+
+        Args:
+            idle_timeout: Seconds a stream may sit unused before it is closed
+        """
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[str, StreamWorker] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._reaper: Optional[Thread] = None
+
+    def acquire(self, rtsp_url: str) -> Optional[StreamWorker]:
+        """
+        Get the stream worker for a URL, connecting if needed
+
+        Args:
+            rtsp_url: RTSP URL
+
+        Returns:
+            Running StreamWorker or None if the stream could not be opened
+        """
+        with self._lock:
+            worker = self._entries.get(rtsp_url)
+            if worker is not None and worker.alive:
+                return worker
+
+        # Connect outside the pool lock so other cameras aren't held up
+        cap = open_rtsp_stream(rtsp_url)
+        if not cap.isOpened():
+            cap.release()
+            logger.error(f"Failed to open RTSP stream: {rtsp_url}")
+            return None
+
+        with self._lock:
+            existing = self._entries.get(rtsp_url)
+            if existing is not None and existing.alive:
+                # Another thread won the race
+                cap.release()
+                return existing
+
+            worker = StreamWorker(rtsp_url, cap)
+            worker.start()
+            self._entries[rtsp_url] = worker
+            self._start_reaper()
+
+        logger.info(f"Opened pooled RTSP stream: {rtsp_url}")
+        return worker
+
+    def grab_latest(self, rtsp_url: str, timeout: float = 5.0):
+        """
+        Read the newest frame from a pooled stream
+
+        Args:
+            rtsp_url: RTSP URL
+            timeout: Seconds to wait for a frame
+
+        Returns:
+            BGR frame or None on failure
+        """
+        worker = self.acquire(rtsp_url)
+        if worker is None:
+            return None
+
+        frame = worker.get_latest(timeout)
+
+        if frame is None and not worker.alive:
+            # Drop the broken stream so the next call reconnects
+            self.discard(rtsp_url)
+
+        return frame
+
+    def discard(self, rtsp_url: str) -> None:
+        """Stop and forget the pooled stream for a URL"""
+        with self._lock:
+            worker = self._entries.pop(rtsp_url, None)
+        if worker is not None:
+            worker.stop()
+
+    def close_all(self) -> None:
+        """Stop every pooled stream and the reaper"""
+        self._stop.set()
+        with self._lock:
+            workers = list(self._entries.values())
+            self._entries.clear()
+        for worker in workers:
+            worker.stop()
+
+    def _start_reaper(self) -> None:
+        # Caller holds self._lock
+        if self._reaper is None or not self._reaper.is_alive():
+            self._stop.clear()
+            self._reaper = Thread(target=self._reap, name="rtsp-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        while not self._stop.wait(self.idle_timeout / 2):
+            cutoff = time.monotonic() - self.idle_timeout
+            with self._lock:
+                idle = [url for url, worker in self._entries.items() if worker.last_used < cutoff]
+            for url in idle:
+                logger.info(f"Closing idle RTSP stream: {url}")
+                self.discard(url)
+
 
 class CameraCapture:
     """Handles camera capture operations"""
 
-    def __init__(self, warehouses_path: str = "../warehouses"):
+    def __init__(self, warehouses_path: str = "../warehouses", max_workers: int = 32):
         """
         Initialize camera capture
 
         Args:
             warehouses_path: Path to warehouses directory
+            max_workers: Upper bound on concurrent RTSP captures per facility
         """
         self.warehouses_path = Path(warehouses_path)
-        self._configs = {}  # Cache configs in memory
+        self.max_workers = max_workers
+        self.config_store = ConfigStore.shared(self.warehouses_path)  # Shared by every instance
+        self.config_store.subscribe(self._on_config_change)
+        self._camera_index: Dict[str, Dict[str, Dict[str, Any]]] = {}  # camera_id -> channel per facility
+        self._camera_lists: Dict[str, List[Dict[str, Any]]] = {}  # list_cameras output per facility
+        self._pools: Dict[str, ThreadPoolExecutor] = {}  # Capture pools per facility
+        self._pools_lock = Lock()  # _get_pool runs on executor threads
+        self.rtsp_pool = RTSPConnectionPool()
+        # Blocking capture work offloaded from the asyncio event loop
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rtsp")
+
+    def _get_pool(self, facility: str, size: int) -> ThreadPoolExecutor:
+        """
+        Get (or lazily create) the capture thread pool for a facility
+
+        OpenCV releases the GIL while FFmpeg waits on the network, so
+        threads are enough to overlap RTSP handshakes across cameras.
+
+        Args:
+            facility: Facility name
+            size: Number of cameras in the facility
+
+        Returns:
+            ThreadPoolExecutor for the facility
+        """
+        with self._pools_lock:
+            pool = self._pools.get(facility)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=max(1, min(self.max_workers, size)),
+                    thread_name_prefix=f"capture-{facility}"
+                )
+                self._pools[facility] = pool
+            return pool
+
+    def close(self) -> None:
+        """Close pooled RTSP streams and shut down the capture thread pools"""
+        self.rtsp_pool.close_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._pools_lock:
+            for pool in self._pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+            self._pools.clear()
 
     def load_config(self, facility: str) -> Dict[str, Any]:
         """
@@ -38,23 +462,12 @@ class CameraCapture:
         Raises:
             FileNotFoundError: If config doesn't exist
         """
-        # Check cache first
-        if facility in self._configs:
-            return self._configs[facility]
+        return self.config_store.get(facility)
 
-        config_path = self.warehouses_path / facility / "cameras" / "config.json"
-
-        if not config_path.exists():
-            raise FileNotFoundError(f"Camera config not found: {config_path}")
-
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
-        # Cache it
-        self._configs[facility] = config
-        logger.info(f"Loaded config for {facility}: {len(config['channels'])} cameras")
-
-        return config
+    def _on_config_change(self, facility: str) -> None:
+        """Drop lookups derived from a facility's previous config"""
+        self._camera_index.pop(facility, None)
+        self._camera_lists.pop(facility, None)
 
     def get_camera_info(self, facility: str, camera_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -68,28 +481,109 @@ class CameraCapture:
             Camera info dict or None if not found
         """
         config = self.load_config(facility)
+        index = self._camera_index.get(facility)
+        if index is None:
+            index = {channel['modelTCameraId']: channel for channel in config['channels']}
+            self._camera_index[facility] = index
+        return index.get(camera_id)
 
-        for channel in config['channels']:
-            if channel['modelTCameraId'] == camera_id:
-                return channel
+    def _encode_jpeg(
+        self,
+        frame,
+        quality: int = DEFAULT_JPEG_QUALITY,
+        subsample: str = DEFAULT_JPEG_SUBSAMPLE
+    ) -> Optional[bytes]:
+        """
+        Encode a BGR frame as JPEG
 
-        return None
+        Args:
+            frame: BGR frame
+            quality: JPEG quality (1-100)
+            subsample: Chroma subsampling: '420', '422' or '444'
+
+        Returns:
+            JPEG bytes or None on failure
+        """
+        if _turbojpeg is not None:
+            try:
+                jpeg_subsample = _TJ_SUBSAMPLE[subsample]
+                if _TJ_INPLACE:
+                    # Encode into the thread's buffer instead of a fresh
+                    # libjpeg allocation, then copy out just the JPEG
+                    buf = _jpeg_buffer(_turbojpeg.buffer_size(frame, jpeg_subsample))
+                    _, size = _turbojpeg.encode(
+                        frame,
+                        quality=quality,
+                        pixel_format=TJPF_BGR,
+                        jpeg_subsample=jpeg_subsample,
+                        dst=buf
+                    )
+                    return bytes(memoryview(buf)[:size])
+                return _turbojpeg.encode(
+                    frame,
+                    quality=quality,
+                    pixel_format=TJPF_BGR,
+                    jpeg_subsample=jpeg_subsample
+                )
+            except Exception as e:
+                logger.debug(f"TurboJPEG encode failed, falling back to OpenCV: {e}")
+
+        encode_param = [
+            int(cv2.IMWRITE_JPEG_QUALITY), quality,
+            int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR), _CV2_SUBSAMPLE[subsample],
+            int(cv2.IMWRITE_JPEG_OPTIMIZE), 1,
+            int(cv2.IMWRITE_JPEG_PROGRESSIVE), 0,
+        ]
+        ret, buffer = cv2.imencode('.jpg', frame, encode_param)
+
+        if not ret:
+            logger.error("Failed to encode frame as JPEG")
+            return None
+
+        return buffer.tobytes()
 
-    def capture_frame(self, rtsp_url: str, timeout: int = 5) -> Optional[bytes]:
+    def capture_frame(
+        self,
+        rtsp_url: str,
+        timeout: int = 5,
+        keep_open: bool = True,
+        quality: int = DEFAULT_JPEG_QUALITY,
+        subsample: str = DEFAULT_JPEG_SUBSAMPLE,
+        width: Optional[int] = None
+    ) -> Optional[bytes]:
         """
         Capture single frame from RTSP stream
 
         Args:
             rtsp_url: RTSP URL
             timeout: Timeout in seconds
+            keep_open: Reuse a pooled connection instead of reconnecting
+            quality: JPEG quality (1-100)
+            subsample: Chroma subsampling: '420', '422' or '444'
+            width: Downscale to this width before encoding (default: full resolution)
 
         Returns:
             JPEG bytes or None on failure
         """
+        if keep_open:
+            try:
+                frame = self.rtsp_pool.grab_latest(rtsp_url, timeout)
+            except Exception as e:
+                logger.error(f"Error capturing frame: {e}")
+                return None
+
+            if frame is None:
+                logger.error(f"Failed to read frame from: {rtsp_url}")
+                return None
+
+            return self._encode_jpeg(_downscale(frame, width), quality, subsample)
+
+        if av is not None:
+            return self._capture_keyframe(rtsp_url, timeout, quality, subsample, width)
+
         cap = None
         try:
-            cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            cap = open_rtsp_stream(rtsp_url)
 
             if not cap.isOpened():
                 logger.error(f"Failed to open RTSP stream: {rtsp_url}")
@@ -101,15 +595,7 @@ class CameraCapture:
                 logger.error(f"Failed to read frame from: {rtsp_url}")
                 return None
 
-            # Encode as JPEG
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 95]
-            ret, buffer = cv2.imencode('.jpg', frame, encode_param)
-
-            if not ret:
-                logger.error("Failed to encode frame as JPEG")
-                return None
-
-            return buffer.tobytes()
+            return self._encode_jpeg(_downscale(frame, width), quality, subsample)
 
         except Exception as e:
             logger.error(f"Error capturing frame: {e}")
@@ -119,13 +605,102 @@ class CameraCapture:
             if cap is not None:
                 cap.release()
 
-    def capture_camera(self, facility: str, camera_id: str) -> Optional[bytes]:
+    def _capture_keyframe(
+        self,
+        rtsp_url: str,
+        timeout: int = 5,
+        quality: int = DEFAULT_JPEG_QUALITY,
+        subsample: str = DEFAULT_JPEG_SUBSAMPLE,
+        width: Optional[int] = None
+    ) -> Optional[bytes]:
+        """
+        Capture the next keyframe with PyAV, skipping P/B-frame decode
+
+        Only used for one-shot captures: with no stream kept open there's
+        nothing to gain from decoding the frames that lead up to the
+        next I-frame, and the decoded picture goes straight to JPEG
+        without a BGR array in between.
+
+        Args:
+            rtsp_url: RTSP URL
+            timeout: Timeout in seconds
+            quality: JPEG quality (1-100)
+            subsample: Chroma subsampling: '420', '422' or '444'
+            width: Downscale to this width before encoding (default: full resolution)
+
+        Returns:
+            JPEG bytes or None on failure
+        """
+        container = None
+        try:
+            container = av.open(
+                rtsp_url,
+                options={
+                    'rtsp_transport': 'tcp',
+                    'buffer_size': '128000',
+                    'stimeout': str(timeout * 1000000),
+                },
+                timeout=timeout
+            )
+            stream = container.streams.video[0]
+            stream.codec_context.skip_frame = 'NONKEY'
+
+            for frame in container.decode(stream):
+                size = _scaled_size(frame.width, frame.height, width)
+                if size is not None:
+                    frame = frame.reformat(width=size[0], height=size[1])
+                buffer = BytesIO()
+                frame.to_image().save(
+                    buffer,
+                    'JPEG',
+                    quality=quality,
+                    subsampling=_PIL_SUBSAMPLE[subsample]
+                )
+                return buffer.getvalue()
+
+            logger.error(f"No keyframe received from: {rtsp_url}")
+            return None
+
+        except Exception as e:
+            logger.error(f"Error capturing keyframe: {e}")
+            return None
+
+        finally:
+            if container is not None:
+                container.close()
+
+    def _capture_options(self, channel: Dict[str, Any], quality: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Build capture_frame keyword arguments from a channel's config
+
+        Args:
+            channel: Channel dict from config.json
+            quality: Explicit JPEG quality, overrides the channel setting
+
+        Returns:
+            Keyword arguments for capture_frame
+        """
+        return {
+            'keep_open': channel.get('keepConnectionOpen', True),
+            'quality': quality or channel.get('jpegQuality', DEFAULT_JPEG_QUALITY),
+            'subsample': str(channel.get('jpegSubsample', DEFAULT_JPEG_SUBSAMPLE)),
+        }
+
+    def capture_camera(
+        self,
+        facility: str,
+        camera_id: str,
+        quality: Optional[int] = None,
+        width: Optional[int] = None
+    ) -> Optional[bytes]:
         """
         Capture frame from specific camera
 
         Args:
             facility: Facility name
             camera_id: ModelT camera ID
+            quality: JPEG quality override (default: channel setting or 85)
+            width: Downscale to this width, keeping aspect (default: full resolution)
 
         Returns:
             JPEG bytes or None on failure
@@ -139,30 +714,137 @@ class CameraCapture:
         rtsp_url = camera_info['rtspUrl']
         logger.info(f"Capturing from {camera_id} ({camera_info['modelTCameraName']})")
 
-        return self.capture_frame(rtsp_url)
+        return self.capture_frame(rtsp_url, width=width, **self._capture_options(camera_info, quality))
 
-    def capture_all(self, facility: str) -> Dict[str, Optional[bytes]]:
+    def _submit_all(self, facility: str) -> Dict[Future, str]:
         """
-        Capture frames from all cameras in facility
+        Start a capture for every camera in a facility on its capture pool
 
         Args:
             facility: Facility name
 
         Returns:
-            Dictionary mapping camera_id to image bytes
+            Dictionary mapping each capture future to its camera_id
         """
-        config = self.load_config(facility)
-        results = {}
+        channels = self.load_config(facility)['channels']
+        if not channels:
+            return {}
 
-        for channel in config['channels']:
+        pool = self._get_pool(facility, len(channels))
+        futures = {}
+
+        for channel in channels:
             camera_id = channel['modelTCameraId']
             logger.info(f"Capturing {camera_id}...")
+            future = pool.submit(
+                self.capture_frame,
+                channel['rtspUrl'],
+                **self._capture_options(channel)
+            )
+            futures[future] = camera_id
+
+        return futures
+
+    def capture_all(self, facility: str, timeout: int = 10) -> Dict[str, Optional[bytes]]:
+        """
+        Capture frames from all cameras in facility concurrently
 
-            frame = self.capture_frame(channel['rtspUrl'])
-            results[camera_id] = frame
+        Args:
+            facility: Facility name
+            timeout: Overall timeout in seconds for the whole batch
+
+        Returns:
+            Dictionary mapping camera_id to image bytes
+        """
+        futures = self._submit_all(facility)
+        results = {camera_id: None for camera_id in futures.values()}
+
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                camera_id = futures[future]
+                try:
+                    results[camera_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Error capturing {camera_id}: {e}")
+        except FutureTimeoutError:
+            for future, camera_id in futures.items():
+                if not future.done():
+                    future.cancel()
+                    logger.error(f"Capture timed out for {camera_id}")
 
         return results
 
+    async def _run_blocking(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def capture_frame_async(self, rtsp_url: str, **kwargs) -> Optional[bytes]:
+        """Async capture_frame, run on the capture executor"""
+        return await self._run_blocking(self.capture_frame, rtsp_url, **kwargs)
+
+    async def capture_camera_async(
+        self,
+        facility: str,
+        camera_id: str,
+        quality: Optional[int] = None,
+        width: Optional[int] = None
+    ) -> Optional[bytes]:
+        """Async capture_camera, run on the capture executor"""
+        return await self._run_blocking(self.capture_camera, facility, camera_id, quality, width)
+
+    async def capture_all_async(self, facility: str, timeout: int = 10) -> Dict[str, Optional[bytes]]:
+        """Async capture_all, run on the capture executor"""
+        return await self._run_blocking(self.capture_all, facility, timeout=timeout)
+
+    async def capture_all_iter(
+        self,
+        facility: str,
+        timeout: int = 10
+    ) -> AsyncIterator[Tuple[str, Optional[bytes]]]:
+        """
+        Capture all cameras in a facility, yielding each result as it lands
+
+        Args:
+            facility: Facility name
+            timeout: Overall timeout in seconds for the whole batch
+
+        Yields:
+            (camera_id, JPEG bytes or None) in completion order; cameras
+            still running at the timeout are yielded last with None
+        """
+        futures = self._submit_all(facility)
+        pending = {asyncio.wrap_future(future): camera_id for future, camera_id in futures.items()}
+        deadline = time.monotonic() + timeout
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=max(deadline - time.monotonic(), 0),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    camera_id = pending.pop(task)
+                    try:
+                        image_data = task.result()
+                    except Exception as e:
+                        logger.error(f"Error capturing {camera_id}: {e}")
+                        image_data = None
+                    yield camera_id, image_data
+
+            for task, camera_id in pending.items():
+                logger.error(f"Capture timed out for {camera_id}")
+                yield camera_id, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def check_nvr_connectivity_async(self, facility: str) -> Dict[str, Any]:
+        """Async check_nvr_connectivity, run on the capture executor"""
+        return await self._run_blocking(self.check_nvr_connectivity, facility)
+
     def list_cameras(self, facility: str) -> List[Dict[str, Any]]:
         """
         List all cameras for a facility
@@ -173,7 +855,12 @@ class CameraCapture:
         Returns:
             List of camera info dicts
         """
+        # load_config runs the store's throttled mtime check first, so a changed
+        # config.json fires _on_config_change and drops the cached list below
         config = self.load_config(facility)
+        cameras = self._camera_lists.get(facility)
+        if cameras is not None:
+            return cameras
 
         cameras = []
         for channel in config['channels']:
@@ -186,32 +873,44 @@ class CameraCapture:
                 'channel': channel['channel']
             })
 
+        self._camera_lists[facility] = cameras
+
         return cameras
 
-    def check_nvr_connectivity(self, facility: str) -> Dict[str, Any]:
+    def check_nvr_connectivity(self, facility: str, timeout: float = 1.0) -> Dict[str, Any]:
         """
         Check NVR connectivity
 
         Args:
             facility: Facility name
+            timeout: Connect/read timeout in seconds
 
         Returns:
             Connectivity status dict
         """
         config = self.load_config(facility)
         nvr_info = config['nvr']
+        port = nvr_info.get('port', 554)
 
-        # Try to capture from first camera as connectivity test
-        if config['channels']:
-            first_channel = config['channels'][0]
-            frame = self.capture_frame(first_channel['rtspUrl'])
-            reachable = frame is not None
-        else:
-            reachable = False
+        # A TCP connect plus one RTSP OPTIONS round-trip answers "is the NVR
+        # up" without opening a stream and decoding a frame
+        reachable = False
+        rtsp_responding = False
+        try:
+            with socket.create_connection((nvr_info['ip'], port), timeout=timeout) as sock:
+                reachable = True
+                sock.sendall(
+                    f"OPTIONS rtsp://{nvr_info['ip']}:{port}/ RTSP/1.0\r\nCSeq: 1\r\n\r\n".encode('ascii')
+                )
+                # Any status (including 401) means an RTSP server answered
+                rtsp_responding = sock.recv(64).startswith(b'RTSP/1.0')
+        except OSError as e:
+            logger.debug(f"NVR probe {nvr_info['ip']}:{port} failed: {e}")
 
         return {
             'nvr_ip': nvr_info['ip'],
             'reachable': reachable,
+            'rtsp_responding': rtsp_responding,
             'total_cameras': len(config['channels'])
         }
 
@@ -233,56 +932,46 @@ class CameraCapture:
             Updated config dictionary
         """
         config = self.load_config(facility)
-        config_path = self.warehouses_path / facility / "cameras" / "config.json"
 
         # Create a map of existing channels by channel number
         existing_channels = {}
-        for channel in config.get('channels', []):
-            existing_channels[channel['channel']] = channel
+        if preserve_modelt_info:
+            for channel in config.get('channels', []):
+                existing_channels[channel['channel']] = channel
 
         # Update channels list
         updated_channels = []
 
         for scanned in scanned_channels:
             channel_num = scanned.get('channel')
+            existing = existing_channels.get(channel_num)
 
-            # Start with scanned data
+            # ModelT defaults, then anything already configured for the
+            # channel (names, per-channel settings), then the scanned stream
             channel_info = {
+                'modelTCameraId': f'camera_{channel_num}',
+                'modelTCameraName': f'Camera {channel_num}',
+                'modelTCameraNumber': channel_num,
+                'location': 'Unknown' if existing else 'Unknown - needs configuration',
+                **(existing or {}),
                 'channel': channel_num,
                 'nvrPath': scanned['path'],
                 'rtspUrl': scanned['url'],
                 'resolution': scanned['resolution']
             }
 
-            # Preserve ModelT info if it exists
-            if preserve_modelt_info and channel_num in existing_channels:
-                existing = existing_channels[channel_num]
-                channel_info.update({
-                    'modelTCameraId': existing.get('modelTCameraId', f'camera_{channel_num}'),
-                    'modelTCameraName': existing.get('modelTCameraName', f'Camera {channel_num}'),
-                    'modelTCameraNumber': existing.get('modelTCameraNumber', channel_num),
-                    'location': existing.get('location', 'Unknown')
-                })
-            else:
-                # New channel - create default ModelT info
-                channel_info.update({
-                    'modelTCameraId': f'camera_{channel_num}',
-                    'modelTCameraName': f'Camera {channel_num}',
-                    'modelTCameraNumber': channel_num,
-                    'location': 'Unknown - needs configuration'
-                })
-
             updated_channels.append(channel_info)
 
-        # Update config
-        config['channels'] = updated_channels
+        # A rescan that found the same channels leaves config.json untouched
+        if updated_channels == config.get('channels'):
+            logger.info(f"{facility} config unchanged: {len(updated_channels)} channels")
+            return config
 
-        # Save to file
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Copy so other users of the shared store never see a half-updated config
+        config = {**config, 'channels': updated_channels}
 
-        # Update cache
-        self._configs[facility] = config
+        # Save to file and update the shared cache
+        self.config_store.put(facility, config)
 
         logger.info(f"Updated {facility} config: {len(updated_channels)} channels")
 
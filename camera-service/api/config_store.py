@@ -0,0 +1,239 @@
+"""
+Shared store for facility camera configs
+Parses each warehouses/<facility>/cameras/config.json once per process and
+reloads it when the file changes on disk
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from threading import RLock
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import orjson  # optional: faster config.json parse/serialize
+except ImportError:
+    orjson = None
+
+try:
+    # optional: filesystem events instead of a stat() per lookup
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+def read_json(path: Path) -> Any:
+    """Parse a JSON file, using orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_json(path: Path, data: Any) -> None:
+    """
+    Write a JSON file with 2-space indent, using orjson when installed
+
+    Writes to a temporary file alongside the target and renames it into
+    place, so a crash or power loss mid-write never leaves a truncated file.
+    """
+    tmp_path = path.with_suffix('.json.tmp')
+    if orjson is not None:
+        tmp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _ConfigEventHandler(FileSystemEventHandler):
+    """Forwards edits to any facility's config.json to the store"""
+
+    def __init__(self, store: 'ConfigStore'):
+        super().__init__()
+        self._store = store
+
+    def on_any_event(self, event) -> None:
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if not path:
+                continue
+            path = Path(path)
+            if path.name == 'config.json' and path.parent.name == 'cameras':
+                self._store.invalidate(path.parent.parent.name)
+
+
+class ConfigStore:
+    """
+    Process-wide cache of parsed facility configs
+
+    Every CameraCapture (API, scanner, background jobs) pointed at the same
+    warehouses directory shares one store, so each config is parsed and held
+    once. With watchdog installed, file events drop stale entries and lookups
+    never touch the filesystem; without it, a lookup compares the file's
+    mtime against the cached copy at most once per check_interval seconds.
+    Subscribers are called with the facility
+    name whenever its config is reloaded, replaced or invalidated.
+    """
+
+    _instances: Dict[Path, 'ConfigStore'] = {}
+    _instances_lock = RLock()
+
+    def __init__(self, warehouses_path: Path, check_interval: float = 5.0):
+        """
+        Initialize config store
+
+        Args:
+            warehouses_path: Path to warehouses directory
+            check_interval: Seconds a cached config is trusted before its
+                mtime is checked again (when watchdog isn't available)
+        """
+        self.warehouses_path = Path(warehouses_path)
+        self.check_interval = check_interval
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._checked: Dict[str, float] = {}  # time.monotonic() of last mtime check
+        self._lock = RLock()
+        self._subscribers: List[Callable[[str], None]] = []
+        self._observer = None
+        self._start_watcher()
+
+    @classmethod
+    def shared(cls, warehouses_path: Path) -> 'ConfigStore':
+        """
+        Get the store for a warehouses directory, creating it on first use
+
+        Args:
+            warehouses_path: Path to warehouses directory
+
+        Returns:
+            ConfigStore shared by all callers using the same directory
+        """
+        key = Path(warehouses_path).resolve()
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls(key)
+                cls._instances[key] = store
+            return store
+
+    def config_path(self, facility: str) -> Path:
+        """Path to a facility's config.json"""
+        return self.warehouses_path / facility / "cameras" / "config.json"
+
+    def _start_watcher(self) -> None:
+        if Observer is None or not self.warehouses_path.is_dir():
+            return
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_ConfigEventHandler(self), str(self.warehouses_path), recursive=True)
+            observer.start()
+            self._observer = observer
+        except Exception as e:
+            logger.warning(f"Config watcher unavailable, falling back to mtime checks: {e}")
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """
+        Register a callback for config changes
+
+        Args:
+            callback: Called with the facility name after its config changes
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def _notify(self, facility: str) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(facility)
+            except Exception as e:
+                logger.error(f"Config change callback failed for {facility}: {e}")
+
+    def get(self, facility: str) -> Dict[str, Any]:
+        """
+        Get a facility's config, loading or reloading it as needed
+
+        Args:
+            facility: Facility name (e.g., "lodge")
+
+        Returns:
+            Camera configuration dictionary
+
+        Raises:
+            FileNotFoundError: If config doesn't exist
+        """
+        config = self._cache.get(facility)
+        if config is not None and (
+            self._observer is not None or
+            time.monotonic() - self._checked.get(facility, 0) < self.check_interval
+        ):
+            return config
+
+        with self._lock:
+            config_path = self.config_path(facility)
+            try:
+                mtime = config_path.stat().st_mtime
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Camera config not found: {config_path}")
+            self._checked[facility] = time.monotonic()
+
+            config = self._cache.get(facility)
+            if config is not None and self._mtimes.get(facility) == mtime:
+                return config
+
+            config = read_json(config_path)
+            self._cache[facility] = config
+            self._mtimes[facility] = mtime
+            logger.info(f"Loaded config for {facility}: {len(config['channels'])} cameras")
+
+        self._notify(facility)
+        return config
+
+    def put(self, facility: str, config: Dict[str, Any]) -> None:
+        """
+        Write a facility's config to disk and replace the cached copy
+
+        Args:
+            facility: Facility name
+            config: Camera configuration dictionary
+        """
+        with self._lock:
+            config_path = self.config_path(facility)
+            write_json(config_path, config)
+            self._cache[facility] = config
+            self._mtimes[facility] = config_path.stat().st_mtime
+            self._checked[facility] = time.monotonic()
+        self._notify(facility)
+
+    def invalidate(self, facility: str) -> None:
+        """
+        Drop a facility's cached config if the file changed since it was loaded
+
+        Args:
+            facility: Facility name
+        """
+        with self._lock:
+            if facility not in self._cache:
+                return
+            try:
+                mtime: Optional[float] = self.config_path(facility).stat().st_mtime
+            except OSError:
+                mtime = None
+            if mtime is not None and self._mtimes.get(facility) == mtime:
+                return  # Our own write, already cached
+            self._cache.pop(facility, None)
+            self._mtimes.pop(facility, None)
+        logger.info(f"Config for {facility} changed on disk")
+        self._notify(facility)
+
+    def close(self) -> None:
+        """Stop the filesystem watcher"""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
@@ -3,17 +3,28 @@ NVR Channel Scanner
 Discovers available camera channels on NVR by testing common channel patterns
 """
 
-import cv2
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple
 
+from capture import open_rtsp_stream
+
 logger = logging.getLogger(__name__)
 
 
 class NVRScanner:
     """Scans NVR for available camera channels"""
 
-    def __init__(self, nvr_ip: str, username: str = "admin", password: str = "", port: int = 554):
+    def __init__(
+        self,
+        nvr_ip: str,
+        username: str = "admin",
+        password: str = "",
+        port: int = 554,
+        max_workers: int = 32,
+        open_timeout: float = 3.0
+    ):
         """
         Initialize NVR scanner
 
@@ -22,42 +33,51 @@ class NVRScanner:
             username: RTSP username
             password: RTSP password
             port: RTSP port
+            max_workers: Number of channel paths tested concurrently
+            open_timeout: Seconds to wait on each RTSP connect/read
         """
         self.nvr_ip = nvr_ip
         self.username = username
         self.password = password
         self.port = port
+        self.max_workers = max_workers
+        self.open_timeout = open_timeout
 
-    def _generate_channel_patterns(self, max_channels: int = 32) -> List[str]:
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def _generate_channel_patterns(max_channels: int = 32) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
         """
-        Generate common NVR channel path patterns
+        Generate common NVR channel path patterns grouped by vendor family
+
+        Patterns only depend on max_channels, so they are built once per
+        value and shared between scans.
 
         Args:
             max_channels: Maximum number of channels to test
 
         Returns:
-            List of RTSP path patterns to test
+            Tuple of (family name, RTSP path patterns) pairs
         """
-        patterns = []
-
-        # Generic RTSP patterns (most common)
-        patterns.extend([f"ch{i:02d}/0" for i in range(1, max_channels + 1)])
+        channels = range(1, max_channels + 1)
 
-        # Hikvision NVR patterns
-        patterns.extend([f"Streaming/Channels/{i}01" for i in range(1, max_channels + 1)])  # Main stream
-        patterns.extend([f"Streaming/Channels/{i}02" for i in range(1, max_channels + 1)])  # Sub stream
+        return (
+            # Generic RTSP patterns (most common)
+            ('generic', tuple(f"ch{i:02d}/0" for i in channels)),
 
-        # Dahua NVR patterns
-        patterns.extend([f"cam/realmonitor?channel={i}&subtype=0" for i in range(1, max_channels + 1)])  # Main
-        patterns.extend([f"cam/realmonitor?channel={i}&subtype=1" for i in range(1, max_channels + 1)])  # Sub
+            # Hikvision NVR patterns (main stream, then sub stream)
+            ('hikvision', tuple(f"Streaming/Channels/{i}01" for i in channels) +
+                          tuple(f"Streaming/Channels/{i}02" for i in channels)),
 
-        # Alternative patterns
-        patterns.extend([f"rtsp/streaming?channel={i}&subtype=0" for i in range(1, max_channels + 1)])
-        patterns.extend([f"channel{i}" for i in range(1, max_channels + 1)])
-        patterns.extend([f"live/ch{i:02d}" for i in range(1, max_channels + 1)])
-        patterns.extend([f"stream{i}" for i in range(1, max_channels + 1)])
+            # Dahua NVR patterns (main stream, then sub stream)
+            ('dahua', tuple(f"cam/realmonitor?channel={i}&subtype=0" for i in channels) +
+                      tuple(f"cam/realmonitor?channel={i}&subtype=1" for i in channels)),
 
-        return patterns
+            # Alternative patterns
+            ('rtsp-streaming', tuple(f"rtsp/streaming?channel={i}&subtype=0" for i in channels)),
+            ('channel', tuple(f"channel{i}" for i in channels)),
+            ('live', tuple(f"live/ch{i:02d}" for i in channels)),
+            ('stream', tuple(f"stream{i}" for i in channels)),
+        )
 
     def _test_channel(self, path: str) -> Tuple[bool, int, int]:
         """
@@ -72,8 +92,7 @@ class NVRScanner:
         url = f"rtsp://{self.username}:{self.password}@{self.nvr_ip}:{self.port}/{path}"
 
         try:
-            cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            cap = open_rtsp_stream(url, timeout=self.open_timeout)
 
             if cap.isOpened():
                 ret, frame = cap.read()
@@ -89,6 +108,36 @@ class NVRScanner:
 
         return False, 0, 0
 
+    def _test_paths(self, paths: List[str], on_result=None) -> Dict[str, Tuple[bool, int, int]]:
+        """
+        Test many channel paths concurrently
+
+        Each test is dominated by network waits and OpenCV releases the GIL
+        inside FFmpeg, so a thread pool overlaps the RTSP handshakes.
+
+        Args:
+            paths: RTSP paths to test
+            on_result: Optional callback(result) as each test completes
+
+        Returns:
+            Dict mapping path to (success, width, height)
+        """
+        results = {}
+        if not paths:
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as executor:
+            futures = {executor.submit(self._test_channel, path): path for path in paths}
+
+            for future in as_completed(futures):
+                path = futures[future]
+                result = future.result()
+                results[path] = result
+                if on_result:
+                    on_result(result)
+
+        return results
+
     def scan(self, max_channels: int = 32, progress_callback=None) -> List[Dict[str, Any]]:
         """
         Scan NVR for available channels
@@ -102,17 +151,45 @@ class NVRScanner:
         """
         logger.info(f"Scanning NVR {self.nvr_ip} for channels...")
 
-        patterns = self._generate_channel_patterns(max_channels)
-        found_channels = []
-        tested = 0
+        families = self._generate_channel_patterns(max_channels)
 
-        for path in patterns:
-            tested += 1
+        # Progress is reported against every generated pattern, as when each
+        # one was tested in turn; families that are never expanded count as
+        # tested once the scan finishes
+        total = sum(len(paths) for _, paths in families)
+        tested = found = 0
 
+        def on_result(result):
+            nonlocal tested, found
+            tested += 1
+            if result[0]:
+                found += 1
             if progress_callback:
-                progress_callback(tested, len(patterns), len(found_channels))
+                progress_callback(tested, total, found)
+
+        # Probe channel 1 of every family first, then expand only the
+        # families the NVR actually answers to
+        results = self._test_paths([paths[0] for _, paths in families if paths], on_result)
+        matched = [(name, paths) for name, paths in families if paths and results[paths[0]][0]]
+
+        if matched:
+            logger.info(f"NVR matches pattern families: {', '.join(name for name, _ in matched)}")
+        else:
+            # Channel 1 may simply be unused, fall back to everything
+            logger.info("No pattern family answered its probe, testing all patterns")
+            matched = families
+
+        patterns = [path for _, paths in matched for path in paths]
+        remaining = [path for path in patterns if path not in results]
+        results.update(self._test_paths(remaining, on_result))
+        if progress_callback and tested < total:
+            progress_callback(total, total, found)
 
-            success, width, height = self._test_channel(path)
+        found_channels = []
+
+        # Report in pattern order regardless of completion order
+        for path in patterns:
+            success, width, height = results[path]
 
             if success:
                 channel_info = {
@@ -143,11 +220,12 @@ class NVRScanner:
 
         logger.info(f"Quick scanning NVR {self.nvr_ip}...")
 
+        paths = {channel_num: f"ch{channel_num:02d}/0" for channel_num in channels_to_test}
+        results = self._test_paths(list(paths.values()))
         found_channels = []
 
-        for channel_num in channels_to_test:
-            path = f"ch{channel_num:02d}/0"
-            success, width, height = self._test_channel(path)
+        for channel_num, path in paths.items():
+            success, width, height = results[path]
 
             if success:
                 channel_info = {
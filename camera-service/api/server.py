@@ -7,13 +7,33 @@ Port: 8001
 Provides camera images to agents, web apps, and other services
 """
 
+import os
 import sys
+import json
+import hashlib
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, List
-import base64
+from typing import Optional, Dict, List, Tuple
 
-from fastapi import FastAPI, HTTPException, Response, Query
+try:
+    from pybase64 import b64encode  # optional: SIMD base64, same API as stdlib
+except ImportError:
+    from base64 import b64encode
+
+from fastapi import FastAPI, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson  # optional: much faster encoding of the large base64 JSON bodies
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+    dumps = orjson.dumps
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
@@ -32,6 +52,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ============================================================================
+# GLOBAL STATE
+# ============================================================================
+
+# Created per worker process in lifespan(), not at import, so the parent
+# process that spawns CAMERA_SERVICE_WORKERS workers doesn't build (and hold
+# RTSP streams and cache memory for) a copy it never serves from
+camera_capture: Optional[CameraCapture] = None
+image_cache: Optional[ImageCache] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize camera capture and cache for this worker, close them on shutdown"""
+    global camera_capture, image_cache
+
+    camera_capture = CameraCapture(warehouses_path="../warehouses")
+    image_cache = ImageCache(
+        default_ttl=30,  # 30 second cache
+        enable_reaper=True,
+        arena_bytes=256 * 1024 * 1024,  # Lazily committed, only touched pages use RAM
+        max_bytes=512 * 1024 * 1024  # LRU-evict beyond this, arena plus heap fallback
+    )
+
+    # Keep /latest a pure cache hit for these facilities
+    prefetch = [f for f in os.environ.get("CAMERA_PREFETCH_FACILITIES", "").split(",") if f.strip()]
+    refreshers = [asyncio.create_task(refresh_loop(facility.strip())) for facility in prefetch]
+
+    yield
+
+    for task in refreshers:
+        task.cancel()
+    camera_capture.close()
+    image_cache.close()
+
+async def refresh_loop(facility: str) -> None:
+    """
+    Recapture every camera in a facility every half TTL
+
+    Frames are replaced well before they expire, so /latest never has to
+    capture inline and clients never line up behind an expired entry.
+
+    Args:
+        facility: Facility name
+    """
+    interval = max(image_cache.default_ttl / 2, 1)
+    logger.info(f"Prefetching {facility} every {interval:.0f}s")
+
+    while True:
+        started = asyncio.get_running_loop().time()
+        try:
+            async for camera_id, image_data in camera_capture.capture_all_iter(facility, timeout=interval):
+                if image_data:
+                    image_cache.set(f"{facility}/{camera_id}", image_data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Prefetch failed for {facility}: {e}")
+
+        await asyncio.sleep(max(interval - (asyncio.get_running_loop().time() - started), 0))
+
 # ============================================================================
 # FASTAPI APPLICATION
 # ============================================================================
@@ -39,7 +119,9 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Camera Capture Service",
     description="Warehouse camera access and image delivery API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=DefaultResponse
 )
 
 # CORS middleware
@@ -51,14 +133,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ============================================================================
-# GLOBAL STATE
-# ============================================================================
-
-# Initialize camera capture and cache
-camera_capture = CameraCapture(warehouses_path="../warehouses")
-image_cache = ImageCache(default_ttl=30)  # 30 second cache
-
 # ============================================================================
 # MODELS
 # ============================================================================
@@ -102,12 +176,85 @@ class ScanResponse(BaseModel):
     channels_found: int
     channels: List[ChannelInfo]
 
+class JPEGResponse(Response):
+    """
+    JPEG response that accepts a memoryview body
+
+    Cache hits are memoryviews into the cache arena, whose slots are reused
+    once an entry is replaced. The transport may queue an unsent view
+    without copying (Python 3.12+), so a slow client could receive another
+    image under the old ETag; the body is copied to bytes here instead.
+    """
+    media_type = "image/jpeg"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, memoryview):
+            return bytes(content)
+        return super().render(content)
+
+def cached_b64(cache_key: str, image_data) -> str:
+    """
+    Base64 a frame, reusing the encoding stored with its cache entry
+
+    Args:
+        cache_key: Cache key the frame may be stored under
+        image_data: JPEG bytes or memoryview
+    """
+    encoded = image_cache.get_b64(cache_key, image_data)
+    if encoded is None:
+        encoded = b64encode(image_data).decode('ascii')
+        image_cache.set_b64(cache_key, image_data, encoded)
+    return encoded
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names etag, allowing comma-separated lists and W/ weak tags"""
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+MULTIPART_BOUNDARY = "camera-frame"
+
+# Lets browsers and proxies reuse a /latest frame briefly before revalidating
+LATEST_CACHE_CONTROL = "max-age=5"
+
+def multipart_jpeg_response(frames: dict) -> StreamingResponse:
+    """
+    Stream captured frames as multipart/mixed with one raw JPEG per part
+
+    Avoids base64 (33% larger, CPU-bound to encode) for batch clients that
+    can parse multipart. Each part carries an X-Camera-Id header; cameras
+    that failed to capture are listed in the X-Failed-Cameras header.
+
+    Args:
+        frames: Dict of camera_id -> JPEG bytes (or None on failure)
+    """
+    failed = [camera_id for camera_id, image_data in frames.items() if not image_data]
+
+    async def parts():
+        for camera_id, image_data in frames.items():
+            if not image_data:
+                continue
+            yield (
+                f"--{MULTIPART_BOUNDARY}\r\n"
+                f"Content-Type: image/jpeg\r\n"
+                f"Content-Length: {len(image_data)}\r\n"
+                f"X-Camera-Id: {camera_id}\r\n\r\n"
+            ).encode('ascii')
+            yield bytes(image_data)
+            yield b"\r\n"
+        yield f"--{MULTIPART_BOUNDARY}--\r\n".encode('ascii')
+
+    return StreamingResponse(
+        parts(),
+        media_type=f"multipart/mixed; boundary={MULTIPART_BOUNDARY}",
+        headers={"X-Failed-Cameras": ",".join(failed)}
+    )
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
 
 @app.get("/")
-def root():
+async def root():
     """Root endpoint"""
     return {
         "service": "Camera Capture Service",
@@ -116,8 +263,11 @@ def root():
         "docs": "/docs"
     }
 
-@app.get("/api/health", response_model=HealthStatus)
-def health_check(facility: str = Query("lodge", description="Facility to check")):
+# HealthStatus / ScanResponse below are documented in OpenAPI via responses=
+# rather than response_model=, so responses are returned as-is instead of
+# being validated and re-serialized through pydantic on every request
+@app.get("/api/health", responses={200: {"model": HealthStatus}})
+async def health_check(facility: str = Query("lodge", description="Facility to check")):
     """
     Health check endpoint
 
@@ -125,7 +275,7 @@ def health_check(facility: str = Query("lodge", description="Facility to check")
         facility: Facility name to check NVR connectivity
     """
     try:
-        nvr_status = camera_capture.check_nvr_connectivity(facility)
+        nvr_status = await camera_capture.check_nvr_connectivity_async(facility)
     except Exception as e:
         logger.error(f"Error checking NVR: {e}")
         nvr_status = {"error": str(e)}
@@ -137,21 +287,40 @@ def health_check(facility: str = Query("lodge", description="Facility to check")
         "nvr_connectivity": nvr_status
     }
 
+# facility -> (camera list it was rendered from, JSON body, ETag). The list
+# object is replaced whenever the config changes, so identity is the version.
+camera_list_bodies: Dict[str, Tuple[list, bytes, str]] = {}
+
 @app.get("/api/cameras/{facility}")
-def list_cameras(facility: str):
+async def list_cameras(request: Request, facility: str):
     """
     List all cameras for a facility
 
+    The JSON body is rendered once per config version and answers a
+    matching If-None-Match with 304.
+
     Args:
+        request: Incoming request (for If-None-Match)
         facility: Facility name (e.g., "lodge")
     """
     try:
+        # Served from the shared config store, cheaper inline than on a thread
         cameras = camera_capture.list_cameras(facility)
-        return {
-            "facility": facility,
-            "count": len(cameras),
-            "cameras": cameras
-        }
+
+        rendered = camera_list_bodies.get(facility)
+        if rendered is None or rendered[0] is not cameras:
+            body = dumps({
+                "facility": facility,
+                "count": len(cameras),
+                "cameras": cameras
+            })
+            rendered = (cameras, body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+            camera_list_bodies[facility] = rendered
+
+        _, body, etag = rendered
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -159,7 +328,7 @@ def list_cameras(facility: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/cameras/{facility}/{camera_id}/info")
-def get_camera_info(facility: str, camera_id: str):
+async def get_camera_info(facility: str, camera_id: str):
     """
     Get camera information
 
@@ -181,8 +350,43 @@ def get_camera_info(facility: str, camera_id: str):
         logger.error(f"Error getting camera info: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# cache_key -> capture task for misses currently being filled
+inflight_captures: Dict[str, asyncio.Task] = {}
+
+async def capture_and_cache(facility: str, camera_id: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Capture a camera and cache the frame, single-flighted per camera
+
+    Concurrent cache misses for the same camera share one NVR capture
+    instead of each starting their own. The capture runs as its own task,
+    so a client disconnecting doesn't cancel it for the others.
+
+    Args:
+        facility: Facility name
+        camera_id: ModelT camera ID
+
+    Returns:
+        (JPEG bytes, ETag), or (None, None) if the capture failed
+    """
+    cache_key = f"{facility}/{camera_id}"
+    task = inflight_captures.get(cache_key)
+
+    if task is None:
+        async def capture():
+            image_data = await camera_capture.capture_camera_async(facility, camera_id)
+            if not image_data:
+                return None, None
+            return image_data, image_cache.set(cache_key, image_data)
+
+        task = asyncio.create_task(capture())
+        inflight_captures[cache_key] = task
+        task.add_done_callback(lambda _: inflight_captures.pop(cache_key, None))
+
+    return await asyncio.shield(task)
+
 @app.get("/api/cameras/{facility}/{camera_id}/latest")
-def get_latest_frame(
+async def get_latest_frame(
+    request: Request,
     facility: str,
     camera_id: str,
     format: str = Query("image", description="Response format: 'image' or 'base64'")
@@ -190,7 +394,11 @@ def get_latest_frame(
     """
     Get latest cached frame (fast, no NVR hit if cached)
 
+    Image responses carry an ETag; a client that sends it back in
+    If-None-Match gets a bodyless 304 while the frame is unchanged.
+
     Args:
+        request: Incoming request (for If-None-Match)
         facility: Facility name
         camera_id: ModelT camera ID
         format: 'image' returns JPEG, 'base64' returns JSON with base64 string
@@ -198,12 +406,14 @@ def get_latest_frame(
     cache_key = f"{facility}/{camera_id}"
 
     # Try cache first
-    image_data = image_cache.get(cache_key)
+    cached = image_cache.get_with_etag(cache_key)
 
-    if not image_data:
-        # Cache miss - capture new frame
+    if cached:
+        image_data, etag = cached
+    else:
+        # Cache miss - capture new frame (shared with concurrent misses)
         logger.info(f"Cache miss for {cache_key}, capturing fresh frame")
-        image_data = camera_capture.capture_camera(facility, camera_id)
+        image_data, etag = await capture_and_cache(facility, camera_id)
 
         if not image_data:
             raise HTTPException(
@@ -211,25 +421,29 @@ def get_latest_frame(
                 detail=f"Failed to capture from camera '{camera_id}'"
             )
 
-        # Cache it
-        image_cache.set(cache_key, image_data)
-
     if format == "base64":
         return {
             "facility": facility,
             "camera_id": camera_id,
-            "image": base64.b64encode(image_data).decode('utf-8'),
+            "image": cached_b64(cache_key, image_data),
             "format": "jpeg"
         }
     else:
-        return Response(content=image_data, media_type="image/jpeg")
+        headers = {"ETag": etag, "Cache-Control": LATEST_CACHE_CONTROL}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        # Cache hits are a memoryview into the cache arena; JPEGResponse copies it
+        return JPEGResponse(content=image_data, headers=headers)
 
 @app.get("/api/cameras/{facility}/{camera_id}/capture")
-def capture_live_frame(
+async def capture_live_frame(
     facility: str,
     camera_id: str,
     format: str = Query("image", description="Response format: 'image' or 'base64'"),
-    refresh_cache: bool = Query(True, description="Update cache with new frame")
+    refresh_cache: bool = Query(True, description="Update cache with new frame"),
+    quality: Optional[int] = Query(None, ge=1, le=100, description="JPEG quality (default: camera setting or 85)"),
+    width: Optional[int] = Query(None, ge=16, description="Downscale to this width, keeping aspect (default: full resolution)")
 ):
     """
     Capture live frame from camera (always hits NVR)
@@ -238,9 +452,11 @@ def capture_live_frame(
         facility: Facility name
         camera_id: ModelT camera ID
         format: 'image' returns JPEG, 'base64' returns JSON with base64 string
-        refresh_cache: Whether to update cache with new frame
+        refresh_cache: Whether to update cache with new frame (full-resolution captures only)
+        quality: JPEG quality override
+        width: Downscale before encoding, for clients that don't need every pixel
     """
-    image_data = camera_capture.capture_camera(facility, camera_id)
+    image_data = await camera_capture.capture_camera_async(facility, camera_id, quality, width)
 
     if not image_data:
         raise HTTPException(
@@ -248,8 +464,9 @@ def capture_live_frame(
             detail=f"Failed to capture from camera '{camera_id}'"
         )
 
-    # Update cache if requested
-    if refresh_cache:
+    # Update cache if requested; a downscaled frame never replaces the
+    # full-resolution one that /latest serves
+    if refresh_cache and width is None:
         cache_key = f"{facility}/{camera_id}"
         image_cache.set(cache_key, image_data)
 
@@ -257,47 +474,60 @@ def capture_live_frame(
         return {
             "facility": facility,
             "camera_id": camera_id,
-            "image": base64.b64encode(image_data).decode('utf-8'),
+            "image": cached_b64(f"{facility}/{camera_id}", image_data),
             "format": "jpeg"
         }
     else:
-        return Response(content=image_data, media_type="image/jpeg")
+        return JPEGResponse(content=image_data)
 
 @app.post("/api/cameras/{facility}/batch")
-def capture_batch(facility: str, request: BatchCaptureRequest):
+async def capture_batch(
+    facility: str,
+    request: BatchCaptureRequest,
+    format: str = Query("json", description="Response format: 'json' (base64 images) or 'multipart' (raw JPEG parts)")
+):
     """
     Capture frames from multiple cameras
 
     Args:
         facility: Facility name
         request: Batch capture request with camera IDs
+        format: 'json' returns base64 images, 'multipart' returns multipart/mixed JPEGs
     """
-    results = {}
-
-    for camera_id in request.camera_ids:
+    async def capture_one(camera_id: str):
         cache_key = f"{facility}/{camera_id}"
 
         # Use cache if requested
         if request.use_cache:
             image_data = image_cache.get(cache_key)
             if image_data:
-                results[camera_id] = {
-                    "success": True,
-                    "cached": True,
-                    "image": base64.b64encode(image_data).decode('utf-8')
-                }
-                continue
+                return camera_id, image_data, True
+
+            # Miss - join any capture of this camera already in flight
+            image_data, _ = await capture_and_cache(facility, camera_id)
+            return camera_id, image_data, False
 
         # Capture fresh
-        image_data = camera_capture.capture_camera(facility, camera_id)
+        image_data = await camera_capture.capture_camera_async(facility, camera_id)
 
         if image_data:
             # Cache it
             image_cache.set(cache_key, image_data)
+        return camera_id, image_data, False
+
+    # Cameras are independent, so the batch takes as long as the slowest one
+    captured = await asyncio.gather(*(capture_one(cid) for cid in request.camera_ids))
+
+    if format == "multipart":
+        return multipart_jpeg_response({camera_id: image_data for camera_id, image_data, _ in captured})
+
+    results = {}
+    for camera_id, image_data, cached in captured:
+        if image_data:
             results[camera_id] = {
                 "success": True,
-                "cached": False,
-                "image": base64.b64encode(image_data).decode('utf-8')
+                "cached": cached,
+                "image": cached_b64(f"{facility}/{camera_id}", image_data)
             }
         else:
             results[camera_id] = {
@@ -312,27 +542,52 @@ def capture_batch(facility: str, request: BatchCaptureRequest):
         "results": results
     }
 
+async def capture_all_ndjson(facility: str):
+    """Yield one NDJSON line per camera as its capture completes"""
+    async for camera_id, image_data in camera_capture.capture_all_iter(facility):
+        if image_data:
+            cache_key = f"{facility}/{camera_id}"
+            image_cache.set(cache_key, image_data)
+            line = {"camera_id": camera_id, "success": True, "image": cached_b64(cache_key, image_data)}
+        else:
+            line = {"camera_id": camera_id, "success": False, "error": "Failed to capture"}
+        yield dumps(line) + b"\n"
+
 @app.post("/api/cameras/{facility}/capture-all")
-def capture_all_cameras(facility: str):
+async def capture_all_cameras(
+    facility: str,
+    format: str = Query("json", description="Response format: 'json' (base64 images), 'ndjson' (one line per camera as it completes) or 'multipart' (raw JPEG parts)")
+):
     """
     Capture frames from all cameras in facility
 
     Args:
         facility: Facility name
+        format: 'json' returns base64 images, 'ndjson' streams one JSON line
+            per camera in completion order, 'multipart' returns
+            multipart/mixed JPEGs
     """
     try:
-        all_frames = camera_capture.capture_all(facility)
+        if format == "ndjson":
+            camera_capture.load_config(facility)  # Fail before the response starts
+            return StreamingResponse(capture_all_ndjson(facility), media_type="application/x-ndjson")
+
+        all_frames = await camera_capture.capture_all_async(facility)
 
-        results = {}
         for camera_id, image_data in all_frames.items():
             if image_data:
                 # Cache it
-                cache_key = f"{facility}/{camera_id}"
-                image_cache.set(cache_key, image_data)
+                image_cache.set(f"{facility}/{camera_id}", image_data)
 
+        if format == "multipart":
+            return multipart_jpeg_response(all_frames)
+
+        results = {}
+        for camera_id, image_data in all_frames.items():
+            if image_data:
                 results[camera_id] = {
                     "success": True,
-                    "image": base64.b64encode(image_data).decode('utf-8')
+                    "image": cached_b64(f"{facility}/{camera_id}", image_data)
                 }
             else:
                 results[camera_id] = {
@@ -354,8 +609,8 @@ def capture_all_cameras(facility: str):
         logger.error(f"Error capturing all cameras: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/scan", response_model=ScanResponse)
-def scan_nvr(request: ScanRequest):
+@app.post("/api/scan", responses={200: {"model": ScanResponse}})
+async def scan_nvr(request: ScanRequest):
     """
     Scan NVR for available camera channels
 
@@ -373,14 +628,20 @@ def scan_nvr(request: ScanRequest):
             port=request.port
         )
 
+        # Scans block on RTSP probes for seconds to minutes, keep them off the event loop
         if request.quick:
             # Quick scan using common pattern (ch01/0, ch02/0, etc.)
-            channels = scanner.quick_scan(
+            channels = await asyncio.to_thread(
+                scanner.quick_scan,
                 channels_to_test=list(range(1, request.max_channels + 1))
             )
         else:
             # Full scan testing all patterns
-            channels = scanner.scan(max_channels=request.max_channels)
+            channels = await asyncio.to_thread(scanner.scan, max_channels=request.max_channels)
+
+        # Full scans don't know channel numbers, keep the ChannelInfo shape
+        for channel in channels:
+            channel.setdefault('channel', None)
 
         return {
             "nvr_ip": request.nvr_ip,
@@ -393,7 +654,7 @@ def scan_nvr(request: ScanRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/cameras/{facility}/scan-and-update")
-def scan_and_update_facility(
+async def scan_and_update_facility(
     facility: str,
     quick: bool = Query(True, description="Use quick scan (common patterns only)"),
     max_channels: int = Query(32, description="Maximum channels to test"),
@@ -425,11 +686,12 @@ def scan_and_update_facility(
         )
 
         if quick:
-            channels = scanner.quick_scan(
+            channels = await asyncio.to_thread(
+                scanner.quick_scan,
                 channels_to_test=list(range(1, max_channels + 1))
             )
         else:
-            channels = scanner.scan(max_channels=max_channels)
+            channels = await asyncio.to_thread(scanner.scan, max_channels=max_channels)
 
         if not channels:
             raise HTTPException(
@@ -438,7 +700,8 @@ def scan_and_update_facility(
             )
 
         # Update config with scanned channels
-        updated_config = camera_capture.update_channels_from_scan(
+        updated_config = await asyncio.to_thread(
+            camera_capture.update_channels_from_scan,
             facility=facility,
             scanned_channels=channels,
             preserve_modelt_info=preserve_modelt_info
@@ -460,7 +723,7 @@ def scan_and_update_facility(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/cache/{facility}/{camera_id}")
-def invalidate_cache(facility: str, camera_id: str):
+async def invalidate_cache(facility: str, camera_id: str):
     """
     Invalidate cached image for specific camera
 
@@ -479,7 +742,7 @@ def invalidate_cache(facility: str, camera_id: str):
     }
 
 @app.delete("/api/cache")
-def clear_cache():
+async def clear_cache():
     """Clear entire image cache"""
     image_cache.clear()
     return {
@@ -492,17 +755,27 @@ def clear_cache():
 # ============================================================================
 
 if __name__ == "__main__":
+    # Each worker has its own cache and RTSP streams (one NVR connection per
+    # camera per worker), so raise this with the NVR's stream limit in mind
+    workers = int(os.environ.get("CAMERA_SERVICE_WORKERS", "1"))
+
     print("="*70)
     print("  Camera Capture Service")
     print("="*70)
     print("  Port: 8001")
+    print(f"  Workers: {workers}")
     print("  Docs: http://localhost:8001/docs")
     print("="*70)
     print()
 
+    # loop/http "auto" pick uvloop and httptools when installed
     uvicorn.run(
-        app,
+        "server:app",
+        app_dir=str(Path(__file__).parent),
         host="0.0.0.0",
         port=8001,
+        workers=workers,
+        loop="auto",
+        http="auto",
         log_level="info"
     )
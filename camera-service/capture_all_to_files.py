@@ -4,15 +4,21 @@ Capture all cameras to individual image files
 Helps identify which camera corresponds to which channel/location
 """
 
-import requests
+import asyncio
 import os
 from pathlib import Path
 from datetime import datetime
 
+import httpx
+
 # API base URL
 BASE_URL = "http://localhost:8001"
 
-def capture_all_cameras_to_files(facility="lodge", output_dir="camera_captures"):
+# Captures in flight at once; the NVR handles a few parallel streams well
+# but each one is a full RTSP session
+MAX_CONCURRENT_CAPTURES = 8
+
+async def capture_all_cameras_to_files(facility="lodge", output_dir="camera_captures"):
     """Capture all cameras and save to individual files"""
 
     # Create output directory
@@ -31,59 +37,73 @@ def capture_all_cameras_to_files(facility="lodge", output_dir="camera_captures")
     print(f"Output:   {session_dir.absolute()}")
     print("="*70)
 
-    # Get camera list
-    print("\nFetching camera list...")
-    response = requests.get(f"{BASE_URL}/api/cameras/{facility}")
-
-    if response.status_code != 200:
-        print(f"✗ Error getting camera list: {response.status_code}")
-        return
-
-    cameras_data = response.json()
-    cameras = cameras_data['cameras']
-    total = len(cameras)
-
-    print(f"Found {total} cameras")
-    print("\nCapturing images...\n")
-
-    successful = 0
-    failed = 0
-
-    for idx, camera in enumerate(cameras, 1):
-        camera_id = camera['id']
-        camera_name = camera['name']
-        channel = camera['channel']
-        resolution = camera['resolution']
-
-        # Create filename
-        filename = f"ch{channel:02d}_{camera_id}_{camera_name.replace(' ', '_')}.jpg"
-        filepath = session_dir / filename
-
-        print(f"[{idx}/{total}] Ch{channel:02d}: {camera_name:20s} ({camera_id:15s}) {resolution:12s} ... ", end="", flush=True)
-
-        try:
-            # Capture image
-            img_response = requests.get(
-                f"{BASE_URL}/api/cameras/{facility}/{camera_id}/capture",
-                params={"format": "image", "refresh_cache": True},
-                timeout=10
-            )
-
-            if img_response.status_code == 200:
-                # Save to file
-                with open(filepath, 'wb') as f:
-                    f.write(img_response.content)
-
-                file_size = len(img_response.content) / 1024  # KB
-                print(f"OK ({file_size:.1f} KB)")
-                successful += 1
-            else:
-                print(f"FAIL HTTP {img_response.status_code}")
-                failed += 1
-
-        except Exception as e:
-            print(f"FAIL {str(e)}")
-            failed += 1
+    # One client for the whole run, with a keep-alive pool large enough that
+    # every concurrent capture reuses a connection instead of reconnecting
+    limits = httpx.Limits(
+        max_connections=MAX_CONCURRENT_CAPTURES,
+        max_keepalive_connections=MAX_CONCURRENT_CAPTURES
+    )
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=10, limits=limits) as client:
+        # Get camera list
+        print("\nFetching camera list...")
+        response = await client.get(f"/api/cameras/{facility}")
+
+        if response.status_code != 200:
+            print(f"✗ Error getting camera list: {response.status_code}")
+            return
+
+        cameras_data = response.json()
+        cameras = cameras_data['cameras']
+        total = len(cameras)
+
+        print(f"Found {total} cameras")
+        print("\nCapturing images...\n")
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CAPTURES)
+        completed = 0
+
+        async def capture_one(camera):
+            nonlocal completed
+            camera_id = camera['id']
+            camera_name = camera['name']
+            channel = camera['channel']
+            resolution = camera['resolution']
+
+            # Create filename
+            filename = f"ch{channel:02d}_{camera_id}_{camera_name.replace(' ', '_')}.jpg"
+            filepath = session_dir / filename
+
+            try:
+                # Capture image
+                async with semaphore:
+                    img_response = await client.get(
+                        f"/api/cameras/{facility}/{camera_id}/capture",
+                        params={"format": "image", "refresh_cache": True},
+                        headers={"Accept": "image/jpeg"}
+                    )
+
+                if img_response.status_code == 200:
+                    # Save to file on a worker thread so the write overlaps
+                    # with the other captures still in flight
+                    await asyncio.to_thread(filepath.write_bytes, img_response.content)
+
+                    file_size = len(img_response.content) / 1024  # KB
+                    status, ok = f"OK ({file_size:.1f} KB)", True
+                else:
+                    status, ok = f"FAIL HTTP {img_response.status_code}", False
+
+            except Exception as e:
+                status, ok = f"FAIL {str(e)}", False
+
+            # Results print in completion order
+            completed += 1
+            print(f"[{completed}/{total}] Ch{channel:02d}: {camera_name:20s} ({camera_id:15s}) {resolution:12s} ... {status}")
+            return ok
+
+        results = await asyncio.gather(*(capture_one(camera) for camera in cameras))
+
+    successful = sum(results)
+    failed = total - successful
 
     # Summary
     print("\n" + "="*70)
@@ -100,10 +120,36 @@ def capture_all_cameras_to_files(facility="lodge", output_dir="camera_captures")
     print(f"\nView in browser: file:///{session_dir.absolute()}/index.html")
     print("="*70)
 
+def camera_card_html(camera):
+    """Render one camera's card for the HTML index"""
+    camera_id = camera['id']
+    camera_name = camera['name']
+    channel = camera['channel']
+    resolution = camera['resolution']
+    location = camera['location']
+
+    # Determine if needs configuration
+    needs_config = "needs configuration" in location.lower()
+    css_class = "needs-config" if needs_config else "configured"
+
+    filename = f"ch{channel:02d}_{camera_id}_{camera_name.replace(' ', '_')}.jpg"
+
+    return f"""
+        <div class="camera {css_class}">
+            <h3>Channel {channel}: {camera_name}</h3>
+            <div class="details">
+                <strong>ID:</strong> {camera_id}<br>
+                <strong>Resolution:</strong> {resolution}<br>
+                <strong>Location:</strong> {location}
+            </div>
+            <img src="{filename}" alt="Camera {channel}">
+        </div>
+"""
+
 def create_html_index(output_dir, cameras, facility):
     """Create an HTML index page to view all cameras"""
 
-    html = f"""<!DOCTYPE html>
+    header = f"""<!DOCTYPE html>
 <html>
 <head>
     <title>Camera Capture - {facility}</title>
@@ -170,41 +216,18 @@ def create_html_index(output_dir, cameras, facility):
     <div class="grid">
 """
 
-    for camera in cameras:
-        camera_id = camera['id']
-        camera_name = camera['name']
-        channel = camera['channel']
-        resolution = camera['resolution']
-        location = camera['location']
-
-        # Determine if needs configuration
-        needs_config = "needs configuration" in location.lower()
-        css_class = "needs-config" if needs_config else "configured"
-
-        filename = f"ch{channel:02d}_{camera_id}_{camera_name.replace(' ', '_')}.jpg"
-
-        html += f"""
-        <div class="camera {css_class}">
-            <h3>Channel {channel}: {camera_name}</h3>
-            <div class="details">
-                <strong>ID:</strong> {camera_id}<br>
-                <strong>Resolution:</strong> {resolution}<br>
-                <strong>Location:</strong> {location}
-            </div>
-            <img src="{filename}" alt="Camera {channel}">
-        </div>
-"""
-
-    html += """
+    footer = """
     </div>
 </body>
 </html>
 """
 
+    html = "".join([header, *(camera_card_html(camera) for camera in cameras), footer])
+
     # Write HTML file
     html_path = output_dir / "index.html"
     with open(html_path, 'w') as f:
         f.write(html)
 
 if __name__ == "__main__":
-    capture_all_cameras_to_files("lodge")
+    asyncio.run(capture_all_cameras_to_files("lodge"))
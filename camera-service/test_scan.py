@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
 """
-Test NVR scanning endpoint
+Test NVR scanning endpoints
+Runs a plain scan (results saved to scanned_channels.json), then
+scan-and-update, which rewrites the facility's config.json
+
+Usage: python test_scan.py [facility]
 """
 
-import requests
 import json
+import sys
+
+import requests
+
+try:
+    import orjson  # optional: faster result serialization
+except ImportError:
+    orjson = None
+
+# API base URL
+BASE_URL = "http://localhost:8001"
+
+# One keep-alive connection for every call instead of a new TCP
+# connection per request
+SESSION = requests.Session()
 
 # Scan request
 scan_request = {
@@ -16,42 +34,115 @@ scan_request = {
     "quick": True  # Quick scan (faster)
 }
 
-print("="*70)
-print("SCANNING NVR FOR CAMERAS")
-print("="*70)
-print(f"NVR IP: {scan_request['nvr_ip']}")
-print(f"Scan mode: {'Quick' if scan_request['quick'] else 'Full'}")
-print()
 
-# Call scan endpoint
-response = requests.post(
-    'http://localhost:8001/api/scan',
-    json=scan_request
-)
-
-if response.status_code == 200:
-    result = response.json()
+def test_regular_scan():
+    """Scan the NVR without touching config.json and save the results"""
 
     print("="*70)
-    print("SCAN RESULTS")
+    print("SCANNING NVR FOR CAMERAS")
     print("="*70)
-    print(f"Channels found: {result['channels_found']}")
+    print(f"NVR IP: {scan_request['nvr_ip']}")
+    print(f"Scan mode: {'Quick' if scan_request['quick'] else 'Full'}")
     print()
 
-    for i, channel in enumerate(result['channels'], 1):
-        print(f"Channel {i}:")
-        print(f"  Path: {channel['path']}")
-        print(f"  Resolution: {channel['resolution']}")
-        if 'channel' in channel and channel['channel']:
-            print(f"  Channel #: {channel['channel']}")
+    # Call scan endpoint
+    response = SESSION.post(f"{BASE_URL}/api/scan", json=scan_request)
+
+    if response.status_code == 200:
+        result = response.json()
+
+        print("="*70)
+        print("SCAN RESULTS")
+        print("="*70)
+        print(f"Channels found: {result['channels_found']}")
+        print("(Note: These results are NOT saved to config.json)")
         print()
 
-    # Save to file
-    with open('scanned_channels.json', 'w') as f:
-        json.dump(result, f, indent=2)
+        for i, channel in enumerate(result['channels'], 1):
+            print(f"Channel {i}:")
+            print(f"  Path: {channel['path']}")
+            print(f"  Resolution: {channel['resolution']}")
+            if 'channel' in channel and channel['channel']:
+                print(f"  Channel #: {channel['channel']}")
+            print()
+
+        # Save to file
+        if orjson is not None:
+            with open('scanned_channels.json', 'wb') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        else:
+            with open('scanned_channels.json', 'w') as f:
+                json.dump(result, f, indent=2)
+
+        print(f"Results saved to: scanned_channels.json")
+        print("="*70)
+    else:
+        print(f"Error: {response.status_code}")
+        print(response.text)
+
+
+def test_scan_and_update(facility="lodge"):
+    """Test scanning and updating facility config"""
+
+    print(f"\n\nTesting scan-and-update for facility: {facility}")
+    print("="*70)
+
+    # Call scan-and-update endpoint
+    url = f"{BASE_URL}/api/cameras/{facility}/scan-and-update"
+    params = {
+        "quick": True,  # Use quick scan (faster)
+        "max_channels": 32,
+        "preserve_modelt_info": True  # Keep existing camera names
+    }
+
+    print(f"\nCalling: POST {url}")
+    print(f"Parameters: {json.dumps(params, indent=2)}")
+    print("\nScanning NVR...")
+
+    response = SESSION.post(url, params=params)
+
+    if response.status_code == 200:
+        result = response.json()
+        print("\n✓ SUCCESS!")
+        print("="*70)
+        print(f"Facility:           {result['facility']}")
+        print(f"NVR IP:             {result['nvr_ip']}")
+        print(f"Channels Found:     {result['channels_found']}")
+        print(f"Channels Updated:   {result['channels_updated']}")
+        print(f"Preserved Info:     {result['preserved_modelt_info']}")
+        print(f"\nMessage: {result['message']}")
+        print("="*70)
+
+        # Show current camera list (reuses the same connection)
+        print("\nFetching updated camera list...")
+        cameras_response = SESSION.get(f"{BASE_URL}/api/cameras/{facility}")
+        if cameras_response.status_code == 200:
+            cameras_data = cameras_response.json()
+            print(f"\nTotal cameras: {cameras_data['count']}")
+            print("\nCameras:")
+            for cam in cameras_data['cameras']:
+                print(f"  - Ch{cam['channel']:02d}: {cam['name']} ({cam['id']}) - {cam['resolution']}")
+
+    else:
+        print(f"\n✗ ERROR: {response.status_code}")
+        print(response.text)
+
+
+if __name__ == "__main__":
+    facility = sys.argv[1] if len(sys.argv) > 1 else "lodge"
+
+    print("Camera Service - Scan Test")
+    print("="*70)
+
+    with SESSION:
+        test_regular_scan()
+        test_scan_and_update(facility)
 
-    print(f"Results saved to: scanned_channels.json")
+    print("\n" + "="*70)
+    print("Test complete!")
+    print("\nThe scan-and-update endpoint:")
+    print("  • Scans the NVR")
+    print("  • Updates config.json with discovered cameras")
+    print("  • Preserves existing ModelT camera names/locations")
+    print("  • Adds new cameras with default names")
     print("="*70)
-else:
-    print(f"Error: {response.status_code}")
-    print(response.text)
@@ -6,8 +6,13 @@ Interactive tool to capture checkerboard images for camera calibration.
 Shows live preview and detects checkerboard pattern in real-time.
 
 Usage: python calibration_capture.py <facility> <camera_id>
+       python calibration_capture.py <facility> --all
 Example: python calibration_capture.py lodge bagel
 
+With --all, every camera in the facility is previewed at once in a grid and
+SPACE saves an image for each camera that currently sees the checkerboard
+(R is not available in this mode).
+
 Controls:
   SPACE - Capture image (only when checkerboard detected)
   Q     - Quit and save
@@ -16,13 +21,34 @@ Controls:
 
 import cv2
 import json
+import math
 import os
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 import numpy as np
 import requests
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import orjson  # optional: faster config.json parse
+except ImportError:
+    orjson = None
+
+try:
+    import av  # optional: decode luma straight from the stream, no BGR conversion
+except ImportError:
+    av = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420  # optional: SIMD JPEG encode
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError):  # OSError: libjpeg-turbo shared library not found
+    _turbojpeg = None
+
 # Camera service API
 CAMERA_SERVICE_URL = "http://localhost:8001"
 
@@ -36,6 +62,32 @@ SQUARE_SIZE_MM = 152.4  # Size of each square in millimeters (6 inches)
 MIN_IMAGES = 15
 RECOMMENDED_IMAGES = 20
 
+# Run checkerboard detection on every Nth preview frame; the overlay keeps
+# the last result in between
+DETECT_EVERY_N = 3
+
+# Mean absolute difference (grey levels, on an 8x smaller thumbnail) below
+# which a frame counts as unchanged since the last detection, so the previous
+# result is reused instead of running the detector again
+STATIC_FRAME_MAD = 2.0
+
+# On SPACE, save the sharpest of the last few frames that shows the board,
+# so handheld shake at the moment of the key press doesn't blur the capture
+BURST_FRAMES = 5
+
+# FFmpeg options for live preview: TCP transport and no demuxer/decoder
+# buffering, so each read returns the newest frame rather than a queued one
+FFMPEG_LOW_LATENCY_OPTIONS = "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay|max_delay;0|reorder_queue_size;0"
+AV_LOW_LATENCY_OPTIONS = dict(item.split(";") for item in FFMPEG_LOW_LATENCY_OPTIONS.split("|"))
+
+# Hardware H.264 decoders in order of preference (same list as the camera
+# service), with the elements needed to get to plain BGR system memory
+GST_HW_DECODERS = [
+    ("nvv4l2decoder", "nvv4l2decoder ! nvvidconv ! video/x-raw,format=BGRx ! videoconvert"),  # Jetson
+    ("v4l2h264dec", "v4l2h264dec ! videoconvert"),  # Raspberry Pi
+    ("vaapih264dec", "vaapih264dec ! videoconvert"),  # Intel iGPU
+]
+
 
 def load_config(facility_name):
     """Load camera configuration for a facility"""
@@ -45,16 +97,20 @@ def load_config(facility_name):
         print(f"ERROR: Config not found at {config_path}")
         sys.exit(1)
 
+    if orjson is not None:
+        return orjson.loads(config_path.read_bytes())
     with open(config_path, 'r') as f:
         return json.load(f)
 
 
+def build_camera_index(config):
+    """Map modelTCameraId -> channel info, for repeated lookups"""
+    return {channel['modelTCameraId']: channel for channel in config['channels']}
+
+
 def get_camera_by_id(config, camera_id):
-    """Find camera info by modelTCameraId"""
-    for channel in config['channels']:
-        if channel['modelTCameraId'] == camera_id:
-            return channel
-    return None
+    """Find camera info by modelTCameraId (one-off lookup)"""
+    return build_camera_index(config).get(camera_id)
 
 
 def ensure_calibration_dir(facility_name, camera_id):
@@ -65,8 +121,9 @@ def ensure_calibration_dir(facility_name, camera_id):
 
 
 def get_existing_images(cal_dir):
-    """Count existing calibration images"""
-    return sorted(cal_dir.glob("calib_*.jpg"))
+    """Iterate existing calibration images (unsorted, in one directory scan)"""
+    return (path for path in cal_dir.iterdir()
+            if path.name.startswith("calib_") and path.suffix == ".jpg")
 
 
 def draw_status(frame, detected, corners, image_count):
@@ -102,8 +159,316 @@ def draw_status(frame, detected, corners, image_count):
     return frame
 
 
+def detect_checkerboard(gray):
+    """Find checkerboard corners in a grayscale image; returns (detected, corners)"""
+    # Cheap gate first so frames without a board skip the full detector,
+    # then the sector-based detector, which returns sub-pixel corners
+    # in one pass (no separate cornerSubPix refinement)
+    if not cv2.checkChessboard(gray, CHECKERBOARD_SIZE):
+        return False, None
+    return cv2.findChessboardCornersSB(
+        gray, CHECKERBOARD_SIZE,
+        cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_ACCURACY
+    )
+
+
+def open_rtsp_stream(rtsp_url):
+    """Open a persistent low-latency RTSP capture, or None if unreachable"""
+    # Read by OpenCV when the capture is opened; an explicit user setting wins
+    os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", FFMPEG_LOW_LATENCY_OPTIONS)
+
+    cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        cap.release()
+        return None
+
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+@lru_cache(maxsize=1)
+def gstreamer_hw_decoder():
+    """
+    GStreamer decode chain for the first hardware H.264 decoder present
+
+    Returns None (use software decode) when OpenCV lacks GStreamer, no
+    hardware decoder is installed, or CAMERA_RTSP_BACKEND=ffmpeg is set.
+    """
+    if os.environ.get("CAMERA_RTSP_BACKEND", "").lower() == "ffmpeg":
+        return None
+    build_info = cv2.getBuildInformation().splitlines()
+    if not any(line.strip().startswith("GStreamer:") and "YES" in line for line in build_info):
+        return None
+
+    try:
+        import gi
+        gi.require_version("Gst", "1.0")
+        from gi.repository import Gst
+        Gst.init(None)
+    except (ImportError, ValueError):
+        return None
+
+    for element, chain in GST_HW_DECODERS:
+        if Gst.ElementFactory.find(element) is not None:
+            print(f"Using hardware decoder: {element}")
+            return chain
+    return None
+
+
+def open_hw_stream(rtsp_url):
+    """Open the RTSP stream through a hardware-decoding GStreamer pipeline, or None"""
+    decoder = gstreamer_hw_decoder()
+    if decoder is None:
+        return None
+
+    # appsink keeps only the newest frame, like the FFmpeg low-latency options
+    pipeline = (
+        f'rtspsrc location="{rtsp_url}" latency=0 ! rtph264depay ! h264parse ! '
+        f'{decoder} ! video/x-raw,format=BGR ! '
+        f'appsink max-buffers=1 drop=true sync=false'
+    )
+    cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+    if not cap.isOpened():
+        cap.release()  # e.g. an H.265 channel
+        return None
+    return cap
+
+
+def open_av_stream(rtsp_url):
+    """Open the RTSP stream with PyAV, or None if PyAV is missing or it fails"""
+    if av is None:
+        return None
+    try:
+        container = av.open(rtsp_url, options=AV_LOW_LATENCY_OPTIONS, timeout=5)
+        container.streams.video[0].thread_type = "AUTO"
+        return container
+    except Exception as e:
+        print(f"PyAV could not open stream: {e}")
+        return None
+
+
+class LatestFrameGrabber(threading.Thread):
+    """
+    Reads an RTSP capture continuously and keeps only the newest frame
+
+    The preview loop runs at detection speed, which is slower than the
+    camera. Without this, FFmpeg's queue fills up and every read returns an
+    older frame. Each retrieve() produces a new array, so the grabber only
+    ever swaps the reference and the main loop can use a frame without
+    copying it.
+    """
+
+    def __init__(self, cap):
+        super().__init__(name="frame-grabber", daemon=True)
+        self.cap = cap
+        self.lock = threading.Condition()
+        self.frame = None
+        self.seq = 0  # Incremented for every new frame
+        self.running = True
+
+    def frames(self):
+        """Yield decoded frames until the stream ends"""
+        while self.running:
+            if not self.cap.grab():
+                return
+            ok, frame = self.cap.retrieve()
+            if ok:
+                yield frame
+
+    def run(self):
+        try:
+            for frame in self.frames():
+                if not self.running:
+                    break
+                with self.lock:
+                    self.frame = frame
+                    self.seq += 1
+                    self.lock.notify_all()
+        finally:
+            with self.lock:
+                self.running = False
+                self.lock.notify_all()
+
+    def read(self, last_seq=0, timeout=5.0):
+        """Wait for a frame newer than last_seq; returns (frame or None, seq)"""
+        with self.lock:
+            self.lock.wait_for(lambda: self.seq != last_seq or not self.running, timeout)
+            if self.seq == last_seq:
+                return None, last_seq
+            return self.frame, self.seq
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=2)
+
+    def close(self):
+        """Stop the thread and release the stream"""
+        self.stop()
+        self.cap.release()
+
+
+class AvFrameGrabber(LatestFrameGrabber):
+    """
+    LatestFrameGrabber over a PyAV container
+
+    Frames are kept as av.VideoFrames in the stream's native YUV, so the
+    preview can take the luma plane for detection and scale straight to
+    display size without a full-resolution BGR conversion per frame.
+    """
+
+    def frames(self):
+        try:
+            yield from self.cap.decode(video=0)
+        except Exception as e:
+            print(f"RTSP stream ended: {e}")
+
+    def close(self):
+        self.stop()
+        self.cap.close()
+
+
+def frame_size(frame):
+    """(width, height) of a BGR array or av.VideoFrame"""
+    if isinstance(frame, np.ndarray):
+        h, w = frame.shape[:2]
+        return w, h
+    return frame.width, frame.height
+
+
+class PreviewBuffers:
+    """Images reused by every preview frame, so the loop doesn't allocate"""
+
+    def __init__(self, process_size, display_size, gray_slots=1):
+        (process_w, process_h), (display_w, display_h) = process_size, display_size
+        self.process_size = process_size
+        self.display_size = display_size
+        self.process = np.empty((process_h, process_w, 3), np.uint8)
+        # Grayscale images are handed out round-robin, so the last gray_slots
+        # of them stay valid (the burst buffer holds on to them)
+        self.grays = [np.empty((process_h, process_w), np.uint8) for _ in range(gray_slots)]
+        self.gray_index = 0
+        self.display = np.empty((display_h, display_w, 3), np.uint8)
+        # Thumbnail of the current frame and of the one last run through detection
+        self.thumb_size = (max(process_w // 8, 1), max(process_h // 8, 1))
+        self.thumb = np.empty(self.thumb_size[::-1], np.uint8)
+        self.ref_thumb = None
+        self.pyramid = {}  # (width, height) -> intermediate pyrDown level
+
+    def downsample(self, frame):
+        """
+        Shrink a full-resolution BGR frame into self.process
+
+        Halves with cv2.pyrDown (a fixed 5x5 Gaussian, cheaper per pixel than
+        resize and anti-aliased) while the result is still no smaller than
+        the processing size, then resizes the last small step if one is left.
+        At the usual 25% processing scale that is exactly two pyrDowns.
+        """
+        src = frame
+        while True:
+            h, w = src.shape[:2]
+            size = ((w + 1) // 2, (h + 1) // 2)
+            if size[0] < self.process_size[0] or size[1] < self.process_size[1]:
+                break
+            if size == self.process_size:
+                cv2.pyrDown(src, dst=self.process, dstsize=size)
+                return
+            dst = self.pyramid.get(size)
+            if dst is None:
+                dst = self.pyramid[size] = np.empty((size[1], size[0], 3), np.uint8)
+            cv2.pyrDown(src, dst=dst, dstsize=size)
+            src = dst
+        cv2.resize(src, self.process_size, dst=self.process, interpolation=cv2.INTER_AREA)
+
+    def frame_changed(self, gray):
+        """
+        True if gray differs visibly from the frame detection last ran on
+
+        When it does, it becomes the new reference, so slow drift still
+        adds up to a change instead of being compared frame to frame.
+        """
+        cv2.resize(gray, self.thumb_size, dst=self.thumb, interpolation=cv2.INTER_AREA)
+        if self.ref_thumb is not None:
+            mad = cv2.norm(self.thumb, self.ref_thumb, cv2.NORM_L1) / self.thumb.size
+            if mad < STATIC_FRAME_MAD:
+                return False
+            np.copyto(self.ref_thumb, self.thumb)
+        else:
+            self.ref_thumb = self.thumb.copy()
+        return True
+
+
+def preview_images(frame, buffers):
+    """
+    Grayscale detection image and BGR display image for one frame
+
+    For av.VideoFrames both come from a single scale of the YUV planes;
+    the grayscale one is a copy of the luma plane with no colour maths.
+    BGR arrays (OpenCV or API frames) are downsampled and converted into
+    the preallocated buffers, which are overwritten by the next call.
+    """
+    if isinstance(frame, np.ndarray):
+        buffers.downsample(frame)
+        gray = buffers.grays[buffers.gray_index]
+        buffers.gray_index = (buffers.gray_index + 1) % len(buffers.grays)
+        cv2.cvtColor(buffers.process, cv2.COLOR_BGR2GRAY, dst=gray)
+        cv2.resize(buffers.process, buffers.display_size, dst=buffers.display)
+        return gray, buffers.display
+
+    (process_w, process_h), (display_w, display_h) = buffers.process_size, buffers.display_size
+    gray = frame.reformat(width=process_w, height=process_h, format="gray").to_ndarray()
+    display = frame.reformat(width=display_w, height=display_h, format="bgr24").to_ndarray()
+    return gray, display
+
+
+def full_frame_bgr(frame):
+    """Full-resolution BGR array for saving"""
+    if isinstance(frame, np.ndarray):
+        return frame
+    return frame.to_ndarray(format="bgr24")
+
+
+def sharpest_with_board(burst):
+    """
+    Pick the frame to save from a burst of (frame, gray) pairs
+
+    Frames are ranked by variance of the Laplacian (higher is sharper) and
+    the first one the detector finds the board in wins.
+
+    Returns:
+        The chosen frame, or None if the board is in none of them
+    """
+    ranked = sorted(burst, key=lambda pair: cv2.Laplacian(pair[1], cv2.CV_64F).var(), reverse=True)
+    for frame, gray in ranked:
+        detected, _ = detect_checkerboard(gray)
+        if detected:
+            return frame
+    return None
+
+
+def save_capture(filepath, frame):
+    """Encode and write a full-resolution capture (runs on the write pool)"""
+    if _turbojpeg is not None:
+        # Same 4:2:0 sampling OpenCV uses by default, at a fraction of the time.
+        # Nothing reads the pool's futures, so failures are reported here
+        try:
+            with open(filepath, 'wb') as f:
+                f.write(_turbojpeg.encode(
+                    frame, quality=100, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420))
+        except Exception as e:
+            print(f"ERROR: Failed to write {os.path.basename(filepath)}: {e}")
+    elif not cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 100]):
+        print(f"ERROR: Failed to write {os.path.basename(filepath)}")
+
+
+def poll_key():
+    """Pending key press without sleeping (cv2.pollKey, OpenCV 4.5+), else waitKey(1)"""
+    if hasattr(cv2, "pollKey"):
+        return cv2.pollKey() & 0xFF
+    return cv2.waitKey(1) & 0xFF
+
+
 def capture_frame_from_api(facility, camera_id):
-    """Capture frame via camera service API (more reliable than direct RTSP)"""
+    """Capture frame via camera service API (fallback when RTSP is unreachable)"""
     try:
         response = requests.get(
             f"{CAMERA_SERVICE_URL}/api/cameras/{facility}/{camera_id}/capture",
@@ -122,18 +487,61 @@ def capture_frame_from_api(facility, camera_id):
         return None
 
 
-def capture_calibration_images(facility, camera_id, camera_name, cal_dir):
+def open_grabber(rtsp_url):
+    """
+    Open an RTSP stream and start its grabber, or None if it can't be opened
+
+    Hardware decode comes first, since software H.264 decode of a 4K stream
+    costs a core or two. Next is PyAV for direct luma access, then OpenCV's
+    FFmpeg backend.
+    """
+    cap = open_hw_stream(rtsp_url)
+    if cap is not None:
+        grabber = LatestFrameGrabber(cap)
+    else:
+        cap = open_av_stream(rtsp_url)
+        if cap is not None:
+            grabber = AvFrameGrabber(cap)
+        else:
+            cap = open_rtsp_stream(rtsp_url)
+            if cap is None:
+                return None
+            grabber = LatestFrameGrabber(cap)
+    grabber.start()
+    return grabber
+
+
+def capture_calibration_images(facility, camera_id, camera_name, cal_dir, rtsp_url=None):
     """Main capture loop with live preview"""
 
-    print(f"\nConnecting to {camera_name} ({camera_id}) via camera service API...")
+    # Decode straight from the camera stream; the camera service API costs a
+    # JPEG encode, an HTTP round-trip and a JPEG decode per frame
+    grabber = None
+    if rtsp_url:
+        print(f"\nConnecting to {camera_name} ({camera_id}) via RTSP...")
+        grabber = open_grabber(rtsp_url)
+        if grabber is None:
+            print("RTSP unavailable, falling back to camera service API")
+    if grabber is None:
+        print(f"\nConnecting to {camera_name} ({camera_id}) via camera service API...")
+    frame_seq = 0
+
+    def read_frame():
+        nonlocal frame_seq
+        if grabber is not None:
+            frame, frame_seq = grabber.read(frame_seq)
+            return frame
+        return capture_frame_from_api(facility, camera_id)
 
     # Get initial frame to determine resolution
-    frame = capture_frame_from_api(facility, camera_id)
+    frame = read_frame()
     if frame is None:
-        print("ERROR: Could not capture initial frame from camera service")
+        print("ERROR: Could not capture initial frame from camera")
+        if grabber is not None:
+            grabber.close()
         return False
 
-    h, w = frame.shape[:2]
+    w, h = frame_size(frame)
     print(f"Connected! Resolution: {w}x{h}")
     print(f"Calibration directory: {cal_dir}")
 
@@ -147,8 +555,7 @@ def capture_calibration_images(facility, camera_id, camera_name, cal_dir):
     display_h = int(h * display_scale)
     cv2.resizeWindow(window_name, display_w, display_h)
 
-    existing_images = get_existing_images(cal_dir)
-    image_count = len(existing_images)
+    image_count = sum(1 for _ in get_existing_images(cal_dir))
     print(f"Existing calibration images: {image_count}")
 
     print("\n" + "="*60)
@@ -164,9 +571,6 @@ def capture_calibration_images(facility, camera_id, camera_name, cal_dir):
     print("  - Keep checkerboard steady when capturing")
     print("="*60 + "\n")
 
-    # Criteria for corner refinement
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
-
     # Calculate processing resolution (much smaller for speed)
     process_scale = 0.25  # Process at 25% resolution for speed
     process_w = int(w * process_scale)
@@ -175,52 +579,56 @@ def capture_calibration_images(facility, camera_id, camera_name, cal_dir):
     print(f"Display resolution: {display_w}x{display_h}")
     print(f"Capture resolution: {w}x{h} (full quality)\n")
 
+    buffers = PreviewBuffers((process_w, process_h), (display_w, display_h), gray_slots=BURST_FRAMES)
+    burst = deque(maxlen=BURST_FRAMES)
+
+    # Scale from processing to display resolution for the corner overlay,
+    # one broadcast multiply over the (N, 1, 2) corner array into a reused buffer
+    scale_vec = np.array([display_w / process_w, display_h / process_h], dtype=np.float32)
+    corners_out = np.empty((CHECKERBOARD_SIZE[0] * CHECKERBOARD_SIZE[1], 1, 2), np.float32)
+
+    def scale_corners(corners):
+        return np.multiply(corners, scale_vec, out=corners_out)
+
+    # JPEG encode at quality 100 takes tens of ms at 4K; do it off the
+    # preview thread. Frames are never reused by the reader, so no copy.
+    cal_dir_str = str(cal_dir)  # Capture paths are plain strings, joined with os.path
+    write_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="capture-writer")
+    pending_writes = []
+
     frame_count = 0
+    detected, corners_scaled = False, None
     while True:
         frame_count += 1
         if frame_count % 30 == 0:  # Print every 30 frames
             print(f"Fetching frame {frame_count}...")
 
-        # Capture frame from API
-        frame = capture_frame_from_api(facility, camera_id)
+        # Capture frame
+        frame = read_frame()
         if frame is None:
-            print("ERROR: Failed to fetch frame from camera service")
+            print("ERROR: Failed to fetch frame from camera")
             break
 
-        # Resize for processing (MUCH faster)
-        process_frame = cv2.resize(frame, (process_w, process_h))
-
-        # Convert to grayscale for detection
-        gray = cv2.cvtColor(process_frame, cv2.COLOR_BGR2GRAY)
-
-        # Find checkerboard corners on smaller image
-        detected, corners = cv2.findChessboardCorners(
-            gray, CHECKERBOARD_SIZE,
-            cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
-        )
-
-        # Refine corners if found
-        if detected:
-            corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
-
-            # Scale corners back to display resolution for overlay
-            scale_x = display_w / process_w
-            scale_y = display_h / process_h
-            corners_scaled = corners.copy()
-            corners_scaled[:, 0, 0] *= scale_x
-            corners_scaled[:, 0, 1] *= scale_y
-        else:
-            corners_scaled = None
+        # Grayscale at processing size (MUCH faster) plus display-sized preview
+        gray, display_frame = preview_images(frame, buffers)
+        burst.append((frame, gray))
 
-        # Resize for display first
-        display_frame = cv2.resize(process_frame, (display_w, display_h))
+        # Find checkerboard corners on smaller image, every Nth frame. A frame
+        # indistinguishable from the last one detected on reuses its result,
+        # which is then just as valid for this frame.
+        if (frame_count - 1) % DETECT_EVERY_N == 0:
+            if buffers.frame_changed(gray):
+                detected, corners = detect_checkerboard(gray)
+                corners_scaled = scale_corners(corners) if detected else None
 
         # Draw status overlay on display-sized frame (proper font size!)
         display_frame = draw_status(display_frame, detected, corners_scaled, image_count)
 
         cv2.imshow(window_name, display_frame)
 
-        key = cv2.waitKey(1) & 0xFF
+        # read_frame() already blocks until the grabber signals a new frame,
+        # so only poll the GUI here rather than sleeping another 1 ms
+        key = poll_key()
 
         if key == ord('q') or key == ord('Q'):
             # Quit
@@ -228,26 +636,36 @@ def capture_calibration_images(facility, camera_id, camera_name, cal_dir):
             break
 
         elif key == ord(' ') and detected:
+            # Detection is re-run on the chosen frame, never stale corners
+            best_frame = sharpest_with_board(burst)
+            if best_frame is None:
+                detected, corners_scaled = False, None
+                print("Checkerboard lost in recent frames, not captured")
+                continue
+            burst.clear()  # A quick second press must not save the same frame
+
             # Capture image
             image_count += 1
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
             filename = f"calib_{image_count:03d}_{timestamp}.jpg"
-            filepath = cal_dir / filename
+            filepath = os.path.join(cal_dir_str, filename)
 
             # Save the FULL RESOLUTION original frame (not the processed one!)
-            cv2.imwrite(str(filepath), frame, [cv2.IMWRITE_JPEG_QUALITY, 100])
+            pending_writes = [f for f in pending_writes if not f.done()]
+            pending_writes.append(write_pool.submit(save_capture, filepath, full_frame_bgr(best_frame)))
             print(f"Captured: {filename} ({image_count}/{RECOMMENDED_IMAGES}) - Full resolution: {w}x{h}")
 
-            # Flash feedback (on display)
-            flash = display_frame.copy()
-            cv2.rectangle(flash, (0, 0), (display_w, display_h), (0, 255, 0), 20)
-            cv2.imshow(window_name, flash)
+            # Flash feedback (on display). display_frame is rewritten next frame
+            # and the full-res frame is already queued, so draw on it in place
+            cv2.rectangle(display_frame, (0, 0), (display_w, display_h), (0, 255, 0), 20)
+            cv2.imshow(window_name, display_frame)
             cv2.waitKey(100)
 
         elif key == ord('r') or key == ord('R'):
             # Reset - delete all images
             confirm = input("\nDelete all calibration images for this camera? (y/N): ")
             if confirm.lower() == 'y':
+                wait(pending_writes)  # Don't let a queued save land after the reset
                 for img_path in get_existing_images(cal_dir):
                     img_path.unlink()
                 image_count = 0
@@ -255,14 +673,174 @@ def capture_calibration_images(facility, camera_id, camera_name, cal_dir):
             else:
                 print("Reset cancelled.")
 
+    write_pool.shutdown(wait=True)
+    if grabber is not None:
+        grabber.close()
     cv2.destroyAllWindows()
 
     return image_count >= MIN_IMAGES
 
 
+class CameraStream:
+    """One camera in the --all preview: its grabber, buffers and capture state"""
+
+    def __init__(self, camera_id, grabber, cal_dir):
+        self.camera_id = camera_id
+        self.grabber = grabber
+        self.cal_dir_str = str(cal_dir)
+        self.image_count = sum(1 for _ in get_existing_images(cal_dir))
+        self.seq = 0
+        self.frame = None
+        self.tile = None
+        self.detected = False
+        self.corners = None
+        self.buffers = None  # Sized from the first frame
+        self.scale_vec = None
+
+    def process(self, frame, tile_size):
+        """Detect the board in a new frame and render its tile (runs on the detection pool)"""
+        if self.buffers is None:
+            w, h = frame_size(frame)
+            process_size = (max(w // 4, 1), max(h // 4, 1))
+            self.buffers = PreviewBuffers(process_size, tile_size)
+            self.scale_vec = np.array(
+                [tile_size[0] / process_size[0], tile_size[1] / process_size[1]], dtype=np.float32)
+
+        gray, self.tile = preview_images(frame, self.buffers)
+        self.detected, corners = detect_checkerboard(gray)
+        self.corners = corners * self.scale_vec if self.detected else None
+        self.frame = frame
+
+
+def capture_all_calibration_images(facility, cameras, window_size=(1920, 1080)):
+    """
+    Preview every camera of a facility at once and capture them together
+
+    Each stream has its grabber thread, which spends its time blocked in
+    socket reads and FFmpeg decode with the GIL released. Detection for
+    every camera with a new frame is fanned out to a pool sized to the CPU
+    count, and the results are tiled into one window.
+
+    Args:
+        facility: Facility name
+        cameras: Channel dicts from the facility config
+        window_size: Largest (width, height) for the tiled preview
+
+    Returns:
+        True if every opened camera has at least MIN_IMAGES images
+    """
+    streams = []
+    for camera in cameras:
+        camera_id = camera['modelTCameraId']
+        rtsp_url = camera.get('rtspUrl')
+        grabber = open_grabber(rtsp_url) if rtsp_url else None
+        if grabber is None:
+            print(f"  {camera_id:12} - RTSP unavailable, skipped")
+            continue
+        streams.append(CameraStream(camera_id, grabber, ensure_calibration_dir(facility, camera_id)))
+        print(f"  {camera_id:12} - connected")
+
+    # The first frame sets the tile aspect ratio. read() doesn't consume it,
+    # so the loop below still processes it.
+    first = None
+    for stream in streams:
+        first, _ = stream.grabber.read(0)
+        if first is not None:
+            break
+    if first is None:
+        print("ERROR: Could not capture a frame from any camera")
+        for stream in streams:
+            stream.grabber.close()
+        return False
+
+    cols = math.ceil(math.sqrt(len(streams)))
+    rows = math.ceil(len(streams) / cols)
+    w, h = frame_size(first)
+    tile_scale = min(window_size[0] / (cols * w), window_size[1] / (rows * h))
+    tile_size = (max(int(w * tile_scale), 1), max(int(h * tile_scale), 1))
+    canvas = np.zeros((rows * tile_size[1], cols * tile_size[0], 3), np.uint8)
+
+    window_name = f"Calibration: {facility} ({len(streams)} cameras)"
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    cv2.resizeWindow(window_name, canvas.shape[1], canvas.shape[0])
+    print(f"\nPreviewing {len(streams)} cameras. SPACE captures every camera showing the board, Q quits.\n")
+
+    detect_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="detect")
+    write_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="capture-writer")
+
+    while True:
+        jobs = []
+        for stream in streams:
+            frame, seq = stream.grabber.read(stream.seq, timeout=0)
+            if frame is not None:
+                stream.seq = seq
+                jobs.append(detect_pool.submit(stream.process, frame, tile_size))
+
+        if not jobs:
+            if not any(stream.grabber.running for stream in streams):
+                print("ERROR: All camera streams ended")
+                break
+            key = cv2.waitKey(5) & 0xFF  # No new frames yet; keep the window responsive
+        else:
+            wait(jobs)
+            for index, stream in enumerate(streams):
+                if stream.tile is None:
+                    continue
+                row, col = divmod(index, cols)
+                x, y = col * tile_size[0], row * tile_size[1]
+                tile = canvas[y:y + tile_size[1], x:x + tile_size[0]]
+                tile[:] = stream.tile
+                if stream.detected:
+                    cv2.drawChessboardCorners(tile, CHECKERBOARD_SIZE, stream.corners, True)
+                color = (0, 255, 0) if stream.detected else (0, 165, 255)
+                label = f"{stream.camera_id}  {stream.image_count}/{RECOMMENDED_IMAGES}"
+                cv2.putText(tile, label, (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            cv2.imshow(window_name, canvas)
+            key = poll_key()
+
+        if key == ord('q') or key == ord('Q'):
+            break
+
+        elif key == ord(' '):
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            captured = []
+            for stream in streams:
+                if not stream.detected:
+                    continue
+                stream.image_count += 1
+                filename = f"calib_{stream.image_count:03d}_{timestamp}.jpg"
+                filepath = os.path.join(stream.cal_dir_str, filename)
+                write_pool.submit(save_capture, filepath, full_frame_bgr(stream.frame))
+                captured.append(f"{stream.camera_id} ({stream.image_count})")
+            if captured:
+                print(f"Captured: {', '.join(captured)}")
+            else:
+                print("No camera sees the checkerboard, nothing captured")
+
+    detect_pool.shutdown(wait=True)
+    write_pool.shutdown(wait=True)
+    for stream in streams:
+        stream.grabber.close()
+    cv2.destroyAllWindows()
+
+    for stream in streams:
+        print(f"  {stream.camera_id:12} - {stream.image_count} images")
+    return all(stream.image_count >= MIN_IMAGES for stream in streams)
+
+
 def main():
+    if len(sys.argv) >= 3 and sys.argv[2] == "--all":
+        facility_name = sys.argv[1]
+        config = load_config(facility_name)
+        print(f"\nConnecting to {len(config['channels'])} cameras via RTSP...")
+        success = capture_all_calibration_images(facility_name, config['channels'])
+        if not success:
+            print(f"\nEach camera needs at least {MIN_IMAGES} images for calibration.")
+        return 0 if success else 1
+
     if len(sys.argv) < 3:
         print("Usage: python calibration_capture.py <facility> <camera_id>")
+        print("       python calibration_capture.py <facility> --all")
         print("Example: python calibration_capture.py lodge bagel")
         print("\nTo see available cameras, check the facility's cameras/config.json")
         sys.exit(1)
@@ -274,7 +852,7 @@ def main():
     config = load_config(facility_name)
 
     # Find camera
-    camera_info = get_camera_by_id(config, camera_id)
+    camera_info = build_camera_index(config).get(camera_id)
     if not camera_info:
         print(f"ERROR: Camera '{camera_id}' not found in facility '{facility_name}'")
         print("\nAvailable cameras:")
@@ -290,7 +868,8 @@ def main():
         facility_name,
         camera_id,
         camera_info['modelTCameraName'],
-        cal_dir
+        cal_dir,
+        rtsp_url=camera_info.get('rtspUrl')
     )
 
     if success:
@@ -11,16 +11,57 @@ Example: python calibration_process.py lodge bagel
 
 import cv2
 import json
+import math
+import multiprocessing
 import numpy as np
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+
+try:
+    import orjson  # optional: C JSON serializer that writes numpy arrays natively
+except ImportError:
+    orjson = None
 
 # Checkerboard configuration (must match capture script)
 # Lodge facility: 3'x4' checkerboard (6 squares × 8 squares) = 5x7 inner corners
 CHECKERBOARD_SIZE = (5, 7)  # (columns, rows) of inner corners
 SQUARE_SIZE_MM = 152.4  # Size of each square in millimeters (6 inches)
 
+# Images wider than this are searched for the board at half resolution
+# (pyrDown); corners are then refined on the full-resolution image
+DETECT_DOWNSCALE_WIDTH = 2000
+
+# Images that are blurred, blank or badly exposed are skipped before detection;
+# on such frames the chessboard detectors can run for a very long time
+MIN_SHARPNESS = 50.0         # Variance of the Laplacian
+MIN_MEAN_INTENSITY = 20
+MAX_MEAN_INTENSITY = 235
+DETECT_TIMEOUT_S = 10.0      # Give up on an image whose detection hangs
+
+_RAD2DEG = 180.0 / math.pi
+
+
+def _json_default(obj):
+    # Fallback serializer for the stdlib json path
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_json(path, data):
+    """Write data as 2-space indented JSON; numpy arrays are written as lists"""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2, default=_json_default)
+
 
 def load_config(facility_name):
     """Load camera configuration for a facility"""
@@ -47,18 +88,116 @@ def get_calibration_dir(facility_name, camera_id):
     return Path(__file__).parent.parent / "warehouses" / facility_name / "calibration" / camera_id
 
 
+@lru_cache(maxsize=1)
 def prepare_object_points():
-    """Prepare 3D object points for the checkerboard"""
-    # Object points in checkerboard coordinate system
-    # (0,0,0), (1,0,0), (2,0,0), ..., (7,4,0)
-    objp = np.zeros((CHECKERBOARD_SIZE[0] * CHECKERBOARD_SIZE[1], 3), np.float32)
-    objp[:, :2] = np.mgrid[0:CHECKERBOARD_SIZE[0], 0:CHECKERBOARD_SIZE[1]].T.reshape(-1, 2)
-    objp *= SQUARE_SIZE_MM  # Scale to real-world units
+    """Prepare 3D object points for the checkerboard (built once, shared by every image)"""
+    # Object points in checkerboard coordinate system, x varying fastest
+    # (0,0,0), (1,0,0), (2,0,0), ..., (4,6,0), scaled to real-world units
+    ys, xs = np.indices(CHECKERBOARD_SIZE[::-1], dtype=np.float32)
+    objp = np.empty((xs.size, 3), np.float32)
+    objp[:, 0] = xs.ravel() * SQUARE_SIZE_MM
+    objp[:, 1] = ys.ravel() * SQUARE_SIZE_MM
+    objp[:, 2] = 0.0
     return objp
 
 
+def _init_worker():
+    # Parallelism comes from the pool; one OpenCV thread per worker avoids
+    # oversubscribing the cores
+    cv2.setNumThreads(1)
+
+
+def _detect_corners(path_str):
+    """
+    Find refined checkerboard corners in one calibration image
+
+    Module-level so it can run in a ProcessPoolExecutor worker.
+
+    Returns:
+        (found, refined corners or None, (width, height) or None if unreadable,
+         reason the image was skipped or None)
+    """
+    # Decode straight to luma: no chroma upsampling, no 3-channel buffer
+    gray = cv2.imread(path_str, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return False, None, None, None
+
+    image_size = gray.shape[::-1]  # (width, height)
+
+    # Cheap quality gate before the (potentially unbounded) board search
+    mean = cv2.mean(gray)[0]
+    if mean < MIN_MEAN_INTENSITY or mean > MAX_MEAN_INTENSITY:
+        return False, None, image_size, f"mean intensity {mean:.0f}"
+    _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+    sharpness = float(lap_std[0, 0]) ** 2
+    if sharpness < MIN_SHARPNESS:
+        return False, None, image_size, f"sharpness {sharpness:.1f}"
+
+    # Detection cost scales with pixel count, so search large images at half size
+    downscaled = image_size[0] > DETECT_DOWNSCALE_WIDTH
+    search = cv2.pyrDown(gray) if downscaled else gray
+
+    # Sector-based detector: sub-pixel accurate corners in one pass
+    ret, corners = cv2.findChessboardCornersSB(
+        search, CHECKERBOARD_SIZE,
+        cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_EXHAUSTIVE + cv2.CALIB_CB_ACCURACY
+    )
+    if ret and not downscaled:
+        return True, corners, image_size, None
+
+    if not ret:
+        # Fall back to the classic detector for boards SB misses; FAST_CHECK
+        # bails out early on images without a board
+        ret, corners = cv2.findChessboardCorners(
+            search, CHECKERBOARD_SIZE,
+            cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE + cv2.CALIB_CB_FAST_CHECK
+        )
+        if not ret:
+            return False, None, image_size, None
+
+    # Refine corners at full resolution (from half-size coordinates if downscaled)
+    if downscaled:
+        corners *= 2.0
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    corners_refined = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+    return True, corners_refined, image_size, None
+
+
+def _detect_all(paths):
+    """
+    Run _detect_corners over paths in a process pool, in file order
+
+    An image whose result takes longer than DETECT_TIMEOUT_S is reported as
+    skipped; if any timed out, the stuck workers are terminated at the end.
+    """
+    results = []
+    timed_out = False
+    ex = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker)
+    try:
+        futures = [ex.submit(_detect_corners, path) for path in paths]
+        for future in futures:
+            try:
+                results.append(future.result(timeout=DETECT_TIMEOUT_S))
+            except FutureTimeout:
+                future.cancel()
+                timed_out = True
+                results.append((False, None, None, f"detection timed out after {DETECT_TIMEOUT_S:.0f}s"))
+    finally:
+        if timed_out:
+            for child in multiprocessing.active_children():
+                child.terminate()
+        ex.shutdown(wait=not timed_out, cancel_futures=True)
+    return results
+
+
 def process_calibration_images(cal_dir, show_detections=False):
-    """Process all calibration images and find corners"""
+    """
+    Process all calibration images and find corners
+
+    Detection runs in a process pool, one worker per core, with results
+    kept in file order. With show_detections it runs serially so each
+    detection can be displayed from the main thread.
+    """
 
     image_files = sorted(cal_dir.glob("calib_*.jpg"))
     if not image_files:
@@ -75,41 +214,37 @@ def process_calibration_images(cal_dir, show_detections=False):
     image_points = []   # 2D points in image plane
     image_size = None
 
-    # Corner refinement criteria
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
-
     successful = 0
     failed = 0
 
-    for img_path in image_files:
-        img = cv2.imread(str(img_path))
-        if img is None:
-            print(f"  [FAIL] Could not read: {img_path.name}")
+    paths = [str(p) for p in image_files]
+    if show_detections:
+        results = map(_detect_corners, paths)
+    else:
+        results = _detect_all(paths)
+
+    for img_path, (ret, corners_refined, size, skip_reason) in zip(image_files, results):
+        if skip_reason is not None:
+            print(f"  [SKIP] {img_path.name} ({skip_reason})")
             failed += 1
             continue
 
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if size is None:
+            print(f"  [FAIL] Could not read: {img_path.name}")
+            failed += 1
+            continue
 
         if image_size is None:
-            image_size = gray.shape[::-1]  # (width, height)
-
-        # Find checkerboard corners
-        ret, corners = cv2.findChessboardCorners(
-            gray, CHECKERBOARD_SIZE,
-            cv2.CALIB_CB_ADAPTIVE_THRESH + cv2.CALIB_CB_NORMALIZE_IMAGE
-        )
+            image_size = size
 
         if ret:
-            # Refine corners
-            corners_refined = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
-
             object_points.append(objp)
             image_points.append(corners_refined)
             successful += 1
             print(f"  [OK] {img_path.name}")
 
             if show_detections:
-                vis = img.copy()
+                vis = cv2.imread(str(img_path))
                 cv2.drawChessboardCorners(vis, CHECKERBOARD_SIZE, corners_refined, ret)
                 cv2.namedWindow("Detection", cv2.WINDOW_NORMAL)
                 cv2.resizeWindow("Detection", 1280, 720)
@@ -160,25 +295,49 @@ def calibrate_camera(object_points, image_points, image_size):
 
     print(f"Calibration quality: {quality}")
 
+    print_worst_views(object_points, image_points, camera_matrix, dist_coeffs, rvecs, tvecs)
+
     return ret, camera_matrix, dist_coeffs, rvecs, tvecs
 
 
+def print_worst_views(object_points, image_points, camera_matrix, dist_coeffs, rvecs, tvecs, count=5):
+    """Print the views with the highest per-view RMS reprojection error"""
+    n_views = len(object_points)
+    n_corners = len(object_points[0])
+
+    # Project every view into one preallocated array, then score all views at once
+    observed = np.vstack(image_points).reshape(-1, 2)
+    projected = np.empty_like(observed)
+    for i in range(n_views):
+        pts, _ = cv2.projectPoints(object_points[i], rvecs[i], tvecs[i], camera_matrix, dist_coeffs)
+        projected[i * n_corners:(i + 1) * n_corners] = pts.reshape(-1, 2)
+
+    sq_err = np.square(projected - observed).sum(axis=1).reshape(n_views, n_corners)
+    view_rms = np.sqrt(sq_err.mean(axis=1))
+
+    worst = np.argsort(view_rms)[::-1][:count]
+    print(f"Worst views by reprojection error:")
+    for i in worst:
+        print(f"  view {i + 1:3d}: {view_rms[i]:.4f} pixels")
+
+
 def compute_fov(camera_matrix, image_size):
     """Compute field of view from camera matrix"""
     fx = camera_matrix[0, 0]
     fy = camera_matrix[1, 1]
     w, h = image_size
 
-    fov_x = 2 * np.arctan(w / (2 * fx)) * 180 / np.pi
-    fov_y = 2 * np.arctan(h / (2 * fy)) * 180 / np.pi
+    # Scalars, so math.atan rather than a numpy ufunc call
+    fov_x = 2 * math.atan(w / (2 * fx)) * _RAD2DEG
+    fov_y = 2 * math.atan(h / (2 * fy)) * _RAD2DEG
 
     return fov_x, fov_y
 
 
-def save_calibration(cal_dir, camera_id, camera_matrix, dist_coeffs, image_size, rms_error):
-    """Save calibration results to JSON"""
+def save_calibration(cal_dir, camera_id, camera_matrix, dist_coeffs, image_size, rms_error, fov):
+    """Save calibration results to JSON (fov as returned by compute_fov)"""
 
-    # Convert numpy arrays to lists for JSON serialization
+    # numpy arrays are serialized directly by write_json
     calibration_data = {
         "camera_id": camera_id,
         "calibration_date": datetime.now().isoformat(),
@@ -191,7 +350,7 @@ def save_calibration(cal_dir, camera_id, camera_matrix, dist_coeffs, image_size,
             "fy": float(camera_matrix[1, 1]),
             "cx": float(camera_matrix[0, 2]),
             "cy": float(camera_matrix[1, 2]),
-            "matrix": camera_matrix.tolist()
+            "matrix": camera_matrix
         },
         "distortion_coefficients": {
             "k1": float(dist_coeffs[0, 0]),
@@ -199,11 +358,11 @@ def save_calibration(cal_dir, camera_id, camera_matrix, dist_coeffs, image_size,
             "p1": float(dist_coeffs[0, 2]),
             "p2": float(dist_coeffs[0, 3]),
             "k3": float(dist_coeffs[0, 4]) if len(dist_coeffs[0]) > 4 else 0.0,
-            "array": dist_coeffs.flatten().tolist()
+            "array": dist_coeffs.ravel()
         },
         "field_of_view": {
-            "horizontal_deg": float(2 * np.arctan(image_size[0] / (2 * camera_matrix[0, 0])) * 180 / np.pi),
-            "vertical_deg": float(2 * np.arctan(image_size[1] / (2 * camera_matrix[1, 1])) * 180 / np.pi)
+            "horizontal_deg": float(fov[0]),
+            "vertical_deg": float(fov[1])
         },
         "rms_reprojection_error": float(rms_error),
         "checkerboard": {
@@ -214,8 +373,7 @@ def save_calibration(cal_dir, camera_id, camera_matrix, dist_coeffs, image_size,
 
     # Save to calibration directory
     output_path = cal_dir / "calibration.json"
-    with open(output_path, 'w') as f:
-        json.dump(calibration_data, f, indent=2)
+    write_json(output_path, calibration_data)
 
     print(f"\nCalibration saved to: {output_path}")
 
@@ -311,7 +469,7 @@ def main():
 
     # Save results
     calibration_data = save_calibration(
-        cal_dir, camera_id, camera_matrix, dist_coeffs, image_size, rms_error
+        cal_dir, camera_id, camera_matrix, dist_coeffs, image_size, rms_error, fov
     )
 
     print(f"\nTo update ModelT with intrinsics, run:")
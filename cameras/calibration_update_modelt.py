@@ -10,21 +10,52 @@ Example: python calibration_update_modelt.py lodge
 """
 
 import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import orjson  # optional: faster serialization of large ModelT files
+except ImportError:
+    orjson = None
+
+
+def read_json(path):
+    """Parse a JSON file, using orjson when installed"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    """Write data as 2-space indented JSON"""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
 
 def load_modelt(facility_name):
-    """Load ModelT JSON for a facility"""
+    """
+    Load ModelT JSON for a facility
+
+    Returns:
+        (parsed ModelT, path, original file bytes for the backup)
+    """
     modelt_path = Path(__file__).parent.parent / "warehouses" / facility_name / f"{facility_name}.modelT.json"
 
     if not modelt_path.exists():
         print(f"ERROR: ModelT not found at {modelt_path}")
         sys.exit(1)
 
-    with open(modelt_path, 'r') as f:
-        return json.load(f), modelt_path
+    raw = modelt_path.read_bytes()
+    modelt = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    return modelt, modelt_path, raw
 
 
 def get_calibration_files(facility_name):
@@ -34,15 +65,42 @@ def get_calibration_files(facility_name):
     if not cal_base.exists():
         return {}
 
-    calibrations = {}
-    for camera_dir in cal_base.iterdir():
-        if camera_dir.is_dir():
-            cal_file = camera_dir / "calibration.json"
-            if cal_file.exists():
-                with open(cal_file, 'r') as f:
-                    calibrations[camera_dir.name] = json.load(f)
-
-    return calibrations
+    # One directory enumeration (DirEntry caches the type), then parse the
+    # files in parallel; each read mostly waits on the disk or network share
+    with os.scandir(cal_base) as entries:
+        cal_files = [
+            (entry.name, os.path.join(entry.path, "calibration.json"))
+            for entry in entries if entry.is_dir()
+        ]
+    cal_files = [(camera_id, path) for camera_id, path in cal_files if os.path.isfile(path)]
+
+    with ThreadPoolExecutor() as ex:
+        parsed = ex.map(read_json, [path for _, path in cal_files])
+        return {camera_id: data for (camera_id, _), data in zip(cal_files, parsed)}
+
+
+def _build_intrinsics(cal):
+    """Flatten one calibration.json into the ModelT intrinsics entry"""
+    cm = cal['camera_matrix']
+    dc = cal['distortion_coefficients']
+    fov = cal['field_of_view']
+    return {
+        "calibrated": True,
+        "calibration_date": cal['calibration_date'],
+        "image_size": cal['image_size'],
+        "fx": cm['fx'],
+        "fy": cm['fy'],
+        "cx": cm['cx'],
+        "cy": cm['cy'],
+        "k1": dc['k1'],
+        "k2": dc['k2'],
+        "p1": dc['p1'],
+        "p2": dc['p2'],
+        "k3": dc.get('k3', 0.0),
+        "rms_error": cal['rms_reprojection_error'],
+        "fov_horizontal": fov['horizontal_deg'],
+        "fov_vertical": fov['vertical_deg']
+    }
 
 
 def update_camera_intrinsics(modelt, calibrations):
@@ -51,31 +109,16 @@ def update_camera_intrinsics(modelt, calibrations):
     updated = 0
     not_found = []
 
+    # Build each intrinsics entry once, then just copy it onto the camera
+    intrinsics_by_id = {camera_id: _build_intrinsics(cal) for camera_id, cal in calibrations.items()}
+
     for slab in modelt.get('slabs', []):
         for camera in slab.get('cameras', []):
             camera_id = camera['id']
+            intrinsics = intrinsics_by_id.get(camera_id)
 
-            if camera_id in calibrations:
-                cal = calibrations[camera_id]
-
-                # Add intrinsics to camera object
-                camera['intrinsics'] = {
-                    "calibrated": True,
-                    "calibration_date": cal['calibration_date'],
-                    "image_size": cal['image_size'],
-                    "fx": cal['camera_matrix']['fx'],
-                    "fy": cal['camera_matrix']['fy'],
-                    "cx": cal['camera_matrix']['cx'],
-                    "cy": cal['camera_matrix']['cy'],
-                    "k1": cal['distortion_coefficients']['k1'],
-                    "k2": cal['distortion_coefficients']['k2'],
-                    "p1": cal['distortion_coefficients']['p1'],
-                    "p2": cal['distortion_coefficients']['p2'],
-                    "k3": cal['distortion_coefficients'].get('k3', 0.0),
-                    "rms_error": cal['rms_reprojection_error'],
-                    "fov_horizontal": cal['field_of_view']['horizontal_deg'],
-                    "fov_vertical": cal['field_of_view']['vertical_deg']
-                }
+            if intrinsics is not None:
+                camera['intrinsics'] = dict(intrinsics)
 
                 updated += 1
                 print(f"  [UPDATED] {camera_id} - {camera.get('name', 'unnamed')}")
@@ -97,7 +140,7 @@ def main():
     print("="*60)
 
     # Load ModelT
-    modelt, modelt_path = load_modelt(facility_name)
+    modelt, modelt_path, original_bytes = load_modelt(facility_name)
 
     # Find calibration files
     calibrations = get_calibration_files(facility_name)
@@ -122,15 +165,13 @@ def main():
             print(f"  - {cam_id}")
 
     if updated > 0:
-        # Backup original
+        # Backup original, byte for byte as it was before the update
         backup_path = modelt_path.with_suffix('.json.bak')
-        with open(backup_path, 'w') as f:
-            json.dump(modelt, f, indent=2)
+        backup_path.write_bytes(original_bytes)
         print(f"\nBackup saved to: {backup_path}")
 
         # Save updated ModelT
-        with open(modelt_path, 'w') as f:
-            json.dump(modelt, f, indent=2)
+        write_json(modelt_path, modelt)
 
         print(f"Updated ModelT saved to: {modelt_path}")
 
@@ -12,7 +12,9 @@ Example: python calibration_verify.py lodge bagel
 import cv2
 import json
 import numpy as np
+import queue
 import sys
+import threading
 from pathlib import Path
 
 
@@ -38,12 +40,67 @@ def load_calibration(facility_name, camera_id):
     if not cal_path.exists():
         return None, None, None
 
-    data = np.load(cal_path)
-    return data['camera_matrix'], data['dist_coeffs'], tuple(data['image_size'])
+    # NpzFile reads members lazily; only the three arrays are decompressed,
+    # and the archive is closed as soon as they are read
+    with np.load(cal_path, allow_pickle=False) as data:
+        return data['camera_matrix'], data['dist_coeffs'], tuple(data['image_size'].tolist())
+
+
+class FrameGrabber:
+    """
+    Reads the capture on a background thread, keeping only the newest frame
+
+    RTSP decode is the slow step; with it off the main thread, display runs
+    at remap + imshow speed and always shows the latest frame.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.lock = threading.Lock()
+        self.new_frame = threading.Event()
+        self.stop_event = threading.Event()
+        self.frame = None
+        self.thread = threading.Thread(target=self._run, name="verify-grabber", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            with self.lock:
+                self.frame = frame
+                self.new_frame.set()
+        self.stop_event.set()
+        self.new_frame.set()  # Wake the reader so it sees the stream ended
+
+    def read(self, timeout=5.0):
+        """Wait for a frame newer than the last one read; None if the stream ended"""
+        if not self.new_frame.wait(timeout):
+            return None
+        with self.lock:
+            self.new_frame.clear()
+            frame = self.frame
+        return None if self.stop_event.is_set() else frame
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=2)
+
+
+def image_writer(write_q):
+    """Write (path, encoded bytes) items until a None sentinel arrives"""
+    while True:
+        item = write_q.get()
+        if item is None:
+            break
+        path, data = item
+        Path(path).write_bytes(data)
+        print(f"Saved comparison to: {path}")
 
 
 def draw_info_overlay(frame, cal_data, is_undistorted=False):
-    """Draw calibration info on frame"""
+    """Draw calibration info onto frame in place"""
     h, w = frame.shape[:2]
 
     # Background for text
@@ -63,8 +120,6 @@ def draw_info_overlay(frame, cal_data, is_undistorted=False):
         cv2.putText(frame, f"k1={cal_data['k1']:.4f} k2={cal_data['k2']:.4f}", (10, 100),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
 
-    return frame
-
 
 def main():
     if len(sys.argv) < 3:
@@ -109,6 +164,7 @@ def main():
     if not cap.isOpened():
         print("ERROR: Could not connect to camera")
         sys.exit(1)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
     # Compute optimal new camera matrix for undistortion
     new_camera_matrix, roi = cv2.getOptimalNewCameraMatrix(
@@ -130,18 +186,46 @@ def main():
     cv2.moveWindow("Original", 0, 100)
     cv2.moveWindow("Undistorted", 970, 100)
 
+    # Undistortion lookup tables, built once for the stream's frame size.
+    # Fixed-point CV_16SC2 maps are half the memory traffic of float maps.
+    map1 = map2 = None
+    map_size = None
+
+    # Display buffers the overlays are drawn on, reused every frame
+    original_display = undistorted_display = None
+
+    grabber = FrameGrabber(cap)
+
+    # Saves are encoded in memory here and written to disk on a separate
+    # thread so the display loop never waits on the filesystem
+    write_q = queue.Queue()
+    writer = threading.Thread(target=image_writer, args=(write_q,), name="verify-writer", daemon=True)
+    writer.start()
+
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        frame = grabber.read()
+        if frame is None:
             print("Lost connection")
             break
 
         # Undistort
-        undistorted = cv2.undistort(frame, camera_matrix, dist_coeffs, None, new_camera_matrix)
+        frame_size = frame.shape[1::-1]  # (width, height)
+        if frame_size != map_size:
+            map1, map2 = cv2.initUndistortRectifyMap(
+                camera_matrix, dist_coeffs, None, new_camera_matrix, frame_size, cv2.CV_16SC2
+            )
+            map_size = frame_size
+            original_display = np.empty_like(frame)
+            undistorted_display = np.empty_like(frame)
+
+        # Undistort straight into its display buffer; the overlay is drawn on
+        # top, so no separate copy is needed
+        cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, dst=undistorted_display)
 
         # Draw overlays
-        original_display = draw_info_overlay(frame.copy(), cal_data, False)
-        undistorted_display = draw_info_overlay(undistorted.copy(), cal_data, True)
+        np.copyto(original_display, frame)
+        draw_info_overlay(original_display, cal_data, False)
+        draw_info_overlay(undistorted_display, cal_data, True)
 
         # Show frames
         cv2.imshow("Original", original_display)
@@ -155,9 +239,15 @@ def main():
             # Save comparison
             comparison = np.hstack([original_display, undistorted_display])
             output_path = f"calibration_verify_{camera_id}.jpg"
-            cv2.imwrite(output_path, comparison)
-            print(f"Saved comparison to: {output_path}")
-
+            ok, buf = cv2.imencode('.jpg', comparison)  # OpenCV default quality, as imwrite saved it
+            if ok:
+                write_q.put((output_path, buf.tobytes()))
+            else:
+                print("ERROR: Could not encode comparison image")
+
+    grabber.stop()
+    write_q.put(None)  # Finish any pending saves before exiting
+    writer.join()
     cap.release()
     cv2.destroyAllWindows()
 
@@ -7,7 +7,9 @@ Usage: python explore_nvr_web.py
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth, HTTPBasicAuth
+from concurrent.futures import ThreadPoolExecutor
 import re
 
 NVR_IP = "192.168.0.165"
@@ -15,6 +17,19 @@ NVR_USER = "admin"
 NVR_PASS = ""
 NVR_PORT = 80
 
+# href/src/action attribute values, found in one pass over the HTML
+LINK_RE = re.compile(r'(href|src|action)=["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Values skipped per attribute: off-site URLs plus, for href, script and anchors
+LINK_SKIP_PREFIXES = {
+    "href": ('http://', 'https://', 'javascript:', '#'),
+    "src": ('http://', 'https://'),
+    "action": (),
+}
+
+# Paths probed at once; each probe is a small GET that mostly waits on the NVR
+MAX_CONCURRENT_PROBES = 16
+
 # Common NVR web paths to check
 WEB_PATHS = [
     # Main pages
@@ -64,17 +79,49 @@ WEB_PATHS = [
 ]
 
 
-def check_path(base_url, path, auth=None):
-    """Check if a path exists and what it returns"""
+def make_session():
+    """Session with a keep-alive pool large enough for every concurrent probe"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_CONCURRENT_PROBES, pool_maxsize=MAX_CONCURRENT_PROBES)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def check_path(base_url, path, auth=None, session=None):
+    """
+    Check if a path exists and what it returns
+
+    Probes with HEAD first so missing paths and non-HTML endpoints cost no
+    body transfer; the page is only fetched when it is HTML that main() scans
+    for links, when a 200 does not report its Content-Length, or when the
+    NVR does not support HEAD.
+    """
     url = f"{base_url}{path}"
+    http = session or requests
     try:
-        resp = requests.get(url, auth=auth, timeout=5, allow_redirects=False)
+        resp = http.head(url, auth=auth, timeout=5, allow_redirects=False)
+        content_type = resp.headers.get("Content-Type", "")
+        is_page = "html" in content_type or path.endswith((".html", ".htm", ".asp"))
+        # Chunked or unsized 200s carry no length in HEAD; GET them as before
+        unsized = resp.status_code == 200 and not resp.headers.get("Content-Length")
+
+        if resp.status_code in (405, 501) or (resp.status_code == 200 and (is_page or unsized)):
+            resp = http.get(url, auth=auth, timeout=5, allow_redirects=False)
+            return {
+                "status": resp.status_code,
+                "length": len(resp.content),
+                "content_type": resp.headers.get("Content-Type", ""),
+                "redirect": resp.headers.get("Location", ""),
+                "snippet": resp.text[:300] if resp.text else ""
+            }
+
         return {
             "status": resp.status_code,
-            "length": len(resp.content),
-            "content_type": resp.headers.get("Content-Type", ""),
+            "length": int(resp.headers.get("Content-Length", 0) or 0),
+            "content_type": content_type,
             "redirect": resp.headers.get("Location", ""),
-            "snippet": resp.text[:300] if resp.text else ""
+            "snippet": ""
         }
     except Exception as e:
         return {"status": "error", "error": str(e)}
@@ -82,27 +129,22 @@ def check_path(base_url, path, auth=None):
 
 def extract_links(html):
     """Extract links and script sources from HTML"""
-    links = set()
-
-    # href links
-    for match in re.findall(r'href=["\']([^"\']+)["\']', html):
-        if not match.startswith(('http://', 'https://', 'javascript:', '#')):
-            links.add(match)
-
-    # src links
-    for match in re.findall(r'src=["\']([^"\']+)["\']', html):
-        if not match.startswith(('http://', 'https://')):
-            links.add(match)
+    return {
+        value for attr, value in LINK_RE.findall(html)
+        if not value.startswith(LINK_SKIP_PREFIXES[attr.lower()])
+    }
 
-    # action links
-    for match in re.findall(r'action=["\']([^"\']+)["\']', html):
-        links.add(match)
 
-    return links
+def check_paths(base_url, paths, auth, session):
+    """Probe paths concurrently; returns {path: result} in the order given"""
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PROBES) as ex:
+        results = ex.map(lambda path: check_path(base_url, path, auth, session), paths)
+        return dict(zip(paths, results))
 
 
 def main():
     base_url = f"http://{NVR_IP}:{NVR_PORT}"
+    session = make_session()
 
     print("=" * 70)
     print(f"GW Security NVR Web Explorer - {base_url}")
@@ -119,7 +161,7 @@ def main():
     working_auth = None
     print("\n[1] Finding authentication method...")
     for auth, name in auth_methods:
-        result = check_path(base_url, "/", auth)
+        result = check_path(base_url, "/", auth, session)
         if result.get("status") == 200:
             print(f"  ✅ {name} auth works")
             working_auth = auth
@@ -135,9 +177,7 @@ def main():
     found_apis = []
     all_links = set()
 
-    for path in WEB_PATHS:
-        result = check_path(base_url, path, working_auth)
-
+    for path, result in check_paths(base_url, WEB_PATHS, working_auth, session).items():
         if result.get("status") == 200:
             content_type = result.get("content_type", "")
             length = result.get("length", 0)
@@ -157,12 +197,13 @@ def main():
             print(f"  → {path:40} [Redirect to {redirect}]")
 
     # Check discovered links
-    print(f"\n[3] Checking {len(all_links)} discovered links...")
-    for link in sorted(all_links)[:20]:  # Limit to first 20
-        if link.startswith("/"):
-            result = check_path(base_url, link, working_auth)
-            if result.get("status") == 200:
-                print(f"  ✅ {link}")
+    # Only site-relative links not already probed in [2], limited to the first 20
+    probed = set(WEB_PATHS)
+    links = sorted(link for link in all_links if link.startswith("/") and link not in probed)[:20]
+    print(f"\n[3] Checking {len(links)} new discovered links ({len(all_links)} found)...")
+    for link, result in check_paths(base_url, links, working_auth, session).items():
+        if result.get("status") == 200:
+            print(f"  ✅ {link}")
 
     # Summary
     print("\n" + "=" * 70)
@@ -3,120 +3,291 @@
 Grab Current Screenshots from All NVR Channels
 Captures one frame from each channel and saves to timestamped directory
 
-Usage: python grab_all_screenshots.py <facility>
+Each channel is first fetched as a ready-made JPEG from the NVR's
+snapshot.cgi, saved as-is. If that fails (or with --rtsp), a frame is
+decoded from the RTSP stream and encoded here instead: from the sub stream
+when the URL has a known main/sub pattern, or the main stream with --main.
+
+Usage: python grab_all_screenshots.py <facility> [jpeg_quality] [--optimize] [--main] [--rtsp]
 Example: python grab_all_screenshots.py lodge
+         python grab_all_screenshots.py lodge 95 --optimize --main --rtsp
 """
 
 import cv2
 import json
 import os
+import multiprocessing
+import re
 import sys
-import threading
-import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
-# Thread-safe results
-results_lock = threading.Lock()
-results = {
-    'successful': 0,
-    'failed': 0,
-    'channels': {}
-}
-
+try:
+    import orjson  # optional: faster config parsing
+except ImportError:
+    orjson = None
+
+try:
+    import requests  # optional: HTTP snapshots straight from the NVR
+    from requests.auth import HTTPDigestAuth
+except ImportError:
+    requests = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420  # optional: SIMD JPEG encode
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError):  # OSError: libjpeg-turbo shared library not found
+    _turbojpeg = None
+
+# Frames grabbed (demuxed and decoded, but not converted to BGR) before the
+# one that is kept, so the screenshot is live rather than the stream's
+# buffered pre-roll
+PREROLL_GRABS = 5
+
+# Overview stills at q=85 look the same as q=95 at about half the size and
+# encode time; --optimize adds the optimal-Huffman pass (a few % smaller, slower)
+DEFAULT_JPEG_QUALITY = 85
+
+# RTSP handshakes in flight at once across all worker processes, and how long
+# one may take; decode and encode are not limited once a stream is open
+MAX_CONCURRENT_OPENS = 8
+OPEN_TIMEOUT_MS = 5000
+
+# Main-stream URL patterns and their sub-stream equivalents:
+# Dahua-style "...?channel=N&subtype=0", Hikvision "Streaming/Channels/N01",
+# and the generic "chNN/0"
+SUB_STREAM_PATTERNS = (
+    (re.compile(r'([?&]subtype=)0\b'), r'\g<1>1'),
+    (re.compile(r'(/Streaming/Channels/\d+)01$', re.IGNORECASE), r'\g<1>02'),
+    (re.compile(r'(/ch\d+)/0$'), r'\g<1>/1'),
+)
+
+# JPEG start-of-frame markers (baseline, extended, progressive) carry the size
+JPEG_SOF_MARKERS = (0xC0, 0xC1, 0xC2)
+
+# Set in each worker process by _init_worker
+_open_slots = None
+_http_session = None
+
+@lru_cache(maxsize=8)
 def load_config(facility_name):
-    """Load camera configuration for a facility"""
+    """Load camera configuration for a facility (parsed once per facility; don't mutate)"""
     config_path = Path(__file__).parent.parent / "warehouses" / facility_name / "cameras" / "config.json"
 
     if not config_path.exists():
         print(f"ERROR: Config not found at {config_path}")
         sys.exit(1)
 
+    if orjson is not None:
+        return orjson.loads(config_path.read_bytes())
     with open(config_path, 'r') as f:
         return json.load(f)
 
-def capture_channel(channel_info, output_dir):
-    """Capture a single frame from a channel"""
+def open_capture(rtsp_url):
+    """
+    Open an RTSP stream, decoding on the GPU when the FFmpeg build supports it
+
+    VIDEO_ACCELERATION_ANY picks whatever hardware decoder is available
+    (NVDEC/CUDA, VAAPI, D3D11, ...) and falls back to software decode on
+    its own; OpenCV builds older than 4.5.2 have no hwaccel properties.
+    """
+    if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+        timeout = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, OPEN_TIMEOUT_MS]
+        cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, timeout + [
+            cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY,
+            cv2.CAP_PROP_HW_DEVICE, 0,
+        ])
+        if cap.isOpened():
+            return cap
+        cap.release()
+        return cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG, timeout)
+    return cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+
+
+def sub_stream_url(rtsp_url):
+    """Sub-stream URL for a main-stream RTSP URL, or the URL unchanged if unrecognized"""
+    for pattern, replacement in SUB_STREAM_PATTERNS:
+        sub_url, count = pattern.subn(replacement, rtsp_url)
+        if count:
+            return sub_url
+    return rtsp_url
+
+
+def open_channel(rtsp_url):
+    """open_capture, holding one of the shared RTSP open slots"""
+    if _open_slots is None:
+        return open_capture(rtsp_url)
+    with _open_slots:
+        return open_capture(rtsp_url)
+
+
+def _init_worker(open_slots):
+    global _open_slots
+    _open_slots = open_slots
+
+
+def http_snapshot(nvr_info, channel_num):
+    """
+    The NVR's own JPEG for a channel via snapshot.cgi, or None
+
+    Nothing is decoded or re-encoded; one keep-alive session is reused for
+    every channel a worker process handles.
+    """
+    global _http_session
+    if requests is None:
+        return None
+    if _http_session is None:
+        _http_session = requests.Session()
+        _http_session.auth = HTTPDigestAuth(nvr_info.get('username', 'admin'), nvr_info.get('password', ''))
+
+    url = f"http://{nvr_info['ip']}:{nvr_info.get('httpPort', 80)}/cgi-bin/snapshot.cgi"
+    try:
+        resp = _http_session.get(url, params={'channel': channel_num - 1}, timeout=5)
+    except requests.RequestException:
+        return None
+    if resp.status_code == 200 and resp.content[:3] == b'\xff\xd8\xff':
+        return resp.content
+    return None
+
+
+def jpeg_size(data):
+    """(width, height) from a JPEG's start-of-frame header, or None"""
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker in JPEG_SOF_MARKERS:
+            height = int.from_bytes(data[i + 5:i + 7], 'big')
+            width = int.from_bytes(data[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+
+def save_frame(filepath, frame, quality, optimize=False):
+    """Encode frame as JPEG and write it; returns False if the write failed"""
+    if _turbojpeg is not None and not optimize:
+        with open(filepath, 'wb') as f:
+            f.write(_turbojpeg.encode(
+                frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=TJSAMP_420))
+        return True
+    return cv2.imwrite(filepath, frame, [
+        cv2.IMWRITE_JPEG_QUALITY, quality,
+        cv2.IMWRITE_JPEG_OPTIMIZE, int(optimize),
+    ])
+
+
+def capture_channel(channel_info, output_dir, jpeg_quality=DEFAULT_JPEG_QUALITY, optimize=False,
+                    main_stream=False, nvr_info=None):
+    """
+    Capture a single frame from a channel
+
+    Runs in a worker process; the progress line is printed in one call so
+    lines from different channels don't interleave. With nvr_info the NVR's
+    HTTP snapshot is tried first.
+
+    Returns:
+        (channel number, result entry for the summary)
+    """
 
     channel_num = channel_info['channel']
     rtsp_url = channel_info['rtspUrl']
     camera_id = channel_info['modelTCameraId']
     camera_name = channel_info['modelTCameraName']
 
-    print(f"[CH{channel_num:02d}] {camera_name:10} Connecting...", end=" ", flush=True)
+    prefix = f"[CH{channel_num:02d}] {camera_name:10}"
 
-    try:
-        cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+    def failed(status, reason, log):
+        print(f"{prefix} {log}", flush=True)
+        return channel_num, {
+            'status': status,
+            'reason': reason,
+            'camera_id': camera_id,
+            'camera_name': camera_name
+        }
 
-        if not cap.isOpened():
-            print("[FAIL]")
-            with results_lock:
-                results['failed'] += 1
-                results['channels'][channel_num] = {
-                    'status': 'failed',
-                    'reason': 'Could not connect',
+    try:
+        if nvr_info is not None:
+            data = http_snapshot(nvr_info, channel_num)
+            size = jpeg_size(data) if data is not None else None
+            if size is not None:
+                width, height = size
+                filename = f"ch{channel_num:02d}_{camera_id}_{width}x{height}.jpg"
+                with open(os.path.join(output_dir, filename), 'wb') as f:
+                    f.write(data)
+                print(f"{prefix} [OK] {width}x{height} [SAVED snapshot.cgi]", flush=True)
+                return channel_num, {
+                    'status': 'success',
+                    'resolution': f"{width}x{height}",
+                    'filename': filename,
                     'camera_id': camera_id,
                     'camera_name': camera_name
                 }
-            return
 
-        # Try to read a frame
-        ret, frame = cap.read()
+        # The sub stream is a fraction of the pixels to decode and encode;
+        # fall back to the main stream if the NVR doesn't serve one
+        sub_url = rtsp_url if main_stream else sub_stream_url(rtsp_url)
+        cap = open_channel(sub_url)
+        if not cap.isOpened() and sub_url != rtsp_url:
+            cap.release()
+            cap = open_channel(rtsp_url)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        if not cap.isOpened():
+            return failed('failed', 'Could not connect', "[FAIL]")
+
+        # Skip the pre-roll with grab(), then convert only the frame we keep
+        ret = True
+        for _ in range(PREROLL_GRABS):
+            ret = cap.grab()
+            if not ret:
+                break
+        frame = None
+        if ret:
+            ret, frame = cap.retrieve()
         cap.release()
 
         if not ret or frame is None:
-            print("[FAIL]")
-            with results_lock:
-                results['failed'] += 1
-                results['channels'][channel_num] = {
-                    'status': 'failed',
-                    'reason': 'Could not capture frame',
-                    'camera_id': camera_id,
-                    'camera_name': camera_name
-                }
-            return
+            return failed('failed', 'Could not capture frame', "[FAIL]")
 
         # Get resolution
         height, width = frame.shape[:2]
-        print(f"[OK] {width}x{height}", end=" ", flush=True)
 
         # Save frame with camera name
         filename = f"ch{channel_num:02d}_{camera_id}_{width}x{height}.jpg"
         filepath = os.path.join(output_dir, filename)
-        cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        if not save_frame(filepath, frame, jpeg_quality, optimize):
+            raise IOError(f"Could not write {filename}")
 
-        print(f"[SAVED]")
+        print(f"{prefix} [OK] {width}x{height} [SAVED]", flush=True)
 
-        with results_lock:
-            results['successful'] += 1
-            results['channels'][channel_num] = {
-                'status': 'success',
-                'resolution': f"{width}x{height}",
-                'filename': filename,
-                'camera_id': camera_id,
-                'camera_name': camera_name
-            }
+        return channel_num, {
+            'status': 'success',
+            'resolution': f"{width}x{height}",
+            'filename': filename,
+            'camera_id': camera_id,
+            'camera_name': camera_name
+        }
 
     except Exception as e:
-        print(f"[ERROR] {e}")
-        with results_lock:
-            results['failed'] += 1
-            results['channels'][channel_num] = {
-                'status': 'error',
-                'reason': str(e),
-                'camera_id': camera_id,
-                'camera_name': camera_name
-            }
+        return failed('error', str(e), f"[ERROR] {e}")
 
 
 def main():
     # Check for facility argument
-    if len(sys.argv) < 2:
-        print("Usage: python grab_all_screenshots.py <facility>")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        print("Usage: python grab_all_screenshots.py <facility> [jpeg_quality] [--optimize] [--main] [--rtsp]")
         print("Example: python grab_all_screenshots.py lodge")
         sys.exit(1)
 
-    facility_name = sys.argv[1]
+    facility_name = args[0]
+    jpeg_quality = int(args[1]) if len(args) > 1 else DEFAULT_JPEG_QUALITY
+    optimize = "--optimize" in sys.argv
+    main_stream = "--main" in sys.argv
+    rtsp_only = "--rtsp" in sys.argv
 
     # Load facility config
     config = load_config(facility_name)
@@ -133,24 +304,30 @@ def main():
     print(f"Location: {config['location']}")
     print(f"NVR: {config['nvr']['ip']}")
     print(f"Channels: {len(config['channels'])}")
+    print(f"Source: {'RTSP' if rtsp_only else 'snapshot.cgi, then RTSP'} "
+          f"({'main' if main_stream else 'sub'} stream)")
+    print(f"JPEG quality: {jpeg_quality}{' (optimized Huffman)' if optimize else ''}")
     print(f"Output: {output_dir}/")
     print("="*70 + "\n")
 
-    # Start capture threads for all channels
-    threads = []
-    for channel_info in config['channels']:
-        t = threading.Thread(
-            target=capture_channel,
-            args=(channel_info, output_dir),
-            daemon=False
+    # One process per channel (up to the core count): decode and JPEG encode
+    # run in parallel instead of contending for one interpreter's GIL
+    channels = config['channels']
+    nvr_info = None if rtsp_only else config['nvr']
+    open_slots = multiprocessing.Semaphore(MAX_CONCURRENT_OPENS)
+    with multiprocessing.Pool(processes=max(1, min(len(channels), os.cpu_count())),
+                              initializer=_init_worker, initargs=(open_slots,)) as pool:
+        channel_results = pool.starmap(
+            capture_channel,
+            [(channel_info, output_dir, jpeg_quality, optimize, main_stream, nvr_info)
+             for channel_info in channels]
         )
-        t.start()
-        threads.append(t)
-        time.sleep(0.1)  # Stagger the starts
 
-    # Wait for all threads to complete
-    for t in threads:
-        t.join()
+    results = {
+        'successful': sum(1 for _, ch in channel_results if ch['status'] == 'success'),
+        'failed': sum(1 for _, ch in channel_results if ch['status'] != 'success'),
+        'channels': dict(channel_results)
+    }
 
     # Print summary
     print("\n" + "="*70)
@@ -11,61 +11,63 @@ Example: python historical_nvr_access.py 1 1  # Channel 1, 1 hour ago
 
 import requests
 from requests.auth import HTTPDigestAuth, HTTPBasicAuth
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-import os
+
+from nvr_media import decode_first_frame, nvr_query, read_prefix
 
 NVR_IP = "192.168.0.165"
 USERNAME = "admin"
 PASSWORD = ""  # Empty as per your setup
 UTC_OFFSET = 5  # EST = 5, CST = 6, PST = 8
 
+# Finder object id in a factory.create response
+OBJECT_RE = re.compile(r'object=(\d+)')
+
 
 def get_session():
-    """Login and return authenticated session (tries Digest, then Basic)"""
+    """
+    Login and return authenticated session
+
+    One unauthenticated probe reads the scheme the NVR asks for from the
+    WWW-Authenticate header of its 401, so only that scheme is tried; for
+    any other reply it falls back to Digest, Basic, then none.
+    """
     session = requests.Session()
+    url = f"http://{NVR_IP}/cgi-bin/configManager.cgi?action=getConfig&name=Network"
 
-    # Try Digest Auth first (standard for Dahua)
-    print("  Trying Digest Auth...")
-    session.auth = HTTPDigestAuth(USERNAME, PASSWORD)
-    try:
-        resp = session.get(
-            f"http://{NVR_IP}/cgi-bin/configManager.cgi?action=getConfig&name=Network",
-            timeout=10
-        )
-        if resp.status_code == 200 and len(resp.content) > 400:
-            print("  ✅ Digest Auth works")
-            return session, "digest"
-    except Exception as e:
-        print(f"  Digest error: {e}")
+    candidates = [
+        ("digest", HTTPDigestAuth(USERNAME, PASSWORD), "Digest Auth works"),
+        ("basic", HTTPBasicAuth(USERNAME, PASSWORD), "Basic Auth works"),
+        ("none", None, "Anonymous access works"),
+    ]
 
-    # Try Basic Auth
-    print("  Trying Basic Auth...")
-    session.auth = HTTPBasicAuth(USERNAME, PASSWORD)
+    print("  Probing auth scheme...")
     try:
-        resp = session.get(
-            f"http://{NVR_IP}/cgi-bin/configManager.cgi?action=getConfig&name=Network",
-            timeout=10
-        )
-        if resp.status_code == 200 and len(resp.content) > 400:
-            print("  ✅ Basic Auth works")
-            return session, "basic"
+        resp = session.head(url, timeout=5, allow_redirects=False)
+        challenge = resp.headers.get("WWW-Authenticate", "").lower()
+        # Only a 401 challenge is trusted; some CGIs answer HEAD without auth
+        # but still want it on GET
+        if resp.status_code == 401 and challenge.startswith("digest"):
+            candidates = candidates[:1]
+        elif resp.status_code == 401 and challenge.startswith("basic"):
+            candidates = candidates[1:2]
     except Exception as e:
-        print(f"  Basic error: {e}")
+        print(f"  Probe error: {e}")
 
-    # Try no auth (anonymous)
-    print("  Trying No Auth...")
-    session.auth = None
-    try:
-        resp = session.get(
-            f"http://{NVR_IP}/cgi-bin/configManager.cgi?action=getConfig&name=Network",
-            timeout=10
-        )
-        if resp.status_code == 200 and len(resp.content) > 400:
-            print("  ✅ Anonymous access works")
-            return session, "none"
-    except Exception as e:
-        print(f"  No auth error: {e}")
+    for auth_type, auth, ok_message in candidates:
+        print(f"  Trying {auth_type} auth...")
+        session.auth = auth
+        try:
+            resp = session.get(url, timeout=10)
+            if resp.status_code == 200:
+                print(f"  ✅ {ok_message}")
+                return session, auth_type
+            print(f"  {auth_type} auth: status {resp.status_code}")
+        except Exception as e:
+            print(f"  {auth_type} auth error: {e}")
 
     print("  ❌ All auth methods failed")
     return None, None
@@ -104,10 +106,6 @@ def search_recordings(session, channel, start_time, end_time):
     print(f"  Channel: {channel+1}")
     print(f"  Range: {start_time} to {end_time}")
 
-    # URL encode the times (space -> %20)
-    start_enc = start_time.replace(" ", "%20")
-    end_enc = end_time.replace(" ", "%20")
-
     # Try different search endpoints
     search_urls = [
         # recordFinder.cgi variants
@@ -123,22 +121,25 @@ def search_recordings(session, channel, start_time, end_time):
             resp = session.get(create_url, timeout=10)
             print(f"    Create: {resp.status_code}")
 
-            if resp.status_code == 200 and "result=0" not in resp.text.lower():
+            # factory.create replies are a line or two; only decode the start
+            head = resp.content[:4096].decode('ascii', 'ignore')
+            if resp.status_code == 200 and "result=0" not in head.lower():
                 # Extract object ID if present
                 object_id = 0
-                if "object=" in resp.text:
-                    import re
-                    match = re.search(r'object=(\d+)', resp.text)
-                    if match:
-                        object_id = int(match.group(1))
+                match = OBJECT_RE.search(head)
+                if match:
+                    object_id = int(match.group(1))
 
                 # Step 2: Find files
-                find_url = create_url.replace("factory.create", "findFile")
-                find_url += f"&object={object_id}"
-                find_url += f"&condition.Channel={channel}"
-                find_url += f"&condition.StartTime={start_enc}"
-                find_url += f"&condition.EndTime={end_enc}"
-                find_url += "&condition.Types[0]=dav&condition.Types[1]=mp4"
+                find_url = create_url.split("?")[0] + "?" + nvr_query({
+                    "action": "findFile",
+                    "object": object_id,
+                    "condition.Channel": channel,
+                    "condition.StartTime": start_time,
+                    "condition.EndTime": end_time,
+                    "condition.Types[0]": "dav",
+                    "condition.Types[1]": "mp4",
+                })
 
                 resp = session.get(find_url, timeout=15)
                 print(f"    Find: {resp.status_code}, {len(resp.content)} bytes")
@@ -162,43 +163,52 @@ def get_historical_snapshot(session, channel, timestamp):
     """Try to get snapshot at specific historical time"""
     print(f"\n[Historical Snapshot] {timestamp}...")
 
-    timestamp_enc = timestamp.replace(" ", "%20")
+    at_time = nvr_query({"channel": channel, "time": timestamp})
 
     # Try various historical snapshot methods
     methods = [
         # Method 1: mediaFileFind getSnapshot
-        f"http://{NVR_IP}/cgi-bin/mediaFileFind.cgi?action=getSnapshot&channel={channel}&time={timestamp_enc}",
+        f"http://{NVR_IP}/cgi-bin/mediaFileFind.cgi?action=getSnapshot&{at_time}",
 
         # Method 2: snapshot.cgi with time parameter
-        f"http://{NVR_IP}/cgi-bin/snapshot.cgi?channel={channel}&time={timestamp_enc}",
+        f"http://{NVR_IP}/cgi-bin/snapshot.cgi?{at_time}",
 
         # Method 3: playback.cgi snapshot
-        f"http://{NVR_IP}/cgi-bin/playBack.cgi?action=getSnapshot&channel={channel}&time={timestamp_enc}",
+        f"http://{NVR_IP}/cgi-bin/playBack.cgi?action=getSnapshot&{at_time}",
     ]
 
-    for url in methods:
-        method_name = url.split("/")[-1].split("?")[0]
-        print(f"\n  Trying {method_name}...")
-
-        try:
-            resp = session.get(url, timeout=15)
-            print(f"    Status: {resp.status_code}, Size: {len(resp.content)} bytes")
-
-            if resp.status_code == 200 and len(resp.content) > 1000:
-                # Check if JPEG
-                if resp.content[:3] == b'\xff\xd8\xff':
-                    filename = f"historical_ch{channel+1}_{timestamp.replace(':', '').replace(' ', '_')}.jpg"
-                    with open(filename, "wb") as f:
-                        f.write(resp.content)
-                    print(f"    ✅ Saved: {filename}")
-                    return True
+    # Race all methods and keep the first JPEG; a failing NVR costs one
+    # timeout instead of one per method
+    print(f"\n  Trying {len(methods)} methods in parallel...")
+    ex = ThreadPoolExecutor(max_workers=len(methods))
+    futures = {ex.submit(session.get, url, timeout=15): url for url in methods}
+    try:
+        for future in as_completed(futures):
+            method_name = futures[future].split("/")[-1].split("?")[0]
+            print(f"\n  {method_name}:")
+
+            try:
+                resp = future.result()
+                print(f"    Status: {resp.status_code}, Size: {len(resp.content)} bytes")
+
+                if resp.status_code == 200 and len(resp.content) > 1000:
+                    # Check if JPEG
+                    if resp.content[:3] == b'\xff\xd8\xff':
+                        filename = f"historical_ch{channel+1}_{timestamp.replace(':', '').replace(' ', '_')}.jpg"
+                        with open(filename, "wb") as f:
+                            f.write(resp.content)
+                        print(f"    ✅ Saved: {filename}")
+                        return True
+                    else:
+                        print(f"    Not JPEG: {resp.content[:50]}")
                 else:
-                    print(f"    Not JPEG: {resp.content[:50]}")
-            else:
-                print(f"    Response: {resp.text[:200]}")
+                    print(f"    Response: {resp.text[:200]}")
 
-        except Exception as e:
-            print(f"    Error: {e}")
+            except Exception as e:
+                print(f"    Error: {e}")
+    finally:
+        # Don't wait on the slower probes once one has answered
+        ex.shutdown(wait=False, cancel_futures=True)
 
     return False
 
@@ -207,12 +217,13 @@ def download_by_time(session, channel, start_time, end_time):
     """Download recording segment via loadfile.cgi"""
     print(f"\n[Download by Time] {start_time} to {end_time}...")
 
-    start_enc = start_time.replace(" ", "%20")
-    end_enc = end_time.replace(" ", "%20")
-
-    url = (f"http://{NVR_IP}/cgi-bin/loadfile.cgi"
-           f"?action=startLoad&channel={channel}"
-           f"&startTime={start_enc}&endTime={end_enc}&subtype=0")
+    url = f"http://{NVR_IP}/cgi-bin/loadfile.cgi?" + nvr_query({
+        "action": "startLoad",
+        "channel": channel,
+        "startTime": start_time,
+        "endTime": end_time,
+        "subtype": 0,
+    })
 
     print(f"  URL: {url[:80]}...")
 
@@ -222,36 +233,28 @@ def download_by_time(session, channel, start_time, end_time):
         print(f"  Content-Type: {resp.headers.get('Content-Type', 'N/A')}")
 
         if resp.status_code == 200:
-            data = b""
-            for chunk in resp.iter_content(chunk_size=8192):
-                data += chunk
-                if len(data) > 500000:
-                    break
-            resp.close()
+            data = read_prefix(resp, 500000)
 
             if len(data) > 1000:
                 print(f"  ✅ Downloaded {len(data)} bytes")
 
                 # Try to extract frame
                 import cv2
-                temp_file = "temp_download.dav"
-                with open(temp_file, "wb") as f:
-                    f.write(data)
-
-                cap = cv2.VideoCapture(temp_file)
-                ret, frame = cap.read()
-                cap.release()
+                frame = decode_first_frame(data)
 
-                if ret and frame is not None:
+                if frame is not None:
                     filename = f"historical_ch{channel+1}_{start_time.replace(':', '').replace(' ', '_')}.jpg"
                     cv2.imwrite(filename, frame)
-                    os.remove(temp_file)
                     print(f"  ✅ Extracted frame: {filename}")
                     return True
                 else:
+                    # Keep the raw download for inspection
+                    temp_file = "temp_download.dav"
+                    with open(temp_file, "wb") as f:
+                        f.write(data)
                     print(f"  ⚠️ Couldn't decode video. Saved raw: {temp_file}")
             else:
-                print(f"  Only got {len(data)} bytes: {data[:100]}")
+                print(f"  Only got {len(data)} bytes: {bytes(data[:100])}")
 
     except Exception as e:
         print(f"  Error: {e}")
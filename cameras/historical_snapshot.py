@@ -14,14 +14,23 @@ Example: python historical_snapshot.py 1 1        # channel 1, 1 hour ago
 """
 
 import sys
-import os
 import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth, HTTPBasicAuth
 from datetime import datetime, timedelta
 import cv2
 import json
 
+try:
+    import orjson  # optional: faster parsing of large mediaFileFind replies
+except ImportError:
+    orjson = None
+
+from nvr_media import av_first_frame, decode_first_frame, nvr_query, read_prefix
+
 # NVR Configuration
 NVR_IP = "192.168.0.165"
 NVR_USER = "admin"
@@ -33,20 +42,56 @@ NVR_RTSP_PORT = 554
 UTC_OFFSET_HOURS = 5
 
 
+def make_session():
+    """Keep-alive session for the NVR; every method's HTTP calls reuse its connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_nvr_session = make_session()
+
+
+def _md5_upper(data):
+    # Dahua's login digest, not a security boundary on our side
+    return hashlib.md5(data, usedforsecurity=False).hexdigest().upper()
+
+
+@lru_cache(maxsize=4)
+def _realm_hash(username, realm, password):
+    """
+    MD5 of user:realm:password as uppercase hex bytes
+
+    Fixed per NVR account, so computed once per run; kept as bytes so the
+    second-stage hash is built without another str -> bytes conversion.
+    """
+    return _md5_upper(f"{username}:{realm}:{password}".encode()).encode('ascii')
+
+
 class DahuaRPC:
     """Simple Dahua RPC client for port 80 JSON-RPC API"""
 
-    def __init__(self, host, port=80, username="admin", password=""):
+    def __init__(self, host, port=80, username="admin", password="", session=None):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.session = session if session is not None else requests.Session()
         self.session_id = None
         self.base_url = f"http://{host}:{port}"
 
     def _md5(self, text):
-        return hashlib.md5(text.encode()).hexdigest().upper()
+        return _md5_upper(text.encode())
+
+    def _post(self, url, payload, timeout):
+        """POST a JSON-RPC payload and return the parsed reply (orjson when installed)"""
+        if orjson is None:
+            return self.session.post(url, json=payload, timeout=timeout).json()
+        resp = self.session.post(url, data=orjson.dumps(payload),
+                                 headers={"Content-Type": "application/json"}, timeout=timeout)
+        return orjson.loads(resp.content)
 
     def login(self):
         """Login using Dahua's challenge-response auth"""
@@ -63,24 +108,23 @@ class DahuaRPC:
         }
 
         try:
-            resp = self.session.post(url, json=payload, timeout=10)
-            data = resp.json()
+            data = self._post(url, payload, timeout=10)
 
             if "params" in data and "random" in data["params"]:
                 realm = data["params"].get("realm", "Login to " + self.host)
                 random_str = data["params"]["random"]
 
                 # Calculate password hash
-                pwd_hash = self._md5(f"{self.username}:{realm}:{self.password}")
-                final_hash = self._md5(f"{self.username}:{random_str}:{pwd_hash}")
+                pwd_hash = _realm_hash(self.username, realm, self.password)
+                final_hash = _md5_upper(b"%s:%s:%s" % (
+                    self.username.encode(), random_str.encode(), pwd_hash))
 
                 # Send actual login
                 payload["params"]["password"] = final_hash
                 payload["session"] = data.get("session", 0)
                 payload["id"] = 2
 
-                resp = self.session.post(url, json=payload, timeout=10)
-                login_data = resp.json()
+                login_data = self._post(url, payload, timeout=10)
 
                 if login_data.get("result"):
                     self.session_id = login_data.get("session")
@@ -108,8 +152,7 @@ class DahuaRPC:
         }
 
         try:
-            resp = self.session.post(url, json=payload, timeout=30)
-            return resp.json()
+            return self._post(url, payload, timeout=30)
         except Exception as e:
             print(f"  RPC request error: {e}")
             return None
@@ -150,13 +193,12 @@ class DahuaRPC:
         return files
 
 
-def method1_dahua_rpc(channel, target_time):
-    """Try Dahua RPC API to find and download recording"""
+def method1_dahua_rpc(rpc, channel, target_time):
+    """Try Dahua RPC API to find and download recording (rpc: logged-in client or None)"""
     print("\n[Method 1] Dahua RPC API (port 80)...")
 
-    rpc = DahuaRPC(NVR_IP, NVR_HTTP_PORT, NVR_USER, NVR_PASS)
-
-    if not rpc.login():
+    if rpc is None:
+        print("  Skipped: RPC login failed")
         return None
 
     # Search for files around target time
@@ -174,6 +216,24 @@ def method1_dahua_rpc(channel, target_time):
         return None
 
 
+def _read_playback(url):
+    """First frame of an RTSP playback URL, or None"""
+    # PyAV skips OpenCV's full stream probe and converts only the kept frame
+    frame = av_first_frame(url, {"rtsp_transport": "tcp", "analyzeduration": "1000000"})
+    if frame is not None:
+        return frame
+
+    # The open timeout only applies when passed at construction
+    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000])
+    try:
+        if not cap.isOpened():
+            return None
+        ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
+
+
 def method2_rtsp_playback(channel, target_time):
     """Try RTSP playback URL"""
     print("\n[Method 2] RTSP Playback URL...")
@@ -201,18 +261,19 @@ def method2_rtsp_playback(channel, target_time):
         print(f"  Trying {desc}...")
         print(f"    URL: {url[:80]}...")
 
-        cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
-        cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000)
-
-        if cap.isOpened():
-            ret, frame = cap.read()
-            cap.release()
-            if ret and frame is not None:
+    # Both formats are probed at once; the first one to yield a frame wins
+    ex = ThreadPoolExecutor(max_workers=len(formats))
+    futures = {ex.submit(_read_playback, url): desc for url, desc in formats}
+    try:
+        for future in as_completed(futures):
+            desc = futures[future]
+            frame = future.result()
+            if frame is not None:
                 print(f"  ✅ Got frame via {desc}")
                 return frame
-
-        cap.release()
-        print(f"    ❌ Failed")
+            print(f"    ❌ {desc} failed")
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
 
     return None
 
@@ -225,12 +286,13 @@ def method3_http_loadfile(channel, target_time):
     utc_time = target_time + timedelta(hours=UTC_OFFSET_HOURS)
     utc_end = utc_time + timedelta(seconds=30)
 
-    start_str = utc_time.strftime("%Y-%m-%d%%20%H:%M:%S")
-    end_str = utc_end.strftime("%Y-%m-%d%%20%H:%M:%S")
-
-    url = (f"http://{NVR_IP}:{NVR_HTTP_PORT}/cgi-bin/loadfile.cgi"
-           f"?action=startLoad&channel={channel}&startTime={start_str}"
-           f"&endTime={end_str}&subtype=0")
+    url = f"http://{NVR_IP}:{NVR_HTTP_PORT}/cgi-bin/loadfile.cgi?" + nvr_query({
+        "action": "startLoad",
+        "channel": channel,
+        "startTime": utc_time.strftime("%Y-%m-%d %H:%M:%S"),
+        "endTime": utc_end.strftime("%Y-%m-%d %H:%M:%S"),
+        "subtype": 0,
+    })
 
     print(f"  URL: {url[:80]}...")
 
@@ -242,31 +304,19 @@ def method3_http_loadfile(channel, target_time):
 
     for auth, desc in auth_methods:
         try:
-            resp = requests.get(url, auth=auth, timeout=15, stream=True)
+            resp = _nvr_session.get(url, auth=auth, timeout=15, stream=True)
             print(f"  {desc} auth: Status {resp.status_code}")
 
             if resp.status_code == 200:
                 # Read some data
-                data = b""
-                for chunk in resp.iter_content(chunk_size=8192):
-                    data += chunk
-                    if len(data) > 100000:
-                        break
-                resp.close()
+                data = read_prefix(resp, 100000)
 
                 if len(data) > 1000:
                     print(f"  ✅ Got {len(data)} bytes")
-                    # Save as .dav and try to extract frame
-                    with open("temp_recording.dav", "wb") as f:
-                        f.write(data)
-
-                    # Try to read frame from .dav
-                    cap = cv2.VideoCapture("temp_recording.dav")
-                    ret, frame = cap.read()
-                    cap.release()
+                    # Try to extract frame from the .dav
+                    frame = decode_first_frame(data)
 
-                    if ret and frame is not None:
-                        os.remove("temp_recording.dav")
+                    if frame is not None:
                         return frame
                     else:
                         print("  ⚠️  Got data but couldn't decode frame")
@@ -276,13 +326,12 @@ def method3_http_loadfile(channel, target_time):
     return None
 
 
-def method4_snapshot_at_time(channel, target_time):
-    """Try RPC snapshot at specific time (if supported)"""
+def method4_snapshot_at_time(rpc, channel, target_time):
+    """Try RPC snapshot at specific time, if supported (rpc: logged-in client or None)"""
     print("\n[Method 4] RPC Snapshot at Time...")
 
-    rpc = DahuaRPC(NVR_IP, NVR_HTTP_PORT, NVR_USER, NVR_PASS)
-
-    if not rpc.login():
+    if rpc is None:
+        print("  Skipped: RPC login failed")
         return None
 
     # Try various snapshot methods
@@ -332,12 +381,21 @@ def main():
 
     frame = None
 
-    # Try each method
-    result = method1_dahua_rpc(channel, target_time)
+    # One RPC login, shared by methods 1 and 4
+    print("\n[RPC] Logging in...")
+    rpc = DahuaRPC(NVR_IP, NVR_HTTP_PORT, NVR_USER, NVR_PASS, session=_nvr_session)
+    if not rpc.login():
+        rpc = None
+
+    # The RPC file search and the RTSP playback probe are both network waits,
+    # so run the search in the background while method 2 probes
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        rpc_search = ex.submit(method1_dahua_rpc, rpc, channel, target_time)
+        frame = method2_rtsp_playback(channel, target_time)
+        result = rpc_search.result()
     if result:
         print("  → RPC found files, but download not yet implemented")
 
-    frame = method2_rtsp_playback(channel, target_time)
     if frame is not None:
         filename = f"historical_ch{channel}_{target_time.strftime('%Y%m%d_%H%M%S')}.jpg"
         cv2.imwrite(filename, frame)
@@ -351,7 +409,7 @@ def main():
         print(f"\n✅ SUCCESS! Saved: {filename}")
         return 0
 
-    method4_snapshot_at_time(channel, target_time)
+    method4_snapshot_at_time(rpc, channel, target_time)
 
     print("\n" + "=" * 70)
     print("❌ All methods failed")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Shared helpers for the NVR historical-footage scripts in this directory
+
+Query-string encoding for the NVR's CGI, reading the start of a streamed
+recording, and decoding its first video frame (PyAV when installed,
+OpenCV through a scratch file otherwise).
+"""
+
+import io
+import os
+import tempfile
+from urllib.parse import quote, urlencode
+
+try:
+    import av  # optional: demux and decode just the first keyframe
+except ImportError:
+    av = None
+
+# Without PyAV, recordings reach OpenCV through a scratch file; on Linux it goes on
+# tmpfs so the bytes never touch the disk
+SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def nvr_query(params):
+    """
+    Encode query parameters the way the NVR's CGI expects them
+
+    Spaces become %20 (not '+'); ':' in times and '[]' in condition keys stay literal.
+    params is a dict, or a list of pairs when a key repeats.
+    """
+    return urlencode(params, quote_via=quote, safe=':[]')
+
+
+def read_prefix(resp, limit, chunk_size=8192):
+    """
+    Read a streamed response until just past limit bytes, then close it
+
+    Recordings are far larger than the one frame we need, so the rest is
+    never transferred.
+    """
+    # bytearray grows in place; bytes += would copy everything read so far
+    data = bytearray()
+    for chunk in resp.iter_content(chunk_size=chunk_size):
+        data.extend(chunk)
+        if len(data) > limit:
+            break
+    resp.close()
+    return data
+
+
+def av_first_frame(source, options=None):
+    """
+    First video frame of a URL or file-like object as BGR, via PyAV
+
+    Packets before the first keyframe are skipped without decoding, and only
+    the returned frame is converted to BGR. None if PyAV is missing or fails.
+    """
+    if av is None:
+        return None
+    try:
+        with av.open(source, options=options or {}, timeout=10) as container:
+            stream = container.streams.video[0]
+            started = False
+            for packet in container.demux(stream):
+                started = started or packet.is_keyframe
+                if not started:
+                    continue
+                for frame in packet.decode():
+                    return frame.to_ndarray(format="bgr24")
+    except Exception:
+        return None
+    return None
+
+
+def decode_first_frame(data):
+    """Decode the first video frame of a downloaded recording; None if it can't be decoded"""
+    # PyAV reads the .dav straight from memory
+    frame = av_first_frame(io.BytesIO(data))
+    if frame is not None:
+        return frame
+
+    import cv2
+
+    fd, path = tempfile.mkstemp(suffix=".dav", dir=SCRATCH_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        cap = cv2.VideoCapture(path)
+        ret, frame = cap.read()
+        cap.release()
+    finally:
+        os.remove(path)
+    return frame if ret and frame is not None else None
@@ -7,13 +7,16 @@ Usage: python nvr_session_download.py <channel> <hours_ago> [minutes_ago]
 """
 
 import sys
-import os
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 import cv2
 import re
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nvr_media import decode_first_frame, read_prefix
 
 # NVR Configuration
 NVR_IP = "192.168.0.165"
@@ -24,6 +27,28 @@ NVR_HTTP_PORT = 80
 # Timezone offset
 UTC_OFFSET_HOURS = 5
 
+# Time format for CGI query strings (space already encoded as %20)
+CGI_TIME_FMT = "%Y-%m-%d%%20%H:%M:%S"
+
+# Recording finder CGIs, tried in order, with any extra findFile conditions
+FINDER_CGIS = (
+    # Method 1: recordFinder with factory.create pattern
+    ("recordFinder.cgi", ""),
+    # Method 2: mediaFileFind
+    ("mediaFileFind.cgi", "&condition.Types[0]=dav&condition.Types[1]=mp4"),
+)
+
+# How long a find_recordings result is reused; short, since the NVR keeps
+# adding recordings to the index
+SEARCH_CACHE_TTL_S = 60
+
+# Finder object id in a factory.create reply ("result=12345")
+FINDER_ID_RE = re.compile(r"result=(\d+)")
+
+# One "items[0].FilePath=/mnt/..." line; captures the last key segment and the
+# value, both stripped. The value may itself contain '='.
+KV_LINE_RE = re.compile(r"^[ \t]*(?:[^=\n]*\.)?([^.=\n]*?)[ \t]*=[ \t]*([^\n]*?)[ \t\r]*$", re.MULTILINE)
+
 
 class GWSecurityNVR:
     """Client for GW Security NVR with session-based auth"""
@@ -35,11 +60,22 @@ class GWSecurityNVR:
         self.password = password
         self.base_url = f"http://{ip}:{port}"
         self.session = requests.Session()
+        # Room for concurrent requests on the logged-in session to each keep a socket
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.logged_in = False
+        # md5(user:realm:password) by (user, realm, password); the realm
+        # rarely changes, so later login attempts reuse it
+        self._pwd_phase1_cache = {}
+        # Finder object id by finder CGI URL, created once per session
+        self._finder_cache = {}
+        # (monotonic time, files) by (channel, start, end) rounded to the minute
+        self._search_cache = {}
 
     def _md5(self, text):
-        """MD5 hash helper"""
-        return hashlib.md5(text.encode()).hexdigest()
+        """MD5 hash helper (Dahua login digest, not used for security here)"""
+        return hashlib.md5(text.encode(), usedforsecurity=False).hexdigest()
 
     def login_web_ui(self):
         """Login via web interface to get session cookie"""
@@ -120,7 +156,11 @@ class GWSecurityNVR:
 
                 if random_str:
                     # Calculate password hash
-                    pwd_phase1 = self._md5(f"{self.username}:{realm}:{self.password}")
+                    key = (self.username, realm, self.password)
+                    pwd_phase1 = self._pwd_phase1_cache.get(key)
+                    if pwd_phase1 is None:
+                        pwd_phase1 = self._md5(f"{self.username}:{realm}:{self.password}")
+                        self._pwd_phase1_cache[key] = pwd_phase1
                     pwd_final = self._md5(f"{self.username}:{random_str}:{pwd_phase1}")
 
                     # Step 2: Send hashed password
@@ -173,59 +213,84 @@ class GWSecurityNVR:
         print(f"    Channel: {channel}")
         print(f"    Time range: {start_time} to {end_time}")
 
-        # Format times for CGI
-        start_str = start_time.strftime("%Y-%m-%d%%20%H:%M:%S")
-        end_str = end_time.strftime("%Y-%m-%d%%20%H:%M:%S")
-
-        # Try recordFinder.cgi
-        endpoints = [
-            # Method 1: recordFinder with factory.create pattern
-            [
-                (f"{self.base_url}/cgi-bin/recordFinder.cgi?action=factory.create", "Create finder"),
-                (f"{self.base_url}/cgi-bin/recordFinder.cgi?action=findFile&object=0&condition.Channel={channel-1}&condition.StartTime={start_str}&condition.EndTime={end_str}", "Find files"),
-            ],
-            # Method 2: mediaFileFind
-            [
-                (f"{self.base_url}/cgi-bin/mediaFileFind.cgi?action=factory.create", "Create finder"),
-                (f"{self.base_url}/cgi-bin/mediaFileFind.cgi?action=findFile&object=0&condition.Channel={channel-1}&condition.StartTime={start_str}&condition.EndTime={end_str}&condition.Types[0]=dav&condition.Types[1]=mp4", "Find files"),
-            ],
-        ]
-
-        for endpoint_group in endpoints:
-            print(f"\n    Trying {endpoint_group[0][1]}...")
+        # Overlapping retries within the TTL reuse the last result instead of
+        # making the NVR rescan its index
+        cache_key = (channel, start_time.replace(second=0, microsecond=0),
+                     end_time.replace(second=0, microsecond=0))
+        cached = self._search_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < SEARCH_CACHE_TTL_S:
+            print(f"    Using cached result ({len(cached[1])} file(s))")
+            return list(cached[1])
+
+        # Format times for CGI; the condition is shared by every finder, and
+        # each findFile URL is only built if its finder is reached
+        start_str = start_time.strftime(CGI_TIME_FMT)
+        end_str = end_time.strftime(CGI_TIME_FMT)
+        condition = f"condition.Channel={channel-1}&condition.StartTime={start_str}&condition.EndTime={end_str}"
+
+        # Try recordFinder.cgi, then mediaFileFind.cgi
+        endpoints = [(f"{self.base_url}/cgi-bin/{name}", extra) for name, extra in FINDER_CGIS]
+
+        # Create the finders this session doesn't have yet, both at once
+        missing = [cgi for cgi, _ in endpoints if cgi not in self._finder_cache]
+        if missing:
+            with ThreadPoolExecutor(max_workers=len(missing)) as ex:
+                for cgi, finder in zip(missing, ex.map(self._create_finder, missing)):
+                    if finder is not None:
+                        self._finder_cache[cgi] = finder
+
+        for cgi, extra in endpoints:
+            finder = self._finder_cache.get(cgi)
+            if finder is None:
+                continue
+            print(f"\n    Trying {cgi.rsplit('/', 1)[-1]} (finder {finder})...")
             try:
-                # Create finder
-                resp = self.session.get(endpoint_group[0][0], timeout=10)
-                print(f"      Create: {resp.status_code}, {resp.text[:200]}")
+                # Find files
+                resp = self.session.get(f"{cgi}?action=findFile&object={finder}&{condition}{extra}", timeout=10)
+                print(f"      Find: {resp.status_code}, {resp.text[:500]}")
 
-                if resp.status_code == 200 and "OK" in resp.text:
-                    # Find files
-                    resp = self.session.get(endpoint_group[1][0], timeout=10)
-                    print(f"      Find: {resp.status_code}, {resp.text[:500]}")
-
-                    if "FilePath" in resp.text or "found" in resp.text.lower():
-                        return self._parse_file_list(resp.text)
+                if "FilePath" in resp.text or "found" in resp.text.lower():
+                    files = self._parse_file_list(resp.text)
+                    self._search_cache[cache_key] = (time.monotonic(), files)
+                    return list(files)
 
             except Exception as e:
                 print(f"      Error: {e}")
 
         return []
 
+    def _create_finder(self, cgi):
+        """
+        factory.create on a finder CGI
+
+        Returns the finder object id (as a string), or None if the create failed.
+        Devices that reply a bare OK get object 0, as before.
+        """
+        try:
+            resp = self.session.get(f"{cgi}?action=factory.create", timeout=10)
+        except Exception as e:
+            print(f"      Create {cgi.rsplit('/', 1)[-1]}: error: {e}")
+            return None
+        print(f"      Create {cgi.rsplit('/', 1)[-1]}: {resp.status_code}, {resp.text[:200]}")
+        if resp.status_code != 200:
+            return None
+        match = FINDER_ID_RE.search(resp.text)
+        if match:
+            return match.group(1)
+        return "0" if "OK" in resp.text else None
+
     def _parse_file_list(self, text):
         """Parse file list from CGI response"""
         files = []
-        # Parse key=value format
+        # Parse key=value format, one regex pass over the whole body
         current_file = {}
-        for line in text.split('\n'):
-            if '=' in line:
-                key, value = line.split('=', 1)
-                key = key.strip().split('.')[-1]  # Get last part of key
-                value = value.strip()
-                current_file[key] = value
+        for match in KV_LINE_RE.finditer(text):
+            key, value = match.groups()
+            current_file[key] = value
 
-                if key == "FilePath" and value:
-                    files.append(current_file.copy())
-                    current_file = {}
+            if key == "FilePath" and value:
+                files.append(current_file)
+                current_file = {}
 
         return files
 
@@ -241,16 +306,11 @@ class GWSecurityNVR:
             print(f"    Status: {resp.status_code}")
 
             if resp.status_code == 200:
-                data = b""
-                for chunk in resp.iter_content(chunk_size=8192):
-                    data += chunk
-                    if len(data) > 500000:  # 500KB should be enough for one frame
-                        break
-                resp.close()
+                buf = read_prefix(resp, 500000, chunk_size=65536)  # 500KB should be enough for one frame
 
-                if len(data) > 1000:
-                    print(f"    ✅ Downloaded {len(data)} bytes")
-                    return data
+                if len(buf) > 1000:
+                    print(f"    ✅ Downloaded {len(buf)} bytes")
+                    return bytes(buf)
 
         except Exception as e:
             print(f"    Download error: {e}")
@@ -261,8 +321,8 @@ class GWSecurityNVR:
         """Download recording directly by time range via loadfile.cgi"""
         print(f"\n  Downloading by time range...")
 
-        start_str = start_time.strftime("%Y-%m-%d%%20%H:%M:%S")
-        end_str = end_time.strftime("%Y-%m-%d%%20%H:%M:%S")
+        start_str = start_time.strftime(CGI_TIME_FMT)
+        end_str = end_time.strftime(CGI_TIME_FMT)
 
         url = (f"{self.base_url}/cgi-bin/loadfile.cgi"
                f"?action=startLoad&channel={channel-1}"
@@ -279,18 +339,13 @@ class GWSecurityNVR:
                 content_type = resp.headers.get('Content-Type', '')
                 print(f"    Content-Type: {content_type}")
 
-                data = b""
-                for chunk in resp.iter_content(chunk_size=8192):
-                    data += chunk
-                    if len(data) > 500000:
-                        break
-                resp.close()
+                buf = read_prefix(resp, 500000, chunk_size=65536)
 
-                if len(data) > 1000:
-                    print(f"    ✅ Got {len(data)} bytes")
-                    return data
+                if len(buf) > 1000:
+                    print(f"    ✅ Got {len(buf)} bytes")
+                    return bytes(buf)
                 else:
-                    print(f"    ⚠️ Only got {len(data)} bytes: {data[:200]}")
+                    print(f"    ⚠️ Only got {len(buf)} bytes: {bytes(buf[:200])}")
 
         except Exception as e:
             print(f"    Error: {e}")
@@ -315,17 +370,8 @@ class GWSecurityNVR:
 
 def extract_frame_from_dav(data, output_file):
     """Extract first frame from DAV data"""
-    temp_file = "temp_download.dav"
-    with open(temp_file, "wb") as f:
-        f.write(data)
-
-    cap = cv2.VideoCapture(temp_file)
-    ret, frame = cap.read()
-    cap.release()
-
-    os.remove(temp_file)
-
-    if ret and frame is not None:
+    frame = decode_first_frame(data)
+    if frame is not None:
         cv2.imwrite(output_file, frame)
         return True
     return False
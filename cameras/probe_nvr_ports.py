@@ -6,10 +6,11 @@ Discover what's running on port 9000 and other potential API ports.
 Usage: python probe_nvr_ports.py
 """
 
+import asyncio
 import socket
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPDigestAuth
-import struct
 
 NVR_IP = "192.168.0.165"
 NVR_USER = "admin"
@@ -29,37 +30,53 @@ PORTS_TO_CHECK = [
     (34568, "XMEye Data"),
 ]
 
+# Probe payloads, built once
+HTTP_PROBE = b"GET / HTTP/1.0\r\nHost: " + NVR_IP.encode() + b"\r\nConnection: close\r\n\r\n"
+DAHUA_PROBE = b"\xa0\x00\x00\x60"  # Dahua magic
+XMEYE_PROBE = b"\xff\x00\x00\x00\x00\x00\x00\x00"  # XMEye login header (<BBHI: 0xff, 0, 0, 0)
 
-def check_port(ip, port, timeout=3):
+
+async def _open_connection(ip, port, timeout):
+    """
+    (reader, writer) for a probe connection
+
+    asyncio streams already disable Nagle on TCP; probes are a few bytes each.
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    return reader, writer
+
+
+async def _close(writer):
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+
+
+async def check_port(ip, port, timeout=3):
     """Check if a port is open"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(timeout)
     try:
-        result = sock.connect_ex((ip, port))
-        if result == 0:
-            return True
-        return False
-    except:
+        _, writer = await _open_connection(ip, port, timeout)
+    except Exception:
         return False
-    finally:
-        sock.close()
+    await _close(writer)
+    return True
 
 
-def probe_port(ip, port, timeout=5):
+async def probe_port(ip, port, timeout=5):
     """Try to identify what protocol is running on a port"""
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(timeout)
+    writer = None
 
     try:
-        sock.connect((ip, port))
+        reader, writer = await _open_connection(ip, port, timeout)
 
-        # Try to receive banner/greeting
-        sock.setblocking(0)
-        import select
-        ready = select.select([sock], [], [], 2)
-        banner = b""
-        if ready[0]:
-            banner = sock.recv(1024)
+        # Try to receive banner/greeting (2 s timeout)
+        try:
+            banner = await asyncio.wait_for(reader.read(1024), 2)
+        except asyncio.TimeoutError:
+            banner = b""
 
         if banner:
             return f"Banner: {banner[:100]}"
@@ -67,13 +84,12 @@ def probe_port(ip, port, timeout=5):
         # No banner, try sending some probes
 
         # Try HTTP
-        sock.send(b"GET / HTTP/1.0\r\n\r\n")
+        writer.write(HTTP_PROBE)
+        await writer.drain()
         response = b""
-        sock.setblocking(1)
-        sock.settimeout(3)
         try:
-            response = sock.recv(2048)
-        except:
+            response = await asyncio.wait_for(reader.read(2048), 3)
+        except Exception:
             pass
 
         if b"HTTP" in response:
@@ -81,47 +97,51 @@ def probe_port(ip, port, timeout=5):
 
         # Try Dahua binary protocol (login request)
         # Dahua SDK uses a binary protocol starting with specific magic bytes
-        sock.close()
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        sock.connect((ip, port))
+        await _close(writer)
+        reader, writer = await _open_connection(ip, port, timeout)
 
         # Send Dahua-style probe
-        dahua_probe = bytes([0xa0, 0x00, 0x00, 0x60])  # Dahua magic
-        sock.send(dahua_probe)
+        writer.write(DAHUA_PROBE)
+        await writer.drain()
         try:
-            response = sock.recv(1024)
+            response = await asyncio.wait_for(reader.read(1024), timeout)
             if response:
                 return f"Binary response: {response[:50].hex()}"
-        except:
+        except Exception:
             pass
 
         # Try XMEye/Sofia protocol
-        sock.close()
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        sock.connect((ip, port))
+        await _close(writer)
+        reader, writer = await _open_connection(ip, port, timeout)
 
         # XMEye login probe
-        xmeye_header = struct.pack('<BBHI', 0xff, 0x00, 0x00, 0x00)
-        sock.send(xmeye_header)
+        writer.write(XMEYE_PROBE)
+        await writer.drain()
         try:
-            response = sock.recv(1024)
+            response = await asyncio.wait_for(reader.read(1024), timeout)
             if response:
                 return f"XMEye-style response: {response[:50].hex()}"
-        except:
+        except Exception:
             pass
 
         return "Open but no identifiable protocol"
 
-    except socket.timeout:
+    except asyncio.TimeoutError:
         return "Timeout"
     except ConnectionRefusedError:
         return "Connection refused"
     except Exception as e:
         return f"Error: {e}"
     finally:
-        sock.close()
+        if writer is not None:
+            await _close(writer)
+
+
+def run_all(coros):
+    """Run coroutines concurrently on one event loop; results in input order"""
+    async def gather():
+        return await asyncio.gather(*coros)
+    return asyncio.run(gather())
 
 
 def main():
@@ -131,18 +151,23 @@ def main():
 
     print("\n[1] Checking open ports...\n")
 
+    # Every connect is a network wait, so all ports are checked at once on
+    # one event loop; results are printed in PORTS_TO_CHECK order
+    port_open = run_all(check_port(NVR_IP, port) for port, _ in PORTS_TO_CHECK)
+
     open_ports = []
-    for port, description in PORTS_TO_CHECK:
-        status = "✅ OPEN" if check_port(NVR_IP, port) else "❌ closed"
+    for (port, description), is_open in zip(PORTS_TO_CHECK, port_open):
+        status = "✅ OPEN" if is_open else "❌ closed"
         print(f"  Port {port:5} ({description:20}): {status}")
-        if "OPEN" in status:
+        if is_open:
             open_ports.append((port, description))
 
     print(f"\n[2] Probing {len(open_ports)} open ports...\n")
 
-    for port, description in open_ports:
+    probe_results = run_all(probe_port(NVR_IP, port) for port, _ in open_ports)
+
+    for (port, description), result in zip(open_ports, probe_results):
         print(f"\n  Port {port} ({description}):")
-        result = probe_port(NVR_IP, port)
         print(f"    {result}")
 
     # Special test for port 9000
@@ -159,14 +184,27 @@ def main():
             "/device/info",
         ]
 
+        # One keep-alive connection and Digest nonce for every path
+        session = requests.Session()
+        session.auth = HTTPDigestAuth(NVR_USER, NVR_PASS)
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
         for path in http_paths:
             try:
                 url = f"http://{NVR_IP}:9000{path}"
-                print(f"  GET {url}")
-                resp = requests.get(url, timeout=5, auth=HTTPDigestAuth(NVR_USER, NVR_PASS))
-                print(f"    Status: {resp.status_code}, Length: {len(resp.content)}")
-                if resp.content:
-                    print(f"    Content: {resp.text[:200]}")
+                # HEAD gives status and length without pulling the page; only
+                # servers that refuse it get a GET, and just its first bytes
+                print(f"  HEAD {url}")
+                resp = session.head(url, timeout=5, allow_redirects=True)
+                if resp.status_code in (405, 501):
+                    print(f"  GET {url}")
+                    with session.get(url, timeout=5, stream=True) as resp:
+                        preview = resp.raw.read(200, decode_content=True)
+                    print(f"    Status: {resp.status_code}, Length: {resp.headers.get('Content-Length', '?')}")
+                    if preview:
+                        print(f"    Content: {preview.decode('utf-8', errors='ignore')}")
+                else:
+                    print(f"    Status: {resp.status_code}, Length: {resp.headers.get('Content-Length', '?')}")
             except Exception as e:
                 print(f"    Error: {e}")
 
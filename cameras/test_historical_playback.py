@@ -7,9 +7,13 @@ Usage: python test_historical_playback.py [hours_ago]
 Example: python test_historical_playback.py 1
 """
 
+import base64
 import cv2
+import socket
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
 
 # NVR Configuration
 NVR_IP = "192.168.0.165"
@@ -22,28 +26,114 @@ TEST_CHANNEL = 1
 UTC_OFFSET_HOURS = 5  # Adjust for your timezone
 
 def test_url(url, timeout_ms=10000):
-    """Try to connect and grab a frame from the URL"""
-    print(f"  Testing: {url[:80]}...")
-
-    # Set timeout via environment or cap properties
-    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG)
-    cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms)
-    cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms)
+    """
+    Try to connect and grab a frame from the URL
+
+    Runs on a worker thread, so it reports through its return value
+    rather than printing: (success, JPEG bytes, status message). The frame
+    is encoded here so encoding overlaps the other URLs' network waits.
+    """
+    # Timeouts only take effect when passed at construction
+    cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms,
+    ])
 
     if not cap.isOpened():
-        print("    ❌ Failed to connect")
-        return False, None
+        return False, None, "❌ Failed to connect"
 
     ret, frame = cap.read()
     cap.release()
 
     if ret and frame is not None:
         h, w = frame.shape[:2]
-        print(f"    ✅ SUCCESS! Got frame {w}x{h}")
-        return True, frame
+        ok, jpg = cv2.imencode(".jpg", frame)
+        if not ok:
+            return False, None, f"❌ Got frame {w}x{h} but JPEG encode failed"
+        return True, jpg.tobytes(), f"✅ SUCCESS! Got frame {w}x{h}"
     else:
-        print("    ❌ Connected but no frame")
-        return False, None
+        return False, None, "❌ Connected but no frame"
+
+
+def _rtsp_request_uri(url):
+    """The URL as sent on the RTSP request line, without user:pass@"""
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(netloc=f"{parts.hostname}:{parts.port or NVR_PORT}"))
+
+
+def rtsp_describe_all(urls, timeout_s=5):
+    """
+    Status code of an RTSP DESCRIBE for each URL, sent over one connection
+
+    A DESCRIBE is a single round trip, where a VideoCapture open is a new
+    connection plus the whole DESCRIBE/SETUP/PLAY sequence. None where the NVR
+    gave no answer; if it cannot be reached at all, every remaining URL is None
+    after a single timeout.
+    """
+    auth = base64.b64encode(f"{NVR_USER}:{NVR_PASS}".encode()).decode()
+    codes = []
+    sock = reader = None
+    cseq = 0
+
+    def connect():
+        s = socket.create_connection((NVR_IP, NVR_PORT), timeout=timeout_s)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return s, s.makefile("rb")
+
+    def describe(uri):
+        sock.sendall(
+            f"DESCRIBE {uri} RTSP/1.0\r\nCSeq: {cseq}\r\nAccept: application/sdp\r\n"
+            f"Authorization: Basic {auth}\r\n\r\n".encode()
+        )
+        status = reader.readline().split()
+        if len(status) < 2 or not status[0].startswith(b"RTSP/"):
+            raise OSError("no RTSP reply")
+        # Drain headers and the SDP body so the connection is ready for the next one
+        length = 0
+        while True:
+            line = reader.readline()
+            if not line:
+                raise OSError("connection closed")
+            if not line.strip():
+                break
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value.strip() or 0)
+        if length:
+            reader.read(length)
+        return int(status[1])
+
+    try:
+        for url in urls:
+            uri = _rtsp_request_uri(url)
+            code = None
+            # The NVR may close the connection after an error reply; reconnect
+            # once and retry. A failure on a fresh connection means the NVR is
+            # unreachable or silent, which says nothing about this URL, so the
+            # rest are left unscreened rather than each waiting out the timeout
+            for _ in range(2):
+                cseq += 1
+                fresh = sock is None
+                try:
+                    if fresh:
+                        sock, reader = connect()
+                    code = describe(uri)
+                    break
+                except (OSError, ValueError):
+                    if sock is not None:
+                        sock.close()
+                    sock = reader = None
+                    if fresh:
+                        break
+            if code is None and sock is None and fresh:
+                codes.extend([None] * (len(urls) - len(codes)))
+                break
+            codes.append(code)
+    finally:
+        if sock is not None:
+            sock.close()
+
+    return codes
 
 
 def generate_playback_urls(channel, start_time, end_time):
@@ -135,16 +225,43 @@ def main():
 
     successful = []
 
-    for i, (url, description) in enumerate(urls, 1):
-        print(f"\n[{i}/{len(urls)}] {description}")
-        success, frame = test_url(url)
+    # Screen the formats with DESCRIBE first; only those the NVR didn't reject
+    # outright get a full VideoCapture open. A 401 only means Basic auth was
+    # refused, not that the path is wrong, so those are kept too.
+    codes = rtsp_describe_all([url for url, _ in urls])
+    print("DESCRIBE screen:")
+    for (url, description), code in zip(urls, codes):
+        print(f"  {code if code is not None else 'no reply'}  {description}")
+    candidates = [(i, url, description)
+                  for i, ((url, description), code) in enumerate(zip(urls, codes), 1)
+                  if code is None or code < 400 or code == 401]
+    print()
 
-        if success:
-            # Save the successful frame
-            filename = f"historical_ch{TEST_CHANNEL}_{description.replace(' ', '_')}.jpg"
-            cv2.imwrite(filename, frame)
-            print(f"    📸 Saved: {filename}")
-            successful.append((description, url))
+    # Every URL is probed at once (FFmpeg releases the GIL while it waits on
+    # the network), so the sweep takes one timeout instead of one per URL.
+    # Results are reported as they arrive.
+    print(f"Testing {len(candidates)} of {len(urls)} URL formats in parallel...")
+    with ThreadPoolExecutor(max_workers=max(len(candidates), 1)) as ex:
+        futures = {ex.submit(test_url, url): (i, url, description)
+                   for i, url, description in candidates}
+
+        for future in as_completed(futures):
+            i, url, description = futures[future]
+            success, jpg, status = future.result()
+            print(f"\n[{i}/{len(urls)}] {description}")
+            print(f"  Testing: {url[:80]}...")
+            print(f"    {status}")
+
+            if success:
+                # Save the successful frame
+                filename = f"historical_ch{TEST_CHANNEL}_{description.replace(' ', '_')}.jpg"
+                with open(filename, "wb") as f:
+                    f.write(jpg)
+                print(f"    📸 Saved: {filename}")
+                successful.append((i, description, url))
+
+    # Summary in URL order, not arrival order
+    successful = [(description, url) for _, description, url in sorted(successful)]
 
     # Summary
     print("\n" + "=" * 70)
@@ -22,6 +22,10 @@ NVR_HTTP_PORT = 80  # Try 80, 8080, or 443
 # Timezone offset (EST = 5, CST = 6, etc.)
 UTC_OFFSET_HOURS = 5
 
+# One keep-alive connection to the NVR for every endpoint tested instead of a
+# new TCP connection per request; auth is still chosen per request
+SESSION = requests.Session()
+
 
 def test_endpoint(url, auth=None, description="", stream=False):
     """Test an HTTP endpoint"""
@@ -30,14 +34,16 @@ def test_endpoint(url, auth=None, description="", stream=False):
 
     try:
         if stream:
-            response = requests.get(url, auth=auth, timeout=15, stream=True)
-            # Read first chunk to see if it's returning data
-            content = b""
-            for chunk in response.iter_content(chunk_size=8192):
-                content += chunk
-                if len(content) > 50000:  # Got enough to save
+            response = SESSION.get(url, auth=auth, timeout=15, stream=True)
+            # Read the first chunks to see if it's returning data; a bytearray
+            # grows in place instead of copying everything on every append
+            buf = bytearray()
+            for chunk in response.iter_content(chunk_size=65536):
+                buf.extend(chunk)
+                if len(buf) > 50000:  # Got enough to save
                     break
             response.close()
+            content = bytes(buf)
 
             if len(content) > 1000:
                 print(f"    ✅ SUCCESS! Got {len(content)} bytes (streaming)")
@@ -48,7 +54,7 @@ def test_endpoint(url, auth=None, description="", stream=False):
                     print(f"    Response: {content[:200]}")
                 return False, None
         else:
-            response = requests.get(url, auth=auth, timeout=15)
+            response = SESSION.get(url, auth=auth, timeout=15)
             print(f"    Status: {response.status_code}")
 
             if response.status_code == 200:
@@ -228,4 +234,5 @@ If nothing worked:
 
 
 if __name__ == "__main__":
-    main()
+    with SESSION:
+        main()
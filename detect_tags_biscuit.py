@@ -7,13 +7,16 @@ Tag Families:
   - tag36h11: Building fiducials (fixed reference points)
   - tag25h9: Forklifts (mobile equipment)
   - tagStandard41h12: Pallets (inventory/goods)
-  - tagStandard52h13: Reserved (future use)
+  - tagStandard52h13: Reserved (future use, off unless DETECT_RESERVED)
 """
 
 import cv2
 import numpy as np
 import requests
+import threading
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pupil_apriltags import Detector
 
 # Camera service configuration
@@ -21,6 +24,30 @@ CAMERA_SERVICE_URL = "http://localhost:8001"
 FACILITY = "lodge"
 CAMERA_ID = "biscuit"
 
+# Read the camera's RTSP stream directly (URL from the camera service) rather
+# than polling the capture endpoint, which re-encodes a JPEG for every frame.
+# Falls back to polling if the stream can't be opened.
+USE_RTSP = True
+
+# Detection runs at 50% for balance of speed/accuracy. The camera service
+# downscales before encoding, so only a quarter of the pixels cross the wire
+# and get decoded; tag positions are reported in full-resolution pixels.
+FULL_WIDTH = 4096  # biscuit is 4096x3072
+PROCESS_SCALE = 0.5
+FETCH_WIDTH = int(FULL_WIDTH * PROCESS_SCALE)
+
+# Detection runs on every frame; the overlay and window are only refreshed on
+# every Nth, since they are just for the person watching
+DISPLAY_EVERY_N = 5
+
+# The reserved family has no tags deployed yet; each family is a full
+# detection pass over the frame, so it only runs when switched on here
+DETECT_RESERVED = False
+
+# One keep-alive connection to the camera service for every frame instead of
+# a new TCP connection per capture
+SESSION = requests.Session()
+
 
 print("="*70)
 print("Multi-Family AprilTag Detection - Biscuit Camera")
@@ -29,15 +56,17 @@ print("Asset Types:")
 print("  - Fiducials (36h11):  Building reference points [GREEN]")
 print("  - Forklifts (25h9):   Mobile equipment [ORANGE]")
 print("  - Pallets (41h12):    Inventory/goods [MAGENTA]")
-print("  - Reserved (52h13):   Future use [CYAN]")
+if DETECT_RESERVED:
+    print("  - Reserved (52h13):   Future use [CYAN]")
 print("="*70)
 
-# Initialize 4 separate detectors - one per asset type
+# Initialize separate detectors - one per asset type. They run in parallel
+# (one thread each) rather than each fanning out over every core.
 print("Initializing detectors...")
 
 detector_fiducial = Detector(
     families='tag36h11',
-    nthreads=4,
+    nthreads=1,
     quad_decimate=1.0,
     quad_sigma=0.0,
     refine_edges=1,
@@ -48,7 +77,7 @@ print("  - Fiducial detector (tag36h11): ready")
 
 detector_forklift = Detector(
     families='tag25h9',
-    nthreads=4,
+    nthreads=1,
     quad_decimate=1.0,
     quad_sigma=0.0,
     refine_edges=1,
@@ -59,7 +88,7 @@ print("  - Forklift detector (tag25h9): ready")
 
 detector_pallet = Detector(
     families='tagStandard41h12',
-    nthreads=4,
+    nthreads=1,
     quad_decimate=1.0,
     quad_sigma=0.0,
     refine_edges=1,
@@ -68,46 +97,189 @@ detector_pallet = Detector(
 )
 print("  - Pallet detector (tagStandard41h12): ready")
 
-detector_reserved = Detector(
-    families='tagStandard52h13',
-    nthreads=4,
-    quad_decimate=1.0,
-    quad_sigma=0.0,
-    refine_edges=1,
-    decode_sharpening=0.25,
-    debug=0
-)
-print("  - Reserved detector (tagStandard52h13): ready")
-
 # Detector mapping for iteration
 DETECTORS = {
     'Fiducial': {'detector': detector_fiducial, 'color': (0, 255, 0)},      # Green
     'Forklift': {'detector': detector_forklift, 'color': (0, 165, 255)},    # Orange
     'Pallet': {'detector': detector_pallet, 'color': (255, 0, 255)},        # Magenta
-    'Reserved': {'detector': detector_reserved, 'color': (255, 255, 0)},    # Cyan
 }
 
-# CLAHE for contrast enhancement
+if DETECT_RESERVED:
+    detector_reserved = Detector(
+        families='tagStandard52h13',
+        nthreads=1,
+        quad_decimate=1.0,
+        quad_sigma=0.0,
+        refine_edges=1,
+        decode_sharpening=0.25,
+        debug=0
+    )
+    print("  - Reserved detector (tagStandard52h13): ready")
+    DETECTORS['Reserved'] = {'detector': detector_reserved, 'color': (255, 255, 0)}  # Cyan
+
+# CLAHE for contrast enhancement. It is skipped while the previous frame's
+# tags all decoded with at least this margin and none were lost; the image
+# is contrasty enough then, and it comes back on the next frame otherwise.
 clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+CLAHE_SKIP_MARGIN = 30.0
+
+# The AprilTag detector releases the GIL, so all families are detected
+# on the same frame at once
+detect_pool = ThreadPoolExecutor(max_workers=len(DETECTORS))
+
+
+def detect_family(config, gray):
+    """Run one family's detector on the grayscale frame"""
+    return config['detector'].detect(
+        gray,
+        estimate_tag_pose=False,
+        camera_params=None,
+        tag_size=None
+    )
 
-def capture_frame_from_api():
-    """Capture frame via camera service API"""
+# CRC32 and grayscale decode of the last API frame. When the service returns
+# the same JPEG again, the same gray array is handed back and the loop reuses
+# the previous detections.
+last_capture = {'crc': None, 'gray': None}
+
+
+def capture_frame_from_api(color=True):
+    """
+    Capture frame via camera service API
+
+    Returns (gray, frame) at PROCESS_SCALE: gray is the detection input,
+    decoded without chroma; frame is the color image for display, or None
+    when color is False. (None, None) on failure. A byte-identical repeat of
+    the previous frame returns the previous gray array itself.
+    """
     try:
-        response = requests.get(
+        response = SESSION.get(
             f"{CAMERA_SERVICE_URL}/api/cameras/{FACILITY}/{CAMERA_ID}/capture",
-            params={"format": "image", "refresh_cache": False},
+            params={"format": "image", "refresh_cache": False, "width": FETCH_WIDTH},
             timeout=5
         )
         if response.status_code == 200:
             img_array = np.frombuffer(response.content, dtype=np.uint8)
-            frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-            return frame
+            crc = zlib.crc32(response.content)
+            if crc == last_capture['crc']:
+                gray = last_capture['gray']
+            else:
+                gray = cv2.imdecode(img_array, cv2.IMREAD_GRAYSCALE)
+            frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR) if color else None
+            if gray is None or (color and frame is None):
+                return None, None
+            last_capture['crc'] = crc
+            last_capture['gray'] = gray
+            return gray, frame
         else:
-            return None
+            return None, None
     except Exception as e:
         print(f"Error fetching frame: {e}")
+        return None, None
+
+
+class StreamGrabber:
+    """
+    Reads an RTSP stream on a background thread, keeping only the newest frame
+
+    The read paces itself to the stream's frame rate, and detection always
+    gets the latest frame instead of working through a backlog.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.lock = threading.Lock()
+        self.new_frame = threading.Event()
+        self.stop_event = threading.Event()
+        self.frame = None
+        self.thread = threading.Thread(target=self._run, name="biscuit-grabber", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                ok, frame = self.cap.read()
+                if not ok:
+                    break
+                with self.lock:
+                    self.frame = frame
+                    self.new_frame.set()
+        finally:
+            self.stop_event.set()
+            self.new_frame.set()  # Wake the reader so it sees the stream ended
+            # Released here, once no cap.read() can still be running
+            self.cap.release()
+
+    @property
+    def alive(self):
+        return not self.stop_event.is_set()
+
+    def read(self, timeout=5.0):
+        """Wait for a frame newer than the last one read; None if the stream ended"""
+        if not self.new_frame.wait(timeout):
+            return None
+        with self.lock:
+            self.new_frame.clear()
+            frame = self.frame
+        return None if self.stop_event.is_set() else frame
+
+    def request_stop(self):
+        """Ask the grabber to exit and wake any read() waiting on it"""
+        self.stop_event.set()
+        self.new_frame.set()
+
+    def stop(self):
+        """Stop the grabber; the capture is released when its thread exits"""
+        self.request_stop()
+        self.thread.join(timeout=2)
+
+
+def open_stream():
+    """Open the camera's RTSP stream; None if it isn't available"""
+    try:
+        response = SESSION.get(f"{CAMERA_SERVICE_URL}/api/cameras/{FACILITY}/{CAMERA_ID}/info", timeout=5)
+        response.raise_for_status()
+        rtsp_url = response.json()['rtspUrl']
+    except Exception as e:
+        print(f"Could not look up stream URL: {e}")
         return None
 
+    cap = cv2.VideoCapture(rtsp_url, cv2.CAP_FFMPEG)
+    if not cap.isOpened():
+        print("Could not open RTSP stream")
+        cap.release()
+        return None
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return StreamGrabber(cap)
+
+
+def capture_frame_from_stream(color=True):
+    """
+    Take the newest stream frame, in the same form as capture_frame_from_api
+
+    The stream is reopened if it dropped. Returns (gray, frame) at
+    PROCESS_SCALE, frame None when color is False; (None, None) on failure.
+    """
+    global stream
+    if stopping.is_set():
+        return None, None
+    if not stream.alive:
+        stream.stop()
+        stream = open_stream() or stream
+    frame = stream.read()
+    if frame is None:
+        return None, None
+
+    h, w = frame.shape[:2]
+    small = cv2.resize(frame, (int(w * PROCESS_SCALE), int(h * PROCESS_SCALE)), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return gray, (small if color else None)
+
+
+def is_display_frame(n):
+    """Whether frame number n (from 1) is drawn and shown; the first one always is"""
+    return (n - 1) % DISPLAY_EVERY_N == 0
+
 print("Starting detection (press Q to quit)...")
 print()
 
@@ -118,98 +290,134 @@ last_tags = {}
 # Create window
 cv2.namedWindow("AprilTag Detection - Biscuit", cv2.WINDOW_NORMAL)
 
+# Set on exit so an in-flight prefetch neither waits on nor reopens the stream
+stopping = threading.Event()
+stream = open_stream() if USE_RTSP else None
+if stream is not None:
+    print("Reading RTSP stream directly")
+    capture_frame = capture_frame_from_stream
+else:
+    print("Polling camera service capture endpoint")
+    capture_frame = capture_frame_from_api
+
+# Fetch and decode run on a background thread, one frame ahead, so the next
+# frame arrives while the current one is being detected. Only frames that
+# will be shown are kept in color.
+prefetch = ThreadPoolExecutor(max_workers=1)
+next_frame = prefetch.submit(capture_frame, is_display_frame(1))
+
+# Per-frame work buffers, allocated once for the stream's frame size and
+# written in place every frame
+buffer_size = None
+enhanced = status_bg = display_frame = None
+skip_clahe = False
+last_gray = None
+all_detections = []
+
 try:
     while True:
         # Capture frame
-        frame = capture_frame_from_api()
+        gray, frame = next_frame.result()
 
-        if frame is None:
+        if gray is None:
             print("Failed to capture frame, retrying...")
             time.sleep(1)
+            next_frame = prefetch.submit(capture_frame, is_display_frame(frame_count + 1))
             continue
 
         frame_count += 1
-
-        # Resize for detection (50% for balance of speed/accuracy)
-        h, w = frame.shape[:2]
-        process_scale = 0.5
-        process_w = int(w * process_scale)
-        process_h = int(h * process_scale)
-        process_frame = cv2.resize(frame, (process_w, process_h))
-
-        # Convert to grayscale and enhance contrast
-        gray = cv2.cvtColor(process_frame, cv2.COLOR_BGR2GRAY)
-        gray = clahe.apply(gray)
-
-        # Run all 3 detectors
-        all_detections = []
-        for asset_name, config in DETECTORS.items():
-            detections = config['detector'].detect(
-                gray,
-                estimate_tag_pose=False,
-                camera_params=None,
-                tag_size=None
-            )
-            # Add asset info to each detection
-            for d in detections:
-                d.asset_name = asset_name
-                d.color = config['color']
-                # Scale back to full resolution
-                d.center *= (1.0 / process_scale)
-                d.corners *= (1.0 / process_scale)
-                all_detections.append(d)
-
-        # Draw detected tags
+        show = frame is not None
+        next_frame = prefetch.submit(capture_frame, is_display_frame(frame_count + 1))
+
+        h, w = gray.shape[:2]
+
+        # Resize for display (still bigger than the screen)
+        display_scale = min(1920 / w, 1080 / h)
+        display_w = int(w * display_scale)
+        display_h = int(h * display_scale)
+
+        if buffer_size != (w, h):
+            enhanced = np.empty_like(gray)
+            # Only the top status strip is blended, so only it needs a backdrop
+            status_bg = np.full((min(51, h), w, 3), 40, np.uint8)
+            display_frame = np.empty((display_h, display_w, 3), np.uint8)
+            buffer_size = (w, h)
+
+        # A repeat of the last frame has the same tags; skip straight to drawing
+        if gray is not last_gray:
+            last_gray = gray
+
+            # Enhance contrast, unless the last frame showed it isn't needed
+            if skip_clahe:
+                detect_input = gray
+            else:
+                clahe.apply(gray, dst=enhanced)
+                detect_input = enhanced
+
+            # Run the detectors concurrently; results come back in DETECTORS order
+            all_detections = []
+            results = detect_pool.map(detect_family, DETECTORS.values(), [detect_input] * len(DETECTORS))
+            for (asset_name, config), detections in zip(DETECTORS.items(), results):
+                # Add asset info to each detection
+                for d in detections:
+                    d.asset_name = asset_name
+                    d.color = config['color']
+                    all_detections.append(d)
+
+        # Draw detected tags (sizes are for the half-resolution frame)
         current_tags = {}
         if all_detections:
             detection_count += len(all_detections)
 
+            if show:
+                # Draw tag borders (color by asset type), one polylines call per color
+                borders = {}
+                for detection in all_detections:
+                    borders.setdefault(detection.color, []).append(detection.corners.astype(np.int32))
+                for color, polys in borders.items():
+                    cv2.polylines(frame, polys, True, color, 2)
+
             for detection in all_detections:
                 tag_id = detection.tag_id
                 asset_name = detection.asset_name
                 color = detection.color
                 center = detection.center
-                corners = detection.corners
                 decision_margin = detection.decision_margin
 
                 current_tags[tag_id] = {
-                    'center': center,
+                    'center': center / PROCESS_SCALE,  # full-resolution pixels
                     'margin': decision_margin,
                     'asset': asset_name
                 }
 
-                # Draw tag border (color by asset type)
-                corners_int = corners.astype(int)
-                for i in range(4):
-                    pt1 = tuple(corners_int[i])
-                    pt2 = tuple(corners_int[(i + 1) % 4])
-                    cv2.line(frame, pt1, pt2, color, 4)
+                if not show:
+                    continue
 
                 # Draw center point (red)
                 center_int = (int(center[0]), int(center[1]))
-                cv2.circle(frame, center_int, 10, (0, 0, 255), -1)
+                cv2.circle(frame, center_int, 5, (0, 0, 255), -1)
 
                 # Draw asset type and tag ID
                 label = f"{asset_name} #{tag_id}"
                 cv2.putText(
                     frame,
                     label,
-                    (int(center[0]) - 80, int(center[1]) - 40),
+                    (int(center[0]) - 40, int(center[1]) - 20),
                     cv2.FONT_HERSHEY_SIMPLEX,
-                    1.5,
+                    0.75,
                     color,
-                    4
+                    2
                 )
 
                 # Draw decision margin (quality indicator)
                 cv2.putText(
                     frame,
                     f"Quality: {decision_margin:.1f}",
-                    (int(center[0]) - 80, int(center[1]) + 50),
+                    (int(center[0]) - 40, int(center[1]) + 25),
                     cv2.FONT_HERSHEY_SIMPLEX,
-                    1.0,
+                    0.5,
                     (255, 255, 0),
-                    3
+                    2
                 )
 
         # Print new detections
@@ -221,6 +429,10 @@ try:
                 asset = info['asset']
                 print(f"  NEW: {asset} #{tag_id} at ({center[0]:.0f}, {center[1]:.0f}), quality: {margin:.1f}")
 
+        tags_lost = any(tag_id not in current_tags for tag_id in last_tags)
+        skip_clahe = (bool(all_detections) and not tags_lost
+                      and min(d.decision_margin for d in all_detections) > CLAHE_SKIP_MARGIN)
+
         last_tags = current_tags
 
         # Count by asset type
@@ -228,37 +440,43 @@ try:
         forklifts = sum(1 for t in current_tags.values() if t['asset'] == 'Forklift')
         pallets = sum(1 for t in current_tags.values() if t['asset'] == 'Pallet')
 
-        # Add status overlay
-        status_bg = frame.copy()
-        cv2.rectangle(status_bg, (0, 0), (frame.shape[1], 100), (40, 40, 40), -1)
-        frame = cv2.addWeighted(frame, 0.7, status_bg, 0.3, 0)
+        if show:
+            # Add status overlay, darkening the top strip in place
+            status_strip = frame[:status_bg.shape[0]]
+            cv2.addWeighted(status_strip, 0.7, status_bg, 0.3, 0, dst=status_strip)
 
-        status_text = f"Frame: {frame_count} | Fiducials: {fiducials} | Forklifts: {forklifts} | Pallets: {pallets}"
-        cv2.putText(frame, status_text, (30, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
+            status_text = f"Frame: {frame_count} | Fiducials: {fiducials} | Forklifts: {forklifts} | Pallets: {pallets}"
+            cv2.putText(frame, status_text, (15, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
-        # Resize for display (biscuit is 4096x3072, way too big)
-        height, width = frame.shape[:2]
-        display_scale = min(1920 / width, 1080 / height)
-        display_w = int(width * display_scale)
-        display_h = int(height * display_scale)
-        display_frame = cv2.resize(frame, (display_w, display_h))
+            cv2.resize(frame, (display_w, display_h), dst=display_frame)
 
-        # Display
-        cv2.imshow("AprilTag Detection - Biscuit", display_frame)
+            # Display
+            cv2.imshow("AprilTag Detection - Biscuit", display_frame)
 
-        # Check for key press
+        # Check for key press (every frame, so the window stays responsive)
         key = cv2.waitKey(1) & 0xFF
         if key == ord('q') or key == ord('Q'):
             print("\nStopped by user")
             break
 
-        # Small delay between captures (API-based, don't hammer it)
-        time.sleep(0.2)
+        # Small delay between captures when polling the API (don't hammer
+        # it); the stream paces itself
+        if stream is None:
+            time.sleep(0.2)
 
 except KeyboardInterrupt:
     print("\nInterrupted by user")
 
 finally:
+    stopping.set()
+    if stream is not None:
+        stream.request_stop()
+    # Let the in-flight fetch finish before the stream it reads is torn down
+    prefetch.shutdown(wait=True, cancel_futures=True)
+    if stream is not None:
+        stream.stop()
+    detect_pool.shutdown()
+    SESSION.close()
     cv2.destroyAllWindows()
     print("\n" + "="*70)
     print("Detection Summary:")
@@ -37,16 +37,16 @@ camera_params = (fx, fy, cx, cy)
 
 print(f"Calibration: fx={fx:.1f}, fy={fy:.1f}, cx={cx:.1f}, cy={cy:.1f}")
 
-# Load image
+# Load image, decoded straight to grayscale (no color reconstruction)
 load_start = time.time()
-frame = cv2.imread(IMAGE_PATH)
+gray = cv2.imread(IMAGE_PATH, cv2.IMREAD_GRAYSCALE)
 load_time = time.time() - load_start
 
-if frame is None:
+if gray is None:
     print(f"ERROR: Could not load image from {IMAGE_PATH}")
     exit(1)
 
-h, w = frame.shape[:2]
+h, w = gray.shape[:2]
 
 # Initialize detector
 detector = Detector(
@@ -59,9 +59,6 @@ detector = Detector(
     debug=0
 )
 
-# Convert to grayscale
-gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
 # Detect tags WITH POSE ESTIMATION
 detect_start = time.time()
 detections = detector.detect(